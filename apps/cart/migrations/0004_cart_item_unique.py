@@ -0,0 +1,29 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0003_initial"),
+    ]
+
+    operations = [
+        # Concurrent writes of the same cart could leave a product in it twice; the newest
+        # row holds the quantity last written.
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM cart_cartitem item
+                USING cart_cartitem newer
+                WHERE newer.cart_id = item.cart_id
+                  AND newer.product_id = item.product_id
+                  AND newer.id > item.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(fields=("cart", "product"), name="cart_item_unique"),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from rest_framework.permissions import BasePermission
+
+from share.permissions import permission_registry
+
+
+class GuestOrGeneratedPermission(BasePermission):
+    """
+    Guests may work on their own guest cart. Signed-in users need the permission the
+    GeneratePermissions registry resolves for the view and request method.
+    """
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        permission_class = permission_registry.get(type(view)).get(str(request.method).upper())
+        return permission_class is None or permission_class().has_permission(request, view)
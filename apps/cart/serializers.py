@@ -27,38 +27,47 @@ class CartItemSerializer(serializers.ModelSerializer):
         if product.quantity < quantity:
             raise serializers.ValidationError({'error': 'Not enough of this item in stock'})
 
+        attrs['product'] = product
         return attrs
 
     def create(self, validated_data):
-        request = self.context['request']
-        user = request.user
+        cart_service, owner_id = self.context['cart']
+        product = validated_data['product']
+        quantity = validated_data['quantity']
 
-        product_id = validated_data.get('product_id')
-        quantity = validated_data.get('quantity')
+        cart_service.set_quantity(owner_id, product.id, quantity)
 
-        # Get or create the cart for the user
-        cart, _ = Cart.objects.get_or_create(user=user)
+        return CartItem(product=product, quantity=quantity)
 
-        product = Product.objects.get(id=product_id)
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
 
-        if created:
-            # If the cart item is newly created, set the initial quantity
-            cart_item.quantity = quantity
-        else:
+class CartBulkItemSerializer(serializers.Serializer):
+    product_id = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=0, help_text='0 removes the product from the cart')
 
-            if quantity > product.quantity:
-                raise serializers.ValidationError({'error': 'Not enough of this item in stock'})
 
-            cart_item.quantity = quantity
+class CartBulkSerializer(serializers.Serializer):
+    items = CartBulkItemSerializer(many=True, allow_empty=False, max_length=100)
 
-        # Save the cart item with the updated quantity
-        cart_item.save()
+    def validate_items(self, items):
+        quantities = {item['product_id']: item['quantity'] for item in items}
+        if len(quantities) != len(items):
+            raise serializers.ValidationError('Every product can only appear once.')
 
-        # Optionally update the cart total items count if using Option 1
-        cart.update_total_items()
+        # Existence and stock of every product in one query
+        stock = dict(Product.objects.filter(id__in=quantities.keys()).values_list('id', 'quantity'))
+        missing = [str(product_id) for product_id in quantities if product_id not in stock]
+        if missing:
+            raise serializers.ValidationError({'error': 'Products not found', 'products': missing})
+        lacking = [str(product_id) for product_id, quantity in quantities.items() if stock[product_id] < quantity]
+        if lacking:
+            raise serializers.ValidationError({'error': 'Not enough of these items in stock', 'products': lacking})
 
-        return cart_item
+        return items
+
+    def create(self, validated_data):
+        cart_service, owner_id = self.context['cart']
+        cart_service.change(owner_id, {item['product_id']: item['quantity'] for item in validated_data['items']})
+        return validated_data
 
 
 class CartSerializer(serializers.ModelSerializer):
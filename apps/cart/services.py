@@ -0,0 +1,399 @@
+import operator
+import uuid
+from decimal import Decimal
+from functools import reduce
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Cast
+from django_redis import get_redis_connection
+from redis import Redis
+
+from cart.models import Cart, CartItem
+from product.models import Product
+from user.models import User
+
+
+class CartService:
+    """
+    Carts live in Redis, one hash per user mapping product id -> quantity, so every cart
+    operation is a single O(1) command. A cart is loaded from Cart/CartItem the first time
+    it is used, and changed carts are written back to the database in batches by flush().
+    """
+
+    cart_key = "cart:{user_id}"
+    dirty_key = "carts:dirty"
+    # Present in every loaded cart, so a loaded empty cart is told from one not loaded yet.
+    loaded_field = "loaded"
+    cart_ttl = 7 * 24 * 60 * 60
+
+    # KEYS: the cart and the dirty carts. ARGV: user id, ttl, 1 to only change products
+    # already in the cart, then product id and quantity pairs; a quantity of 0 removes the
+    # product. Returns -1 if the cart is not loaded, else the number of products changed.
+    change_script = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return -1
+    end
+    local changed = 0
+    for i = 4, #ARGV, 2 do
+        if ARGV[3] == '0' or redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 then
+            if ARGV[i + 1] == '0' then
+                changed = changed + redis.call('HDEL', KEYS[1], ARGV[i])
+            else
+                redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+                changed = changed + 1
+            end
+        end
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    if changed > 0 and #KEYS > 1 then
+        redis.call('SADD', KEYS[2], ARGV[1])
+    end
+    return changed
+    """
+
+    # KEYS: the user's cart, the dirty carts and a guest cart. ARGV: user id, ttl and the
+    # loaded field, then product id and stock pairs. Adds the quantities of the guest cart
+    # to the user's cart, up to the stock of each product, and removes them from the guest
+    # cart. The guest cart is read here, so products added to it meanwhile are not lost:
+    # those without a stock given stay in it. Returns {-1} if the user's cart is not
+    # loaded, else the number of products merged followed by the ones left.
+    merge_script = """
+    if redis.call('EXISTS', KEYS[3]) == 0 then
+        return {0}
+    end
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return {-1}
+    end
+    local stock = {}
+    for i = 4, #ARGV, 2 do
+        stock[ARGV[i]] = tonumber(ARGV[i + 1])
+    end
+    local guest = redis.call('HGETALL', KEYS[3])
+    local result = {0}
+    for i = 1, #guest, 2 do
+        if stock[guest[i]] then
+            local quantity = tonumber(redis.call('HGET', KEYS[1], guest[i]) or '0')
+            local merged_quantity = math.min(quantity + tonumber(guest[i + 1]), stock[guest[i]])
+            if merged_quantity > quantity then
+                redis.call('HSET', KEYS[1], guest[i], merged_quantity)
+                result[1] = result[1] + 1
+            end
+            redis.call('HDEL', KEYS[3], guest[i])
+        elseif guest[i] == ARGV[3] then
+            redis.call('HDEL', KEYS[3], guest[i])
+        else
+            table.insert(result, guest[i])
+        end
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    if result[1] > 0 then
+        redis.call('SADD', KEYS[2], ARGV[1])
+    end
+    return result
+    """
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def get_cart_key(cls, user_id) -> str:
+        return cls.cart_key.format(user_id=user_id)
+
+    @classmethod
+    def load(cls, user_id: uuid.UUID) -> None:
+        items = CartItem.objects.filter(cart__user_id=user_id).values_list("product_id", "quantity")
+        cart_key = cls.get_cart_key(user_id)
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        # HSETNX keeps whatever a concurrent request changed after loading the cart first.
+        for product_id, quantity in items:
+            pipeline.hsetnx(cart_key, str(product_id), quantity)
+        pipeline.hsetnx(cart_key, cls.loaded_field, 1)
+        pipeline.expire(cart_key, cls.cart_ttl)
+        pipeline.execute()
+
+    @classmethod
+    def get_items(cls, user_id: uuid.UUID) -> dict[str, int]:
+        """
+        Product id -> quantity of everything in the user's cart.
+        """
+        cart_key = cls.get_cart_key(user_id)
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.hgetall(cart_key)
+        pipeline.expire(cart_key, cls.cart_ttl)
+        cart, _ = pipeline.execute()
+        if not cart:
+            cls.load(user_id)
+            cart = cls.get_redis_client().hgetall(cart_key)
+        return {
+            product_id.decode(): int(quantity)
+            for product_id, quantity in cart.items()
+            if product_id.decode() != cls.loaded_field
+        }
+
+    @classmethod
+    def get_cart_items(cls, user_id: uuid.UUID, products: Optional[QuerySet] = None) -> list[CartItem]:
+        """
+        The user's cart as unsaved CartItems with their products, in product order, read
+        with one query on `products`. Products deleted since they were added are skipped.
+        """
+        items = cls.get_items(user_id)
+        if not items:
+            return []
+        products = Product.objects.all() if products is None else products
+        return [
+            CartItem(product=product, quantity=items[str(product.id)])
+            for product in products.filter(id__in=items.keys())
+        ]
+
+    @classmethod
+    def change(cls, user_id: uuid.UUID, quantities: dict, only_existing: bool = False) -> int:
+        """
+        Sets the quantity of every product in `quantities` (product id -> quantity), 0
+        removing it. With `only_existing` products not in the cart are left out. Returns
+        the number of products changed.
+        """
+        script = cls.get_redis_client().register_script(cls.change_script)
+        keys = [cls.get_cart_key(user_id), *([cls.dirty_key] if cls.dirty_key else [])]
+        args = [str(user_id), cls.cart_ttl, int(only_existing)]
+        for product_id, quantity in quantities.items():
+            args.extend([str(product_id), quantity])
+
+        changed = script(keys=keys, args=args)
+        if changed < 0:
+            cls.load(user_id)
+            changed = script(keys=keys, args=args)
+        return changed
+
+    @classmethod
+    def set_quantity(cls, user_id: uuid.UUID, product_id: uuid.UUID, quantity: int, only_existing: bool = False) -> bool:
+        return bool(cls.change(user_id, {product_id: quantity}, only_existing))
+
+    @classmethod
+    def remove(cls, user_id: uuid.UUID, product_id: uuid.UUID) -> bool:
+        return bool(cls.change(user_id, {product_id: 0}))
+
+    @classmethod
+    def empty(cls, user_id: uuid.UUID) -> None:
+        cart_key = cls.get_cart_key(user_id)
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.delete(cart_key)
+        pipeline.hset(cart_key, cls.loaded_field, 1)
+        pipeline.expire(cart_key, cls.cart_ttl)
+        if cls.dirty_key:
+            pipeline.sadd(cls.dirty_key, str(user_id))
+        pipeline.execute()
+
+    @classmethod
+    def merge(cls, user_id: uuid.UUID, guest_id: str) -> int:
+        """
+        Moves a guest cart into the user's cart, adding up the quantities of products in
+        both. Like adding them, a product is only merged up to its stock. Every product is
+        moved atomically, and one added to the guest cart while merging is merged too.
+        Returns the number of products merged.
+        """
+        redis_client = cls.get_redis_client()
+        guest_key = GuestCartService.get_cart_key(guest_id)
+        script = redis_client.register_script(cls.merge_script)
+        keys = [cls.get_cart_key(user_id), cls.dirty_key, guest_key]
+        product_ids = [product_id.decode() for product_id in redis_client.hkeys(guest_key)]
+        merged = 0
+        while True:
+            product_ids = [product_id for product_id in product_ids if product_id != cls.loaded_field]
+            # Deleted products get no stock and are dropped from the guest cart.
+            stock = dict.fromkeys(product_ids, 0)
+            if product_ids:
+                products = Product.objects.filter(id__in=product_ids).values_list("id", "quantity")
+                stock.update((str(product_id), quantity) for product_id, quantity in products)
+            args = [str(user_id), cls.cart_ttl, cls.loaded_field]
+            for product_id, quantity in stock.items():
+                args.extend([product_id, quantity])
+
+            count, *product_ids = script(keys=keys, args=args)
+            if count < 0:
+                cls.load(user_id)
+                continue
+            merged += count
+            # Products added to the guest cart after it was read get their stock next.
+            if not product_ids:
+                return merged
+            product_ids = [product_id.decode() for product_id in product_ids]
+
+    @classmethod
+    def pop_dirty(cls, batch_size: int) -> dict[str, dict[str, int]]:
+        redis_client = cls.get_redis_client()
+        user_ids = [user_id.decode() for user_id in redis_client.spop(cls.dirty_key, batch_size)]
+        if not user_ids:
+            return {}
+        pipeline = redis_client.pipeline()
+        for user_id in user_ids:
+            pipeline.hgetall(cls.get_cart_key(user_id))
+        carts = {}
+        for user_id, cart in zip(user_ids, pipeline.execute()):
+            # A cart that expired since it changed has nothing left to write.
+            if cart:
+                carts[user_id] = {
+                    product_id.decode(): int(quantity)
+                    for product_id, quantity in cart.items()
+                    if product_id.decode() != cls.loaded_field
+                }
+        return carts
+
+    @classmethod
+    def flush(cls, batch_size: int = 500) -> int:
+        """
+        Writes the carts changed in Redis to Cart and CartItem. Returns the number of carts
+        written.
+        """
+        flushed = 0
+        while carts := cls.pop_dirty(batch_size):
+            try:
+                flushed += cls.write_carts(carts)
+            except Exception:
+                cls.get_redis_client().sadd(cls.dirty_key, *carts.keys())
+                raise
+        return flushed
+
+    @classmethod
+    def write_carts(cls, carts: dict[str, dict[str, int]]) -> int:
+        with transaction.atomic():
+            # Carts of deleted users and items of deleted products are dropped.
+            user_ids = {str(user_id) for user_id in User.objects.filter(
+                id__in=carts.keys()).values_list("id", flat=True)}
+            product_ids = {str(product_id) for product_id in Product.objects.filter(
+                id__in={product_id for items in carts.values() for product_id in items}
+            ).values_list("id", flat=True)}
+            carts = {
+                user_id: {product_id: quantity for product_id, quantity in items.items() if product_id in product_ids}
+                for user_id, items in carts.items()
+                if user_id in user_ids
+            }
+            if not carts:
+                return 0
+
+            # The cart rows are locked, in one order, so writes of the same cart from the
+            # flush and elsewhere take turns instead of interleaving their items.
+            locked_carts = Cart.objects.select_for_update().order_by("id").values_list("user_id", "id")
+            cart_ids = {
+                str(user_id): cart_id for user_id, cart_id in locked_carts.filter(user_id__in=carts.keys())
+            }
+            if missing := [user_id for user_id in carts.keys() if user_id not in cart_ids]:
+                # A cart created concurrently is left in place and locked with the new ones.
+                Cart.objects.bulk_create([Cart(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+                cart_ids.update({
+                    str(user_id): cart_id for user_id, cart_id in locked_carts.filter(user_id__in=missing)
+                })
+
+            # Items are upserted on (cart, product), so only products no longer in a cart
+            # are deleted.
+            CartItem.objects.filter(reduce(operator.or_, [
+                Q(cart_id=cart_ids[user_id]) & ~Q(product_id__in=items.keys())
+                if items else Q(cart_id=cart_ids[user_id])
+                for user_id, items in carts.items()
+            ])).delete()
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart_id=cart_ids[user_id], product_id=product_id, quantity=quantity)
+                    for user_id, items in carts.items()
+                    for product_id, quantity in items.items()
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+            Cart.objects.filter(id__in=cart_ids.values()).update(total_items=Case(
+                *[
+                    When(id=cart_ids[user_id], then=Value(sum(items.values())))
+                    for user_id, items in carts.items()
+                ],
+                default=F("total_items"),
+            ))
+        return len(carts)
+
+    @classmethod
+    def get_summary(cls, owner_id) -> dict:
+        """
+        Number of products, total quantity and total price of the cart, counted from the
+        cart in Redis with one aggregate query over its products. Nothing is written.
+        """
+        items = cls.get_items(owner_id)
+        if not items:
+            return {"total_items": 0, "total_quantity": 0, "total_price": Decimal(0)}
+        quantities = Case(
+            *[When(id=product_id, then=Value(quantity)) for product_id, quantity in items.items()],
+            output_field=IntegerField(),
+        )
+        summary = Product.objects.filter(id__in=items.keys()).aggregate(
+            total_items=Count("id"),
+            total_quantity=Sum(quantities),
+            # Prices are rounded to cents per product.
+            total_price=Sum(
+                Cast("price", DecimalField(max_digits=12, decimal_places=2)) * quantities,
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        return {
+            "total_items": summary["total_items"],
+            "total_quantity": summary["total_quantity"] or 0,
+            "total_price": summary["total_price"] or Decimal(0),
+        }
+
+
+class GuestCartService(CartService):
+    """
+    Carts of visitors who are not signed in. They live only in Redis, under a random guest
+    id kept in a signed cookie, and are merged into the user's cart on login.
+    """
+
+    cart_key = "guest_cart:{guest_id}"
+    dirty_key = None
+    cart_ttl = 3 * 24 * 60 * 60
+    cookie_name = "guest_cart"
+    cookie_salt = "cart.services.GuestCartService"
+
+    @classmethod
+    def get_cart_key(cls, guest_id) -> str:
+        return cls.cart_key.format(guest_id=guest_id)
+
+    @classmethod
+    def load(cls, guest_id: str) -> None:
+        cart_key = cls.get_cart_key(guest_id)
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.hsetnx(cart_key, cls.loaded_field, 1)
+        pipeline.expire(cart_key, cls.cart_ttl)
+        pipeline.execute()
+
+    @classmethod
+    def new_guest_id(cls) -> str:
+        return uuid.uuid4().hex
+
+    @classmethod
+    def get_guest_id(cls, request) -> Optional[str]:
+        return request.get_signed_cookie(cls.cookie_name, default=None, salt=cls.cookie_salt, max_age=cls.cart_ttl)
+
+    @classmethod
+    def set_cookie(cls, request, response, guest_id: str) -> None:
+        response.set_signed_cookie(
+            cls.cookie_name,
+            guest_id,
+            salt=cls.cookie_salt,
+            max_age=cls.cart_ttl,
+            secure=request.is_secure(),
+            httponly=True,
+            samesite="Lax",
+        )
+
+    @classmethod
+    def merge_into_user(cls, user_id: uuid.UUID, request, response) -> int:
+        """
+        Merges the guest cart of the request, if any, into the cart of the user who just
+        signed in and drops the guest cookie. Returns the number of products merged.
+        """
+        guest_id = cls.get_guest_id(request)
+        if guest_id is None:
+            return 0
+        response.delete_cookie(cls.cookie_name, samesite="Lax")
+        return CartService.merge(user_id, guest_id)
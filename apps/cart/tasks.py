@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from cart.services import CartService
+
+
+@shared_task
+def flush_carts():
+    """
+    Writes the carts changed in Redis to Cart and CartItem.
+    """
+    return CartService.flush()
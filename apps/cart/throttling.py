@@ -0,0 +1,18 @@
+from share.throttling import SlidingWindowThrottle
+
+from .services import GuestCartService
+
+
+class GuestCartThrottle(SlidingWindowThrottle):
+    """
+    Limits how many guest carts one IP can create. Only writes of guests without a guest
+    cart count, as each of them starts a new cart in Redis; signed-in users and guests
+    changing their own cart are not limited.
+    """
+
+    scope = "guest_cart"
+
+    def allow_request(self, request, view) -> bool:
+        if request.user.is_authenticated or GuestCartService.get_guest_id(request) is not None:
+            return True
+        return super().allow_request(request, view)
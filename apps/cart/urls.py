@@ -6,6 +6,7 @@ app_name = 'cart'
 urlpatterns = [
     path("", views.GetItemsView.as_view(), name='get-cart-items'),
     path("add/", views.AddItemView.as_view(), name='add-item'),
+    path("bulk/", views.BulkUpdateItemsView.as_view(), name='bulk-update-items'),
     path('update/', views.UpdateItemQuantityView.as_view(), name='update_item_quantity'),
     path('total/', views.GetCartTotalView.as_view(), name='get-cart-total'),
     path('remove/<uuid:product_id>/', views.RemoveItemView.as_view(), name='remove-item'),
@@ -3,26 +3,55 @@ from rest_framework import exceptions
 from rest_framework.response import Response
 from rest_framework import status, generics, permissions
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
-from .models import Cart, CartItem
-from .serializers import CartItemSerializer
+from .models import CartItem
+from .permissions import GuestOrGeneratedPermission
+from .serializers import CartBulkSerializer, CartItemSerializer
+from .services import CartService, GuestCartService
+from .throttling import GuestCartThrottle
+from product.models import Product
+from product.serializers import ProductSerializer
 from share.permissions import GeneratePermissions
+from share.prefetch import optimize_queryset
 from django.shortcuts import get_object_or_404
 
 
-class GetItemsView(GeneratePermissions, generics.ListAPIView):
+class CartOwnerMixin:
     """
-    Retrieves the items in the cart for the authenticated user.
+    Resolves the cart a request works on: the signed-in user's cart, or the guest cart
+    named by the signed guest cookie. A guest gets a new guest cart, and its cookie, the
+    first time they change it.
     """
 
-    serializer_class = CartItemSerializer
+    permission_classes = [GuestOrGeneratedPermission]
+    new_guest_id = None
+
+    def get_cart(self, create=False):
+        if self.request.user.is_authenticated:
+            return CartService, self.request.user.id
+        guest_id = GuestCartService.get_guest_id(self.request)
+        if guest_id is None and create:
+            guest_id = self.new_guest_id = GuestCartService.new_guest_id()
+        return GuestCartService, guest_id
+
+    def get_cart_items(self):
+        cart_service, owner_id = self.get_cart()
+        if owner_id is None:
+            return []
+        return cart_service.get_cart_items(owner_id, optimize_queryset(Product.objects.all(), ProductSerializer))
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.new_guest_id is not None and response.status_code < 400:
+            GuestCartService.set_cookie(request, response, self.new_guest_id)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class GetItemsView(CartOwnerMixin, GeneratePermissions, generics.ListAPIView):
+    """
+    Retrieves the items in the cart for the authenticated user or guest.
+    """
 
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart).order_by('product')
+    serializer_class = CartItemSerializer
+    queryset = CartItem.objects.all()
 
     @extend_schema(
         responses={200: CartItemSerializer(many=True)},
@@ -30,7 +59,7 @@ class GetItemsView(GeneratePermissions, generics.ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         try:
-            cart_items = self.get_queryset()
+            cart_items = self.get_cart_items()
             serializer = self.get_serializer(cart_items, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except exceptions.PermissionDenied as e:
@@ -46,20 +75,14 @@ class GetItemsView(GeneratePermissions, generics.ListAPIView):
             )
 
 
-class AddItemView(GeneratePermissions, generics.CreateAPIView):
+class AddItemView(CartOwnerMixin, GeneratePermissions, generics.CreateAPIView):
     """
-    Adds an item to the cart for the authenticated user.
+    Adds an item to the cart for the authenticated user or guest.
     """
 
     serializer_class = CartItemSerializer
-
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
-
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart)
+    queryset = CartItem.objects.all()
+    throttle_classes = [GuestCartThrottle]
 
     @extend_schema(
         request=CartItemSerializer,
@@ -70,35 +93,56 @@ class AddItemView(GeneratePermissions, generics.CreateAPIView):
         tags=['cart']
     )
     def post(self, request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return Response(
-                {'detail': 'User is not authenticated'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        serializer = self.get_serializer(data=request.data, context={'request': request})
+        serializer = self.get_serializer(
+            data=request.data, context={'request': request, 'cart': self.get_cart(create=True)}
+        )
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
 
-        cart_items = self.get_queryset().order_by('product')
-        result = CartItemSerializer(cart_items, many=True).data
+        result = CartItemSerializer(self.get_cart_items(), many=True).data
 
         return Response(result, status=status.HTTP_201_CREATED)
 
 
-class UpdateItemQuantityView(GeneratePermissions, APIView):
+class BulkUpdateItemsView(CartOwnerMixin, GeneratePermissions, generics.CreateAPIView):
     """
-    Updates the quantity of a specific item in the cart for the authenticated user.
+    Sets the quantity of many products in the cart of the authenticated user or guest at once,
+    e.g. to restore a cart. A quantity of 0 removes the product.
     """
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
+    serializer_class = CartBulkSerializer
+    queryset = CartItem.objects.all()
+    throttle_classes = [GuestCartThrottle]
+
+    @extend_schema(
+        request=CartBulkSerializer,
+        responses={
+            200: CartItemSerializer(many=True),
+            400: OpenApiExample('Bad Request', value={'error': 'Not enough of these items in stock'})
+        },
+        tags=['cart']
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data, context={'request': request, 'cart': self.get_cart(create=True)}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        # Every operation is applied to the cart at once
+        serializer.save()
+
+        result = CartItemSerializer(self.get_cart_items(), many=True).data
+
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class UpdateItemQuantityView(CartOwnerMixin, GeneratePermissions, APIView):
+    """
+    Updates the quantity of a specific item in the cart for the authenticated user or guest.
+    """
 
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart)
+    queryset = CartItem.objects.all()
 
     @extend_schema(
         request=CartItemSerializer,
@@ -110,98 +154,63 @@ class UpdateItemQuantityView(GeneratePermissions, APIView):
         tags=['cart']
     )
     def patch(self, request, *args, **kwargs):
-        user = request.user
+        cart_service, owner_id = self.get_cart()
         product_id = request.data.get('product_id')
         new_quantity = request.data.get('quantity')
 
-        if not user.is_authenticated:
-            return Response(
-                {'detail': 'User is not authenticated'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         if not product_id or new_quantity is None:
             return Response(
                 {'detail': 'Product ID and quantity are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get the cart for the authenticated user
-        cart, _ = Cart.objects.get_or_create(user=user)
-
-        # Retrieve the specific cart item or return a 404 error if not found
-        cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
-
         if new_quantity <= 0:
             return Response(
                 {'detail': 'Quantity must be greater than zero'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update the quantity of the cart item
-        cart_item.quantity = new_quantity
-        cart_item.save()
+        # Only a product already in the cart is updated, otherwise it is a 404
+        if owner_id is None or not cart_service.set_quantity(owner_id, product_id, new_quantity, only_existing=True):
+            raise exceptions.NotFound('Cart item not found')
 
         # Serialize the updated cart item
+        cart_item = CartItem(product=get_object_or_404(Product, id=product_id), quantity=new_quantity)
         serializer = CartItemSerializer(cart_item)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class GetCartTotalView(GeneratePermissions, APIView):
+class GetCartTotalView(CartOwnerMixin, GeneratePermissions, APIView):
     """
-    Retrieves the total cost of the cart for the authenticated user.
+    Retrieves the total cost of the cart for the authenticated user or guest.
     """
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
-
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart)
+    queryset = CartItem.objects.all()
 
     @extend_schema(
         responses={200: {'type': 'object', 'properties': {'total': {'type': 'number'}}}},
     )
     def get(self, request):
-        try:
-            cart = Cart.objects.get(user=request.user)
-            cart_items = CartItem.objects.filter(cart=cart)
+        cart_service, owner_id = self.get_cart()
+        summary = cart_service.get_summary(owner_id) if owner_id else {
+            'total_items': 0, 'total_quantity': 0, 'total_price': 0,
+        }
 
-            total_quantity = sum(item.quantity for item in cart_items)
-            total_price = sum(item.quantity * item.product.price for item in cart_items)
+        data = {
+            'total_items': summary['total_items'],
+            'total_quantity': summary['total_quantity'],
+            'total_price': float(summary['total_price']),
+        }
+        return Response(data, status=status.HTTP_200_OK)
 
-            data = {
-                'total_items': cart_items.count(),
-                'total_quantity': total_quantity,
-                'total_price': total_price,
-            }
-            return Response(data, status=status.HTTP_200_OK)
-        except Cart.DoesNotExist:
-            return Response({'error': 'Cart not found'}, status=status.HTTP_404_NOT_FOUND)
 
-
-class RemoveItemView(GeneratePermissions, generics.DestroyAPIView):
+class RemoveItemView(CartOwnerMixin, GeneratePermissions, generics.DestroyAPIView):
     """
-    Removes an item from the cart for the authenticated user.
+    Removes an item from the cart for the authenticated user or guest.
     """
     serializer_class = CartItemSerializer
-
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
-
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart)
-
-    def get_object(self):
-        user = self.request.user
-        product_id = self.kwargs.get('product_id')
-        cart = get_object_or_404(Cart, user=user)
-        cart_item = get_object_or_404(CartItem, cart=cart, product_id=product_id)
-        return cart_item
+    queryset = CartItem.objects.all()
 
     @extend_schema(
         responses={204: None},
@@ -209,12 +218,9 @@ class RemoveItemView(GeneratePermissions, generics.DestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         try:
-            cart_item = self.get_object()
-            cart_item.delete()
-
-            cart = cart_item.cart
-            cart.total_items = CartItem.objects.filter(cart=cart).count()
-            cart.save()
+            cart_service, owner_id = self.get_cart()
+            if owner_id is None or not cart_service.remove(owner_id, self.kwargs.get('product_id')):
+                raise exceptions.NotFound('Cart item not found')
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except exceptions.NotFound as e:
@@ -230,18 +236,12 @@ class RemoveItemView(GeneratePermissions, generics.DestroyAPIView):
             )
 
 
-class EmptyCartView(GeneratePermissions, generics.DestroyAPIView):
+class EmptyCartView(CartOwnerMixin, GeneratePermissions, generics.DestroyAPIView):
     """
-    Empties the cart for the authenticated user.
+    Empties the cart for the authenticated user or guest.
     """
 
-    def get_queryset(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return CartItem.objects.none()
-
-        cart, _ = Cart.objects.get_or_create(user=user)
-        return CartItem.objects.filter(cart=cart)
+    queryset = CartItem.objects.all()
 
     @extend_schema(
         responses={204: None},
@@ -249,13 +249,9 @@ class EmptyCartView(GeneratePermissions, generics.DestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         try:
-            user = request.user
-            cart = get_object_or_404(Cart, user=user)
-
-            cart.items.all().delete()
-
-            cart.total_items = 0
-            cart.save()
+            cart_service, owner_id = self.get_cart()
+            if owner_id is not None:
+                cart_service.empty(owner_id)
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
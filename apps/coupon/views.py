@@ -9,6 +9,7 @@ from .models import Coupon
 
 
 class CouponListView(GeneratePermissions, generics.ListCreateAPIView):
+    queryset = Coupon.objects.all()
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -61,6 +62,7 @@ class ApplyCouponView(views.APIView):
 
 class CouponDetailView(GeneratePermissions, generics.RetrieveUpdateDestroyAPIView):
     http_method_names = ['patch', 'delete']
+    queryset = Coupon.objects.all()
 
     def get_serializer_class(self):
         if self.request.method == 'DELETE':
@@ -12,5 +12,13 @@ class Notification(BaseModel):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
 
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [
+            models.Index(
+                models.F("user"), models.F("created_at").desc(nulls_last=True), models.F("id").desc(),
+                name="notification_user_keyset_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.full_name} - {self.type}"
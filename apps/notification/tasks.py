@@ -1,7 +1,7 @@
 from celery import shared_task
 from notification.models import Notification
 from django.contrib.auth import get_user_model
-from user.tasks import send_email
+from user.tasks import send_notification_email
 
 User = get_user_model()
 
@@ -20,7 +20,7 @@ def send_notification_task(user_id: int, notification_type: str, message: str):
             message=message,
         )
 
-        send_email.delay(user.email, notification.message)
+        send_notification_email.delay(user.email, notification.message)
 
     except User.DoesNotExist:
         print(f"User with ID {user_id} does not exist.")
@@ -1,11 +1,14 @@
 from rest_framework import generics
 from .models import Notification
 from .serializers import NotificationSerializer, NotificationUpdateSerializer
+from share.pagination import KeysetPagination
 from share.permissions import GeneratePermissions
 
 
 class NotificationListView(GeneratePermissions, generics.ListAPIView):
     serializer_class = NotificationSerializer
+    queryset = Notification.objects.all()
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
@@ -15,6 +18,7 @@ class NotificationListView(GeneratePermissions, generics.ListAPIView):
 
 class RetrieveUpdateView(GeneratePermissions, generics.RetrieveUpdateAPIView):
     http_method_names = ['get', 'patch']
+    queryset = Notification.objects.all()
     lookup_field = 'pk'
 
     def get_serializer_class(self):
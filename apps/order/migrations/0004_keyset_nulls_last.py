@@ -0,0 +1,26 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("order", "0003_order_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="order",
+            name="order_user_keyset_idx",
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                models.F("user"),
+                models.OrderBy(models.F("created_at"), descending=True, nulls_last=True),
+                models.OrderBy(models.F("id"), descending=True),
+                name="order_user_keyset_idx",
+            ),
+        ),
+    ]
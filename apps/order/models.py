@@ -30,6 +30,14 @@ class Order(BaseModel):
     transaction_id = models.CharField(max_length=200, null=True, blank=True)
     is_paid = models.BooleanField(default=False)
 
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [
+            models.Index(
+                models.F("user"), models.F("created_at").desc(nulls_last=True), models.F("id").desc(),
+                name="order_user_keyset_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.user}"
 
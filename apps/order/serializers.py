@@ -1,7 +1,13 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import Sum
 from rest_framework import serializers
 from .models import Order, OrderItem
 from product.serializers import ProductSerializer
-from cart.models import Cart
+from product.services import InventoryService
+from user.models import User
+from cart.services import CartService
 from .countries import Countries
 from share.enums import PaymentProvider
 
@@ -65,32 +71,46 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        total_price = 0
         user = self.context['request'].user
+        order_id = uuid.uuid4()
 
         try:
-            cart = Cart.objects.get(user=user)
-        except Cart.DoesNotExist:
-            raise serializers.ValidationError('The cart is empty or does not exist.')
-
-        cart_products = cart.items.all()
-
-        if not cart_products.exists():
-            raise serializers.ValidationError('The cart cannot be empty.')
-
-        if Order.objects.filter(user=user, status='pending').exists():
-            raise serializers.ValidationError('You have an unconfirmed order, please complete.')
-
-        order = Order.objects.create(**validated_data)
-
-        for cart_item in cart_products:
-            quantity = cart_item.quantity
-            price = cart_item.product.price * quantity
-            total_price += price
-
-            OrderItem.objects.create(order=order, product=cart_item.product, quantity=quantity, price=price)
-
-        order.amount = total_price
-        order.save()
+            with transaction.atomic():
+                # Concurrent checkouts of one user queue up on the user row.
+                User.objects.select_for_update().values_list('pk', flat=True).get(pk=user.pk)
+                cart_items = CartService.get_cart_items(user.id)
+
+                if not cart_items:
+                    raise serializers.ValidationError('The cart cannot be empty.')
+
+                if Order.objects.filter(user=user, status='pending').exists():
+                    raise serializers.ValidationError('You have an unconfirmed order, please complete.')
+
+                # Stock is held in Redis until the order is paid or canceled, product rows are not locked.
+                lacking = InventoryService.reserve(
+                    order_id,
+                    {cart_item.product_id: cart_item.quantity for cart_item in cart_items},
+                    settings.INVENTORY_HOLD_TTL,
+                )
+                if lacking is not None:
+                    product = next(item.product for item in cart_items if str(item.product_id) == lacking)
+                    raise serializers.ValidationError(f'Not enough of "{product.title}" in stock.')
+
+                order = Order.objects.create(id=order_id, **validated_data)
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product=cart_item.product,
+                        quantity=cart_item.quantity,
+                        price=cart_item.product.price * cart_item.quantity,
+                    )
+                    for cart_item in cart_items
+                ])
+
+                order.amount = order.order_items.aggregate(amount=Sum('price'))['amount']
+                Order.objects.filter(pk=order.pk).update(amount=order.amount)
+        except Exception:
+            InventoryService.release(order_id)
+            raise
 
         return order
@@ -0,0 +1,53 @@
+from django.db import transaction
+
+from order.models import Order
+from product.services import InventoryService
+from share.enums import OrderStatus
+
+
+class OrderService:
+    @classmethod
+    def mark_paid(cls, order_id) -> bool:
+        """
+        Commits the stock hold of a pending order and marks it paid. The order row is locked
+        meanwhile, so expire_reservations cannot cancel it and release its hold in between.
+        Returns False, changing nothing, when the order is no longer pending or holds no
+        stock, e.g. because its hold expired.
+        """
+        with transaction.atomic():
+            if not Order.objects.select_for_update().filter(pk=order_id, status=OrderStatus.PENDING.value).exists():
+                return False
+            if not InventoryService.commit(order_id):
+                return False
+            Order.objects.filter(pk=order_id, status=OrderStatus.PENDING.value).update(
+                status=OrderStatus.PAID.value, is_paid=True
+            )
+        return True
+
+    @classmethod
+    def expire_reservations(cls, batch_size: int = 500) -> int:
+        """
+        Cancels the pending orders whose stock hold ran out and releases their holds.
+        An order paid in the meantime commits its hold instead. Returns the number of
+        orders canceled.
+        """
+        canceled = 0
+        while order_ids := InventoryService.get_expired(batch_size):
+            with transaction.atomic():
+                pending = {
+                    str(order_id) for order_id in Order.objects.select_for_update().filter(
+                        id__in=order_ids, status=OrderStatus.PENDING.value
+                    ).values_list("id", flat=True)
+                }
+                canceled += Order.objects.filter(id__in=pending).update(status=OrderStatus.CANCELED.value)
+                paid = {
+                    str(order_id) for order_id in Order.objects.filter(
+                        id__in=order_ids, status=OrderStatus.PAID.value
+                    ).values_list("id", flat=True)
+                }
+            for order_id in order_ids:
+                if order_id in paid:
+                    InventoryService.commit(order_id)
+                else:
+                    InventoryService.release(order_id)
+        return canceled
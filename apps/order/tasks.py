@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from order.services import OrderService
+
+
+@shared_task
+def expire_reservations():
+    """
+    Cancels pending orders whose stock hold has expired and gives the stock back.
+    """
+    return OrderService.expire_reservations()
@@ -3,13 +3,16 @@ from rest_framework.response import Response
 from .models import Order
 from .serializers import OrderCreateSerializer, OrderSerializer
 
+from share.pagination import KeysetPagination
 from share.permissions import GeneratePermissions
+from share.prefetch import PrefetchPlannerMixin, optimize_queryset
 
 from core import settings
 
 
-class OrderListView(GeneratePermissions, generics.ListAPIView):
+class OrderListView(GeneratePermissions, PrefetchPlannerMixin, generics.ListAPIView):
     queryset = Order.objects.all()
+    pagination_class = KeysetPagination
 
     def get_serializer_class(self):
         return OrderSerializer
@@ -38,10 +41,11 @@ class CheckoutCreateView(GeneratePermissions, generics.CreateAPIView):
 
         order = serializer.save(user=request.user)
 
+        order = optimize_queryset(Order.objects.filter(pk=order.pk), OrderSerializer).get()
         return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
-class OrderDetailView(GeneratePermissions, generics.RetrieveAPIView):
+class OrderDetailView(GeneratePermissions, PrefetchPlannerMixin, generics.RetrieveAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     lookup_field = 'pk'
@@ -54,8 +58,9 @@ class OrderDetailView(GeneratePermissions, generics.RetrieveAPIView):
             return None
 
 
-class OrderHistoryView(GeneratePermissions, generics.ListAPIView):
+class OrderHistoryView(GeneratePermissions, PrefetchPlannerMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
+    queryset = Order.objects.all()
 
     def get_queryset(self):
         """Override to filter orders by the authenticated user."""
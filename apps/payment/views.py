@@ -5,8 +5,11 @@ from django.conf import settings
 from share.permissions import GeneratePermissions
 from .serializers import PaymentConfirmSerializer, PaymentStatusSerializer, PaymentCreateSerializer, \
     PaymentSuccessSerializer
+from cart.services import CartService
 from order.models import Order
-from share.enums import PaymentProvider
+from order.services import OrderService
+from product.services import InventoryService
+from share.enums import OrderStatus, PaymentProvider
 
 stripe.api_key = settings.STRIPE_TEST_SECRET_KEY
 
@@ -97,11 +100,15 @@ class PaymentConfirmView(GeneratePermissions, generics.UpdateAPIView):
             intent = stripe.PaymentIntent.confirm(transaction_id)
             if intent.get('status') != 'succeeded':
                 return Response({'status': intent.get('status')}, status=status.HTTP_400_BAD_REQUEST)
-            instance.status = 'paid'
-            instance.save()
 
-            if hasattr(request.user, 'cart'):
-                request.user.cart.items.all().delete()
+            if not OrderService.mark_paid(instance.id):
+                stripe.Refund.create(payment_intent=transaction_id)
+                return Response(
+                    {'detail': 'Order reservation has expired, the payment was refunded.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            CartService.empty(request.user.id)
 
             return Response({'status': intent.get('status')}, status=status.HTTP_200_OK)
         except stripe.error.StripeError as e:
@@ -142,8 +149,12 @@ class PaymentCancelView(GeneratePermissions, generics.UpdateAPIView):
         if instance.status in ['paid', 'shipped', 'delivered']:
             return Response({'detail': 'Order cannot be canceled.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        instance.status = 'canceled'
-        instance.save()
+        canceled = Order.objects.filter(pk=instance.pk, status=OrderStatus.PENDING.value).update(
+            status=OrderStatus.CANCELED.value
+        )
+        if not canceled:
+            return Response({'detail': 'Order cannot be canceled.'}, status=status.HTTP_400_BAD_REQUEST)
+        InventoryService.release(instance.id)
 
         return Response({'detail': 'Order successfully canceled.'}, status=status.HTTP_200_OK)
 
@@ -221,9 +232,12 @@ class PaymentSuccessView(GeneratePermissions, generics.UpdateAPIView):
         checkout_session = stripe.checkout.Session.retrieve(instance.transaction_id)
 
         if checkout_session['payment_status'] == 'paid':
-            instance.status = 'paid'
-            instance.is_paid = True
-            instance.save()
+            if not OrderService.mark_paid(instance.id):
+                stripe.Refund.create(payment_intent=checkout_session['payment_intent'])
+                return Response(
+                    {'detail': 'Order reservation has expired, the payment was refunded.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             return Response({'detail': 'Order updated successfully.'}, status=status.HTTP_200_OK)
 
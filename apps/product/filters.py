@@ -1,5 +1,8 @@
 from django_filters import rest_framework as filters
+from rest_framework import filters as drf_filters
+
 from .models import Product
+from .services import ProductService
 
 
 class ProductFilter(filters.FilterSet):
@@ -19,3 +22,12 @@ class ProductFilter(filters.FilterSet):
             except Product.DoesNotExist:
                 return queryset.none()
         return queryset
+
+
+class ProductSearchFilter(drf_filters.SearchFilter):
+    """
+    `search` backed by the product full-text index instead of ILIKE over search_fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return ProductService.search(queryset, self.get_search_terms(request))
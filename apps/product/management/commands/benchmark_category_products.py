@@ -0,0 +1,120 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+
+from product.models import Category, Product
+from product.services import ProductService
+from user.models import User
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compare MPTT range filtering against naive recursion for descendant category products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--levels', type=int, default=5)
+        parser.add_argument('--branching', type=int, default=10)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            root = self.create_tree(options['levels'], options['branching'])
+            self.create_products(options['products'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE product_category')
+                cursor.execute('ANALYZE product_product')
+
+            self.stdout.write(f"{Category.objects.count()} categories, {Product.objects.count()} products")
+            targets = [root, Category.objects.filter(level=options['levels'] // 2).first()]
+            for category in targets:
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"Category at level {category.level} ({category.get_descendant_count()} descendants)"
+                ))
+                range_result = self.measure(self.mptt_range, category, options['repeat'])
+                naive_result = self.measure(self.naive_recursion, category, options['repeat'])
+                assert range_result[2][0] == naive_result[2][0], "Both strategies must count the same products"
+                self.report('MPTT range', *range_result)
+                self.report('Naive recursion', *naive_result)
+            transaction.set_rollback(True)
+
+    def create_tree(self, levels, branching):
+        categories = []
+        counter = 0
+
+        def build(parent, level):
+            nonlocal counter
+            counter += 1
+            category = Category(
+                name=f"category-{counter}", parent=parent, tree_id=1, level=level, lft=counter
+            )
+            categories.append(category)
+            if level + 1 < levels:
+                for _ in range(branching):
+                    build(category, level + 1)
+            counter += 1
+            category.rght = counter
+            return category
+
+        tree_id = (Category.objects.order_by('-tree_id').values_list('tree_id', flat=True).first() or 0) + 1
+        root = build(None, 0)
+        for category in categories:
+            category.tree_id = tree_id
+        Category.objects.bulk_create(categories, batch_size=2000)
+        return root
+
+    def create_products(self, count):
+        seller = User.objects.create(email='benchmark-seller@example.com', first_name='Bench', last_name='Mark')
+        leaves = list(Category.objects.filter(rght=F('lft') + 1).values_list('id', flat=True))
+        Product.objects.bulk_create(
+            [
+                Product(seller=seller, category_id=leaves[index % len(leaves)], title=f"product-{index}")
+                for index in range(count)
+            ],
+            batch_size=2000,
+        )
+
+    @staticmethod
+    def mptt_range(category):
+        products = ProductService.get_category_products(category, include_descendants=True)
+        return products.count(), list(products.values_list('id', flat=True)[:10])
+
+    @staticmethod
+    def naive_recursion(category):
+        def collect(node):
+            ids = [node.id]
+            for child in Category.objects.filter(parent=node):
+                ids.extend(collect(child))
+            return ids
+
+        products = Product.objects.filter(category_id__in=collect(category))
+        return products.count(), list(products.values_list('id', flat=True)[:10])
+
+    @staticmethod
+    def measure(strategy, category, repeat):
+        timings = []
+        for _ in range(repeat):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                result = strategy(category)
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings, counter.count, result
+
+    def report(self, name, timings, queries, result):
+        self.stdout.write(
+            f"  {name:<16} median {statistics.median(timings):9.2f} ms   "
+            f"max {max(timings):9.2f} ms   {queries:6d} queries   {result[0]} products"
+        )
@@ -0,0 +1,63 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from redis import Redis
+
+from product.services import InventoryService
+
+
+class Command(BaseCommand):
+    help = 'Measure stock reservations/sec against one hot product held in Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=20000)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--stock', type=int, default=15000)
+        parser.add_argument('--redis-url', default=settings.REDIS_URL)
+
+    def handle(self, *args, **options):
+        redis_client = Redis.from_url(options['redis_url'], max_connections=options['threads'] * 2)
+
+        class BenchmarkInventoryService(InventoryService):
+            hold_key = "inventory:benchmark:hold:{order_id}"
+            holds_key = "inventory:benchmark:holds"
+
+            @classmethod
+            def get_redis_client(cls):
+                return redis_client
+
+        # A product that does not exist in the database: its stock is set directly.
+        product_id = uuid.uuid4()
+        product_key = BenchmarkInventoryService.get_product_key(product_id)
+        redis_client.hset(product_key, 'stock', options['stock'])
+        order_ids = [uuid.uuid4() for _ in range(options['reservations'])]
+
+        def reserve(order_id):
+            started = time.perf_counter()
+            lacking = BenchmarkInventoryService.reserve(order_id, {product_id: 1}, 60)
+            return lacking is None, (time.perf_counter() - started) * 1000
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(reserve, order_ids))
+            elapsed = time.perf_counter() - started
+        finally:
+            redis_client.delete(
+                product_key,
+                BenchmarkInventoryService.holds_key,
+                *[BenchmarkInventoryService.hold_key.format(order_id=order_id) for order_id in order_ids],
+            )
+
+        timings = [timing for _, timing in results]
+        reserved = sum(1 for held, _ in results if held)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        self.stdout.write(
+            f"  {len(results)} reservations on {options['threads']} threads: {len(results) / elapsed:8.0f}/s   "
+            f"p50 {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms   "
+            f"{reserved} held, {len(results) - reserved} refused (stock {options['stock']})"
+        )
@@ -0,0 +1,85 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from product.models import Category, Product
+from product.services import ProductService
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text product search against the ILIKE search it replaces'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--terms', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = sorted({
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(5000)
+        })
+
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            self.create_products(options['products'], vocabulary, rng)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE product_product')
+            self.stdout.write(f"{Product.objects.count()} products")
+
+            terms = rng.sample(vocabulary, options['terms'])
+            full_text = self.measure(self.full_text, terms, options['repeat'])
+            ilike = self.measure(self.ilike, terms, options['repeat'])
+            self.report('Full-text (GIN)', full_text)
+            self.report('ILIKE', ilike)
+            transaction.set_rollback(True)
+
+    def create_products(self, count, vocabulary, rng, batch_size=5000):
+        seller = User.objects.create(email='benchmark-seller@example.com', first_name='Bench', last_name='Mark')
+        category = Category.objects.create(name='benchmark')
+        for start in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    seller=seller,
+                    category=category,
+                    title=' '.join(rng.choices(vocabulary, k=3)),
+                    description=' '.join(rng.choices(vocabulary, k=30)),
+                )
+                for _ in range(min(batch_size, count - start))
+            ])
+
+    @staticmethod
+    def full_text(term):
+        return ProductService.search(Product.objects.all(), [term])
+
+    @staticmethod
+    def ilike(term):
+        # What SearchFilter builds for search_fields = ("title", "description").
+        return Product.objects.filter(Q(title__icontains=term) | Q(description__icontains=term))
+
+    @staticmethod
+    def measure(strategy, terms, repeat):
+        # One page as LimitOffsetPagination serves it: a COUNT(*) plus the first 10 ids.
+        timings = []
+        for _ in range(repeat):
+            for term in terms:
+                started = time.perf_counter()
+                queryset = strategy(term)
+                queryset.count()
+                list(queryset.values_list('id', flat=True)[:10])
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def report(self, name, timings):
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        self.stdout.write(
+            f"  {name:<16} p50 {statistics.median(timings):9.2f} ms   "
+            f"p95 {p95:9.2f} ms   max {max(timings):9.2f} ms"
+        )
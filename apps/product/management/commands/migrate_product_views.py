@@ -0,0 +1,43 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from product.models import ProductViews
+from product.services import ProductStatsService
+
+
+class Command(BaseCommand):
+    help = 'Fold ProductViews rows into the daily unique-viewer sketches and optionally prune old rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prune', action='store_true', help='Delete the rows older than --keep-days afterwards')
+        parser.add_argument(
+            '--keep-days', type=int, default=30,
+            help='Rows newer than this are kept, the view counter only deduplicates ips against stored rows',
+        )
+
+    def handle(self, *args, **options):
+        # Sketches are merged, so running the command again does not count a viewer twice.
+        rows = (
+            ProductViews.objects.exclude(created_at=None)
+            .order_by('product_id', 'created_at')
+            .values_list('product_id', 'ip', 'created_at')
+        )
+        viewers = {}
+        migrated = written = 0
+        for product_id, ip, created_at in rows.iterator(chunk_size=options['batch_size']):
+            viewers.setdefault((str(product_id), timezone.localdate(created_at)), set()).add(ip)
+            migrated += 1
+            if migrated % options['batch_size'] == 0:
+                written += ProductStatsService.add_viewers(viewers)
+                viewers = {}
+        if viewers:
+            written += ProductStatsService.add_viewers(viewers)
+        self.stdout.write(self.style.SUCCESS(f'{migrated} views migrated into {written} daily sketch updates'))
+
+        if options['prune']:
+            cutoff = timezone.now() - datetime.timedelta(days=options['keep_days'])
+            deleted, _ = ProductViews.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(self.style.SUCCESS(f'{deleted} views older than {cutoff:%Y-%m-%d} pruned'))
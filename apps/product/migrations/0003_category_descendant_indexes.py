@@ -0,0 +1,21 @@
+# Generated by Django 4.2.14 on 2026-10-18 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(fields=["tree_id", "lft", "rght"], name="category_tree_range_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["category", "-created_at"], name="product_category_created_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.14 on 2026-10-18 21:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0003_category_descendant_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductDailyStats",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField()),
+                ("unique_viewers", models.IntegerField(default=0)),
+                ("sketch", models.BinaryField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="product.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Product daily stats",
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="productdailystats",
+            constraint=models.UniqueConstraint(fields=("product", "date"), name="product_daily_stats_unique"),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.14 on 2026-10-18 21:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0004_productdailystats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER product_search_vector_trigger
+                    BEFORE INSERT OR UPDATE OF title, description ON product_product
+                    FOR EACH ROW EXECUTE FUNCTION product_search_vector_update();
+
+                UPDATE product_product SET search_vector =
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(description, '')), 'B');
+            """,
+            reverse_sql="""
+                DROP TRIGGER product_search_vector_trigger ON product_product;
+                DROP FUNCTION product_search_vector_update();
+            """,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.14 on 2026-10-18 21:35
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0005_product_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="category_name_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="product_title_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.14 on 2026-10-18 21:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0006_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-created_at", "-id"], name="product_created_keyset_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-views", "-id"], name="product_views_keyset_idx"),
+        ),
+    ]
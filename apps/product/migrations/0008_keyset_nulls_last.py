@@ -0,0 +1,25 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0007_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="product_created_keyset_idx",
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                models.OrderBy(models.F("created_at"), descending=True, nulls_last=True),
+                models.OrderBy(models.F("id"), descending=True),
+                name="product_created_keyset_idx",
+            ),
+        ),
+    ]
@@ -2,6 +2,8 @@ import uuid
 
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from share.models import BaseModel
 from mptt.models import MPTTModel, TreeForeignKey
 
@@ -31,6 +33,10 @@ class Category(MPTTModel):
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["tree_id", "lft", "rght"], name="category_tree_range_idx"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="category_name_trgm_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -66,6 +72,20 @@ class Product(BaseModel):
     sizes = models.ManyToManyField(Size, related_name="products", blank=True)
     quantity = models.IntegerField(default=1)
     views = models.IntegerField(default=0)
+    # Filled from title and description by the product_search_vector_update trigger.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [
+            models.Index(fields=["category", "-created_at"], name="product_category_created_idx"),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(fields=["title"], opclasses=["gin_trgm_ops"], name="product_title_trgm_idx"),
+            models.Index(
+                models.F("created_at").desc(nulls_last=True), models.F("id").desc(),
+                name="product_created_keyset_idx",
+            ),
+            models.Index(fields=["-views", "-id"], name="product_views_keyset_idx"),
+        ]
 
     def __str__(self):
         return str(f"{self.title} - {self.category}")
@@ -86,3 +106,26 @@ class ProductViews(BaseModel):
     product = models.ForeignKey(
         Product, related_name="product_views", on_delete=models.CASCADE
     )
+
+
+class ProductDailyStats(models.Model):
+    """
+    Unique viewers of a product on one day, rolled up from its Redis HyperLogLog sketch.
+    The raw sketch is kept so that counts over any window can be merged again.
+    """
+    product = models.ForeignKey(
+        Product, related_name="daily_stats", on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    unique_viewers = models.IntegerField(default=0)
+    sketch = models.BinaryField()
+
+    class Meta:
+        verbose_name_plural = "Product daily stats"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "date"], name="product_daily_stats_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.date}: {self.unique_viewers}"
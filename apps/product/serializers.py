@@ -1,9 +1,12 @@
+import datetime
+
 from rest_framework import serializers
 
 from user.models import User
 from user.serializers import UserSerializer
 
 from .models import Category, Product, Image, Color, Size
+from .services import AutocompleteService, CategoryTreeService, ProductStatsService
 
 
 class ImageSerializer(serializers.ModelSerializer):
@@ -24,6 +27,18 @@ class SizeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description']
 
 
+class CategoryNodeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = [
+            'id',
+            'name',
+            'is_active',
+            'created_at',
+            'parent',
+        ]
+
+
 class CategorySerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
 
@@ -39,8 +54,9 @@ class CategorySerializer(serializers.ModelSerializer):
         ]
 
     def get_children(self, obj):
-        children = Category.objects.filter(parent=obj)
-        return CategorySerializer(children, many=True).data
+        if 'category_tree' not in self.context:
+            self.context['category_tree'] = CategoryTreeService.get_tree()
+        return self.context['category_tree'].get_children(obj.id)
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -52,7 +68,7 @@ class ProductSerializer(serializers.ModelSerializer):
         return obj.category.name
 
     def get_image(self, obj):
-        first_image = obj.images.first()
+        first_image = next(iter(obj.images.all()[:1]), None)
         return f"http://127.0.0.1:8000{first_image.image.url}" if first_image else None
 
     class Meta:
@@ -68,6 +84,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'quantity',
             'views'
         ]
+        prefetch_related = ['images']
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -202,3 +219,53 @@ class CreateProductSerializer(serializers.ModelSerializer):
         representation['colors'] = ColorSerializer(instance.colors.all(), many=True).data
         representation['sizes'] = SizeSerializer(instance.sizes.all(), many=True).data
         return representation
+
+
+class ProductStatsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or ProductStatsService.today()
+        start = attrs.get('start') or end - datetime.timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError({'start': "Start date must not be after end date."})
+        if (end - start).days >= ProductStatsService.max_window_days:
+            raise serializers.ValidationError(
+                {'start': f"The window can not be longer than {ProductStatsService.max_window_days} days."}
+            )
+        return {'start': start, 'end': end}
+
+
+class ProductDailyStatsSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    unique_viewers = serializers.IntegerField()
+
+
+class ProductStatsSerializer(serializers.Serializer):
+    product = serializers.UUIDField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    views = serializers.IntegerField()
+    unique_viewers = serializers.IntegerField()
+    daily = ProductDailyStatsSerializer(many=True)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=AutocompleteService.max_query_length)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
+
+
+class ProductSuggestionSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    title = serializers.CharField()
+
+
+class CategorySuggestionSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    products = ProductSuggestionSerializer(many=True)
+    categories = CategorySuggestionSerializer(many=True)
@@ -0,0 +1,719 @@
+import datetime
+import json
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import transaction
+from django.db.models import Case, F, QuerySet, Value, When
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis import Redis
+from rest_framework.utils.encoders import JSONEncoder
+
+from product.models import Category, Product, ProductDailyStats, ProductViews
+
+
+class CategoryTree:
+    """
+    In-memory snapshot of the whole category tree: serialized nodes keyed by id,
+    the ordered child ids of every node and the ordered root ids.
+    """
+
+    def __init__(self, nodes: dict[str, dict], children: dict[str, list[str]], roots: list[str]):
+        self.nodes = nodes
+        self.children = children
+        self.roots = roots
+
+    def __contains__(self, category_id) -> bool:
+        return str(category_id) in self.nodes
+
+    def get_children(self, category_id) -> list[dict]:
+        return [self.get_subtree(child_id) for child_id in self.children.get(str(category_id), [])]
+
+    def get_subtree(self, category_id) -> Optional[dict]:
+        node = self.nodes.get(str(category_id))
+        if node is None:
+            return None
+        return {**node, "children": self.get_children(category_id)}
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"nodes": self.nodes, "children": self.children, "roots": self.roots}, cls=JSONEncoder
+        )
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "CategoryTree":
+        return cls(**json.loads(raw))
+
+
+class CategoryTreeService:
+    version_key = "category_tree:version"
+    snapshot_key = "category_tree:{version}"
+    snapshot_ttl = 60 * 60
+
+    _local: tuple[str, CategoryTree] = None
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def get_version(cls) -> str:
+        redis_client = cls.get_redis_client()
+        version = redis_client.get(cls.version_key)
+        if version is None:
+            redis_client.set(cls.version_key, uuid.uuid4().hex, nx=True)
+            version = redis_client.get(cls.version_key)
+        return version.decode()
+
+    @classmethod
+    def bump_version(cls) -> None:
+        cls.get_redis_client().set(cls.version_key, uuid.uuid4().hex)
+        # A request reading the old rows before commit could have cached them under the new version.
+        transaction.on_commit(lambda: cls.get_redis_client().set(cls.version_key, uuid.uuid4().hex))
+
+    @classmethod
+    def build(cls) -> CategoryTree:
+        from product.serializers import CategoryNodeSerializer
+
+        # Roots and children keep the Category.Meta.ordering of the API, newest first.
+        categories = Category.objects.order_by("-created_at")
+        nodes, children, roots = {}, {}, []
+        for data in CategoryNodeSerializer(categories, many=True).data:
+            category_id = str(data["id"])
+            nodes[category_id] = dict(data)
+            if data["parent"] is None:
+                roots.append(category_id)
+            else:
+                children.setdefault(str(data["parent"]), []).append(category_id)
+        return CategoryTree(nodes, children, roots)
+
+    @classmethod
+    def get_tree(cls) -> CategoryTree:
+        version = cls.get_version()
+        if cls._local is not None and cls._local[0] == version:
+            return cls._local[1]
+
+        redis_client = cls.get_redis_client()
+        key = cls.snapshot_key.format(version=version)
+        raw = redis_client.get(key)
+        if raw is None:
+            raw = cls.build().to_json()
+            redis_client.set(key, raw, ex=cls.snapshot_ttl)
+        tree = CategoryTree.from_json(raw)
+        cls._local = (version, tree)
+        return tree
+
+
+class ProductService:
+    search_config = "english"
+
+    @classmethod
+    def search(cls, queryset: QuerySet, terms: list[str]) -> QuerySet:
+        """
+        Full-text search over the trigger-maintained search_vector, every word matched as
+        a prefix and results ranked by SearchRank (title weighs more than description).
+        """
+        words = [word for term in terms for word in re.findall(r"\w+", term)]
+        if not words:
+            return queryset
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words), search_type="raw", config=cls.search_config
+        )
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", "-created_at")
+        )
+
+    @classmethod
+    def get_category_products(cls, category: Category, include_descendants: bool = False) -> QuerySet:
+        if not include_descendants:
+            return Product.objects.filter(category=category)
+        # Every descendant sits inside the category's (lft, rght) range of the same tree,
+        # so the whole subtree is one range scan on category_tree_range_idx.
+        return Product.objects.filter(
+            category__tree_id=category.tree_id,
+            category__lft__range=(category.lft, category.rght),
+        )
+
+
+class AutocompleteService:
+    """
+    Typo-tolerant title and category name suggestions from the pg_trgm indexes. Results
+    are cached per (query, limit) for a short time, so repeated keystrokes stay in Redis.
+    """
+
+    cache_key = "autocomplete:{limit}:{query}"
+    cache_ttl = 60
+    max_query_length = 64
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        return " ".join(query.lower().split())[:cls.max_query_length]
+
+    @classmethod
+    def suggest(cls, query: str, limit: int = 10) -> dict:
+        query = cls.normalize(query)
+        redis_client = cls.get_redis_client()
+        key = cls.cache_key.format(limit=limit, query=query)
+        raw = redis_client.get(key)
+        if raw is not None:
+            return json.loads(raw)
+
+        suggestions = {
+            "products": cls.match(Product.objects.all(), "title", query, limit),
+            "categories": cls.match(Category.objects.all(), "name", query, limit),
+        }
+        redis_client.set(key, json.dumps(suggestions, cls=JSONEncoder), ex=cls.cache_ttl)
+        return suggestions
+
+    @classmethod
+    def match(cls, queryset: QuerySet, field: str, query: str, limit: int) -> list[dict]:
+        # `<%` (word similarity) is served by the gin_trgm_ops index and also matches
+        # prefixes of a word; prefix matches are ranked before merely similar ones.
+        return list(
+            queryset.filter(**{f"{field}__trigram_word_similar": query})
+            .annotate(
+                is_prefix=Case(When(**{f"{field}__istartswith": query}, then=Value(1)), default=Value(0)),
+                similarity=TrigramWordSimilarity(query, field),
+            )
+            .order_by("-is_prefix", "-similarity", field)
+            .values("id", field)[:limit]
+        )
+
+
+class ProductViewService:
+    """
+    Buffers unique product views in Redis and flushes them to the database in bulk,
+    so a product page never writes to (or locks) the product row.
+    """
+
+    viewers_key = "product:{product_id}:viewers"
+    pending_key = "product:{product_id}:pending_views"
+    counter_key = "product:{product_id}:views"
+    dirty_key = "product_views:dirty"
+    viewers_ttl = 24 * 60 * 60
+
+    # Adds the ip to the product's viewers; a first-time viewer not already stored in
+    # ProductViews (ARGV[6]) is queued for the next flush. The viewers set expires `viewers_ttl` after it was created, not after the
+    # last view, so a busy product does not keep its ips forever. The ip also goes into
+    # the product's daily sketch (see ProductStatsService). Returns the number of views
+    # waiting to be flushed for the product.
+    record_script = """
+    if redis.call('SADD', KEYS[1], ARGV[1]) == 1 and ARGV[6] == '0' then
+        redis.call('SADD', KEYS[2], ARGV[1])
+        redis.call('INCR', KEYS[3])
+        redis.call('SADD', KEYS[4], ARGV[2])
+    end
+    if redis.call('TTL', KEYS[1]) < 0 then
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+    end
+    redis.call('PFADD', KEYS[5], ARGV[1])
+    redis.call('EXPIRE', KEYS[5], ARGV[4])
+    redis.call('SADD', KEYS[6], ARGV[2])
+    redis.call('EXPIRE', KEYS[6], ARGV[4])
+    redis.call('SADD', KEYS[7], ARGV[5])
+    return tonumber(redis.call('GET', KEYS[3]) or '0')
+    """
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def get_keys(cls, product_id) -> tuple[str, str, str]:
+        return (
+            cls.viewers_key.format(product_id=product_id),
+            cls.pending_key.format(product_id=product_id),
+            cls.counter_key.format(product_id=product_id),
+        )
+
+    @classmethod
+    def record_view(cls, product_id: uuid.UUID, ip: str, stored: bool = False) -> int:
+        redis_client = cls.get_redis_client()
+        script = redis_client.register_script(cls.record_script)
+        day = ProductStatsService.today()
+        return script(
+            keys=[*cls.get_keys(product_id), cls.dirty_key, *ProductStatsService.get_keys(product_id, day)],
+            args=[
+                ip, str(product_id), cls.viewers_ttl, ProductStatsService.sketch_ttl, day.isoformat(), int(stored),
+            ],
+        )
+
+    @classmethod
+    def pop_pending(cls, batch_size: int) -> dict[str, set[str]]:
+        redis_client = cls.get_redis_client()
+        product_ids = [product_id.decode() for product_id in redis_client.srandmember(cls.dirty_key, batch_size)]
+        if not product_ids:
+            return {}
+
+        # MULTI makes reading and clearing the buffers atomic against record_view.
+        pipeline = redis_client.pipeline(transaction=True)
+        for product_id in product_ids:
+            _, pending_key, counter_key = cls.get_keys(product_id)
+            pipeline.smembers(pending_key)
+            pipeline.delete(pending_key, counter_key)
+        pipeline.srem(cls.dirty_key, *product_ids)
+        results = pipeline.execute()
+        return {
+            product_id: {ip.decode() for ip in results[index * 2]}
+            for index, product_id in enumerate(product_ids)
+        }
+
+    @classmethod
+    def restore_pending(cls, pending: dict[str, set[str]]) -> None:
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        for product_id, ips in pending.items():
+            _, pending_key, counter_key = cls.get_keys(product_id)
+            pipeline.sadd(pending_key, *ips)
+            pipeline.incrby(counter_key, len(ips))
+            pipeline.sadd(cls.dirty_key, product_id)
+        pipeline.execute()
+
+    @classmethod
+    def flush(cls, batch_size: int = 500) -> int:
+        """
+        Moves buffered views into ProductViews and Product.views. Returns the number of
+        views written.
+        """
+        flushed = 0
+        while pending := cls.pop_pending(batch_size):
+            pending = {product_id: ips for product_id, ips in pending.items() if ips}
+            if not pending:
+                continue
+            try:
+                flushed += cls.write_views(pending)
+            except Exception:
+                cls.restore_pending(pending)
+                raise
+        return flushed
+
+    @classmethod
+    def write_views(cls, pending: dict[str, set[str]]) -> int:
+        all_ips = set().union(*pending.values())
+        with transaction.atomic():
+            # Views of products deleted since they were recorded are dropped.
+            product_ids = {str(product_id) for product_id in Product.objects.filter(
+                id__in=pending.keys()).values_list("id", flat=True)}
+            existing = set(
+                ProductViews.objects.filter(product_id__in=pending.keys(), ip__in=all_ips)
+                .values_list("product_id", "ip")
+            )
+            new_views = [
+                ProductViews(product_id=product_id, ip=ip)
+                for product_id, ips in pending.items()
+                if product_id in product_ids
+                for ip in ips
+                if (uuid.UUID(product_id), ip) not in existing
+            ]
+            ProductViews.objects.bulk_create(new_views, batch_size=1000)
+
+            increments = Counter(str(view.product_id) for view in new_views)
+            if increments:
+                Product.objects.filter(id__in=increments.keys()).update(
+                    views=F("views") + Case(
+                        *[When(id=product_id, then=Value(count)) for product_id, count in increments.items()],
+                        default=Value(0),
+                    )
+                )
+        return len(new_views)
+
+
+class ProductStatsService:
+    """
+    Unique-viewer analytics. Every product gets one HyperLogLog sketch per day in Redis,
+    rollup() merges the sketches into ProductDailyStats, and windows are counted by
+    merging the stored and live sketches of their days.
+    """
+
+    sketch_key = "product:{product_id}:viewers:{day}"
+    day_products_key = "product_stats:{day}:products"
+    days_key = "product_stats:days"
+    temp_key = "product_stats:tmp:{token}:{index}"
+    sketch_ttl = 3 * 24 * 60 * 60
+    temp_ttl = 60
+    max_window_days = 366
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def today(cls) -> datetime.date:
+        return timezone.localdate()
+
+    @classmethod
+    def get_keys(cls, product_id, day: datetime.date) -> tuple[str, str, str]:
+        return (
+            cls.sketch_key.format(product_id=product_id, day=day.isoformat()),
+            cls.day_products_key.format(day=day.isoformat()),
+            cls.days_key,
+        )
+
+    @classmethod
+    def rollup(cls, batch_size: int = 500) -> int:
+        """
+        Saves the live sketches of every recorded day to ProductDailyStats. Days before today
+        are complete and are forgotten once saved. Returns the number of rows written.
+        """
+        redis_client = cls.get_redis_client()
+        today = cls.today()
+        written = 0
+        for day_value in redis_client.smembers(cls.days_key):
+            day = datetime.date.fromisoformat(day_value.decode())
+            products_key = cls.day_products_key.format(day=day.isoformat())
+            product_ids = [product_id.decode() for product_id in redis_client.sscan_iter(products_key)]
+            for start in range(0, len(product_ids), batch_size):
+                written += cls.save_sketches({
+                    (product_id, day): [cls.sketch_key.format(product_id=product_id, day=day.isoformat())]
+                    for product_id in product_ids[start:start + batch_size]
+                })
+            if day < today:
+                pipeline = redis_client.pipeline(transaction=True)
+                pipeline.srem(cls.days_key, day_value)
+                pipeline.delete(products_key)
+                pipeline.execute()
+        return written
+
+    @classmethod
+    def add_viewers(cls, viewers: dict[tuple[str, datetime.date], set[str]]) -> int:
+        """
+        Adds the given ips to the stored sketches of their (product, day). Used to fold
+        ProductViews rows into the analytics.
+        """
+        redis_client = cls.get_redis_client()
+        token = uuid.uuid4().hex
+        sources = {}
+        pipeline = redis_client.pipeline(transaction=False)
+        for index, (key, ips) in enumerate(viewers.items()):
+            temp_key = cls.temp_key.format(token=token, index=index)
+            pipeline.pfadd(temp_key, *ips)
+            pipeline.expire(temp_key, cls.temp_ttl)
+            sources[key] = [temp_key]
+        pipeline.execute()
+        try:
+            return cls.save_sketches(sources)
+        finally:
+            redis_client.delete(*[temp_key for keys in sources.values() for temp_key in keys])
+
+    @classmethod
+    def save_sketches(cls, sources: dict[tuple[str, datetime.date], list[str]]) -> int:
+        """
+        Merges the Redis sketches listed for every (product, day) into the sketch stored for
+        it and upserts the result. Products that no longer exist are skipped.
+        """
+        if not sources:
+            return 0
+        product_ids = {product_id for product_id, _ in sources}
+        stored = {
+            (str(product_id), day): bytes(sketch)
+            for product_id, day, sketch in ProductDailyStats.objects.filter(
+                product_id__in=product_ids, date__in={day for _, day in sources}
+            ).values_list("product_id", "date", "sketch")
+        }
+        existing = {str(product_id) for product_id in Product.objects.filter(
+            id__in=product_ids).values_list("id", flat=True)}
+
+        token = uuid.uuid4().hex
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        for index, (key, source_keys) in enumerate(sources.items()):
+            merged_key = cls.temp_key.format(token=token, index=index)
+            if key in stored:
+                pipeline.set(merged_key, stored[key], ex=cls.temp_ttl)
+            pipeline.pfmerge(merged_key, *source_keys)
+            pipeline.get(merged_key)
+            pipeline.pfcount(merged_key)
+            pipeline.delete(merged_key)
+        results = iter(pipeline.execute())
+
+        rows = []
+        for key in sources:
+            if key in stored:
+                next(results)
+            next(results)
+            sketch, unique_viewers = next(results), next(results)
+            next(results)
+            product_id, day = key
+            if product_id in existing and unique_viewers:
+                rows.append(ProductDailyStats(
+                    product_id=product_id, date=day, unique_viewers=unique_viewers, sketch=sketch
+                ))
+        ProductDailyStats.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["product", "date"],
+            update_fields=["unique_viewers", "sketch"],
+        )
+        return len(rows)
+
+    @classmethod
+    def get_unique_viewers(cls, product_id, start: datetime.date, end: datetime.date) -> dict:
+        """
+        Counts the unique viewers of a product between start and end (inclusive), in total
+        and per day, from one Redis round trip.
+        """
+        days = [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+        stored = dict(
+            ProductDailyStats.objects.filter(product_id=product_id, date__range=(start, end))
+            .values_list("date", "sketch")
+        )
+        live_since = cls.today() - datetime.timedelta(seconds=cls.sketch_ttl)
+
+        token = uuid.uuid4().hex
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        day_sources = {}
+        for index, day in enumerate(days):
+            sources = []
+            if day in stored:
+                temp_key = cls.temp_key.format(token=token, index=index)
+                pipeline.set(temp_key, bytes(stored[day]), ex=cls.temp_ttl)
+                sources.append(temp_key)
+            if day >= live_since:
+                sources.append(cls.sketch_key.format(product_id=product_id, day=day.isoformat()))
+            day_sources[day] = sources
+
+        counted_days = [day for day, sources in day_sources.items() if sources]
+        for day in counted_days:
+            pipeline.pfcount(*day_sources[day])
+        all_sources = [key for day in counted_days for key in day_sources[day]]
+        if all_sources:
+            pipeline.pfcount(*all_sources)
+        if stored:
+            pipeline.delete(*[key for day in stored for key in day_sources[day][:1]])
+        results = pipeline.execute()[len(stored):]
+
+        daily = dict(zip(counted_days, results))
+        return {
+            "unique_viewers": results[len(counted_days)] if all_sources else 0,
+            "daily": [{"date": day, "unique_viewers": daily.get(day, 0)} for day in days],
+        }
+
+
+class InventoryService:
+    """
+    Stock reservations held in Redis, so checkouts of a hot product never queue up on its
+    row. Every product has a hash with its `stock` (Product.quantity as last loaded), the
+    quantity `held` by pending orders and the quantity `committed` by paid orders but not
+    yet written to Product.quantity. What can still be reserved is stock - held - committed.
+
+    A hold belongs to one order and lasts until the order is paid (commit), canceled
+    (release) or its deadline passes. Committed quantities are written to the database in
+    batches by flush().
+    """
+
+    product_key = "inventory:{product_id}"
+    hold_key = "inventory:hold:{order_id}"
+    holds_key = "inventory:holds"
+    dirty_key = "inventory:dirty"
+
+    # KEYS: the hold, the holds by deadline and the product hashes. ARGV: order id,
+    # deadline, then a product id and quantity per product. Holds everything or nothing.
+    # Returns 0 once held, n when the n-th product lacks stock or -n when its stock is
+    # not loaded yet.
+    reserve_script = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return 0
+    end
+    for i = 3, #KEYS do
+        local inventory = redis.call('HMGET', KEYS[i], 'stock', 'held', 'committed')
+        if not inventory[1] then
+            return 2 - i
+        end
+        local available = tonumber(inventory[1]) - tonumber(inventory[2] or '0') - tonumber(inventory[3] or '0')
+        if available < tonumber(ARGV[2 * i - 2]) then
+            return i - 2
+        end
+    end
+    for i = 3, #KEYS do
+        redis.call('HINCRBY', KEYS[i], 'held', ARGV[2 * i - 2])
+        redis.call('HSET', KEYS[1], ARGV[2 * i - 3], ARGV[2 * i - 2])
+    end
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+    return 0
+    """
+
+    # KEYS: the hold, the holds by deadline, the products with committed stock and the
+    # product hashes. ARGV: order id, 1 to commit or 0 to release, then the product ids.
+    # Returns 1 if the hold was settled, 0 if there was none left.
+    settle_script = """
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return 0
+    end
+    for i = 4, #KEYS do
+        local quantity = tonumber(redis.call('HGET', KEYS[1], ARGV[i - 1]) or '0')
+        redis.call('HINCRBY', KEYS[i], 'held', -quantity)
+        if ARGV[2] == '1' then
+            redis.call('HINCRBY', KEYS[i], 'committed', quantity)
+            redis.call('SADD', KEYS[3], ARGV[i - 1])
+        end
+    end
+    redis.call('DEL', KEYS[1])
+    return 1
+    """
+
+    # KEYS: the products with committed stock and the product hashes. ARGV: the product
+    # ids. Takes the committed quantities out of Redis, lowering `stock` by them as the
+    # database is about to. Returns the quantities.
+    pop_committed_script = """
+    local quantities = {}
+    for i = 2, #KEYS do
+        local committed = tonumber(redis.call('HGET', KEYS[i], 'committed') or '0')
+        redis.call('HSET', KEYS[i], 'committed', 0)
+        if redis.call('HEXISTS', KEYS[i], 'stock') == 1 then
+            redis.call('HINCRBY', KEYS[i], 'stock', -committed)
+        end
+        redis.call('SREM', KEYS[1], ARGV[i - 1])
+        quantities[i - 1] = committed
+    end
+    return quantities
+    """
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def get_product_key(cls, product_id) -> str:
+        return cls.product_key.format(product_id=product_id)
+
+    @classmethod
+    def reserve(cls, order_id: uuid.UUID, quantities: dict, ttl: int) -> Optional[str]:
+        """
+        Holds `quantities` (product id -> quantity) for the order for `ttl` seconds.
+        Returns None once held, or the id of a product without enough stock, in which case
+        nothing is held.
+        """
+        product_ids = [str(product_id) for product_id in quantities]
+        script = cls.get_redis_client().register_script(cls.reserve_script)
+        keys = [
+            cls.hold_key.format(order_id=order_id),
+            cls.holds_key,
+            *[cls.get_product_key(product_id) for product_id in product_ids],
+        ]
+        args = [str(order_id), int(time.time()) + ttl]
+        for product_id, quantity in quantities.items():
+            args.extend([str(product_id), quantity])
+
+        result = script(keys=keys, args=args)
+        if result < 0:
+            cls.load_stock(product_ids)
+            result = script(keys=keys, args=args)
+        return product_ids[abs(result) - 1] if result else None
+
+    @classmethod
+    def load_stock(cls, product_ids: list[str]) -> None:
+        stock = dict(Product.objects.filter(id__in=product_ids).values_list("id", "quantity"))
+        pipeline = cls.get_redis_client().pipeline()
+        for product_id in product_ids:
+            # A deleted product has nothing left to reserve.
+            pipeline.hsetnx(cls.get_product_key(product_id), "stock", stock.get(uuid.UUID(product_id), 0))
+        pipeline.execute()
+
+    @classmethod
+    def forget_stock(cls, product_id) -> None:
+        """
+        Drops the loaded stock of the product, e.g. after Product.quantity was edited, so
+        the next reservation loads it again. Holds and committed quantities are kept.
+        """
+        cls.get_redis_client().hdel(cls.get_product_key(product_id), "stock")
+
+    @classmethod
+    def settle(cls, order_id: uuid.UUID, commit: bool) -> bool:
+        redis_client = cls.get_redis_client()
+        hold_key = cls.hold_key.format(order_id=order_id)
+        product_ids = [product_id.decode() for product_id in redis_client.hkeys(hold_key)]
+        script = redis_client.register_script(cls.settle_script)
+        return bool(script(
+            keys=[
+                hold_key,
+                cls.holds_key,
+                cls.dirty_key,
+                *[cls.get_product_key(product_id) for product_id in product_ids],
+            ],
+            args=[str(order_id), int(commit), *product_ids],
+        ))
+
+    @classmethod
+    def commit(cls, order_id: uuid.UUID) -> bool:
+        """
+        Turns the order's hold into a committed decrement, written by the next flush().
+        Returns False if the order holds nothing.
+        """
+        return cls.settle(order_id, commit=True)
+
+    @classmethod
+    def release(cls, order_id: uuid.UUID) -> bool:
+        """
+        Gives the order's hold back. Returns False if the order holds nothing.
+        """
+        return cls.settle(order_id, commit=False)
+
+    @classmethod
+    def get_expired(cls, batch_size: int) -> list[str]:
+        return [
+            order_id.decode()
+            for order_id in cls.get_redis_client().zrangebyscore(
+                cls.holds_key, "-inf", int(time.time()), start=0, num=batch_size
+            )
+        ]
+
+    @classmethod
+    def pop_committed(cls, batch_size: int) -> dict[str, int]:
+        redis_client = cls.get_redis_client()
+        product_ids = [product_id.decode() for product_id in redis_client.srandmember(cls.dirty_key, batch_size)]
+        if not product_ids:
+            return {}
+        script = redis_client.register_script(cls.pop_committed_script)
+        quantities = script(
+            keys=[cls.dirty_key, *[cls.get_product_key(product_id) for product_id in product_ids]],
+            args=product_ids,
+        )
+        return dict(zip(product_ids, quantities))
+
+    @classmethod
+    def restore_committed(cls, committed: dict[str, int]) -> None:
+        # The database was not updated, so the stock is loaded from it again.
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        for product_id, quantity in committed.items():
+            pipeline.hdel(cls.get_product_key(product_id), "stock")
+            pipeline.hincrby(cls.get_product_key(product_id), "committed", quantity)
+            pipeline.sadd(cls.dirty_key, product_id)
+        pipeline.execute()
+
+    @classmethod
+    def flush(cls, batch_size: int = 500) -> int:
+        """
+        Writes committed quantities to Product.quantity, one UPDATE per batch of products.
+        Returns the number of products updated.
+        """
+        flushed = 0
+        while committed := cls.pop_committed(batch_size):
+            committed = {product_id: quantity for product_id, quantity in committed.items() if quantity}
+            if not committed:
+                continue
+            try:
+                flushed += cls.write_stock(committed)
+            except Exception:
+                cls.restore_committed(committed)
+                raise
+        return flushed
+
+    @classmethod
+    def write_stock(cls, committed: dict[str, int]) -> int:
+        return Product.objects.filter(id__in=committed.keys()).update(
+            quantity=F("quantity") - Case(
+                *[When(id=product_id, then=Value(quantity)) for product_id, quantity in committed.items()],
+                default=Value(0),
+            )
+        )
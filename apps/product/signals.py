@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from product.models import Category, Product
+from product.services import CategoryTreeService, InventoryService
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    CategoryTreeService.bump_version()
+
+
+@receiver(post_save, sender=Product)
+def invalidate_inventory_stock(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "quantity" in update_fields:
+        InventoryService.forget_stock(instance.id)
@@ -0,0 +1,27 @@
+from celery import shared_task
+
+from product.services import InventoryService, ProductStatsService, ProductViewService
+
+
+@shared_task
+def flush_product_views():
+    """
+    Writes the product views buffered in Redis to ProductViews and Product.views.
+    """
+    return ProductViewService.flush()
+
+
+@shared_task
+def rollup_product_stats():
+    """
+    Saves the daily unique-viewer sketches kept in Redis to ProductDailyStats.
+    """
+    return ProductStatsService.rollup()
+
+
+@shared_task
+def flush_inventory():
+    """
+    Writes the stock committed by paid orders in Redis to Product.quantity.
+    """
+    return InventoryService.flush()
@@ -10,6 +10,8 @@ urlpatterns = [
     # path("categories/", views.CategoryViewSet.as_view()),
     # path("categories/<uuid:pk>/", views.CategoryAPIView.as_view()),
     path("", views.ProductListAPIView.as_view()),
+    path("autocomplete/", views.ProductAutocompleteView.as_view()),
     path("<uuid:pk>/", views.ProductDetailView.as_view()),
+    path("<uuid:pk>/stats/", views.ProductStatsView.as_view()),
     path("", include(router.urls)),
 ]
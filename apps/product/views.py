@@ -9,13 +9,15 @@ from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from share.permissions import GeneratePermissions, check_perm
-from django.db.models import F
+from share.pagination import KeysetPagination
+from share.prefetch import PrefetchPlannerMixin, optimize_queryset
 from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
 
 from .serializers import *
-from .filters import ProductFilter
+from .filters import ProductFilter, ProductSearchFilter
 from .models import Product, ProductViews
+from .services import AutocompleteService, CategoryTreeService, ProductService, ProductStatsService, ProductViewService
 
 
 class CategoryViewSet(GeneratePermissions, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin):
@@ -35,14 +37,23 @@ class CategoryViewSet(GeneratePermissions, viewsets.GenericViewSet, mixins.ListM
         """
         List all categories with an optional search feature.
         """
-        queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
+        tree = CategoryTreeService.get_tree()
+        if request.query_params.get(drf_filters.SearchFilter.search_param):
+            queryset = self.filter_queryset(self.get_queryset())
+            category_ids = list(dict.fromkeys(queryset.values_list('id', flat=True)))
+        else:
+            category_ids = tree.roots
+
+        page = self.paginate_queryset(category_ids)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response([tree.get_subtree(category_id) for category_id in page])
+        return Response([tree.get_subtree(category_id) for category_id in category_ids])
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    def has_object_permissions(self) -> bool:
+        return any(
+            type(permission).has_object_permission is not permissions.BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
 
     @extend_schema(
         description="Retrieve a single category by ID.",
@@ -52,21 +63,34 @@ class CategoryViewSet(GeneratePermissions, viewsets.GenericViewSet, mixins.ListM
         """
         Retrieve a single category by its ID.
         """
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        if self.has_object_permissions():
+            # Object permissions are checked against the row; the body still comes from
+            # the tree snapshot.
+            self.get_object()
+        data = CategoryTreeService.get_tree().get_subtree(kwargs[self.lookup_field])
+        if data is None:
+            raise NotFound()
+        return Response(data)
 
     @action(detail=True, methods=['get'], url_path='products', url_name='category-products')
     @extend_schema(
         description="Retrieve all products belonging to a specific category.",
+        parameters=[
+            OpenApiParameter(name='include_descendants', description='Include products of all subcategories',
+                             required=False, type=bool),
+        ],
         responses={200: ProductSerializer(many=True)}
     )
     def get_category_products(self, request, pk=None):
         """
-        Retrieve all products belonging to a specific category.
+        Retrieve all products belonging to a specific category, or to its whole subtree
+        when `include_descendants` is set.
         """
         category = self.get_object()
-        products = Product.objects.filter(category=category)  # Adjust if your model relationships differ
+        include_descendants = request.query_params.get('include_descendants', '').lower() in ('1', 'true')
+        products = optimize_queryset(
+            ProductService.get_category_products(category, include_descendants), ProductSerializer
+        )
         page = self.paginate_queryset(products)
         if page is not None:
             serializer = ProductSerializer(page, many=True)
@@ -84,16 +108,18 @@ class CategoryViewSet(GeneratePermissions, viewsets.GenericViewSet, mixins.ListM
         return super().get_queryset()
 
 
-class ProductListAPIView(GeneratePermissions, generics.ListCreateAPIView):
+class ProductListAPIView(GeneratePermissions, PrefetchPlannerMixin, generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     filter_backends = (
         DjangoFilterBackend,
-        drf_filters.SearchFilter,
+        ProductSearchFilter,
         drf_filters.OrderingFilter,
     )
-    search_fields = ("title", "description",)
     filterset_class = ProductFilter
     ordering_fields = ("created_at", "views")
+    pagination_class = KeysetPagination
+    # Relevance and recommendation orderings are not keyset-paginated.
+    offset_pagination_params = ("search", "recommend_by_product_id")
     queryset = Product.objects.all()
 
     def get_serializer_class(self):
@@ -136,8 +162,29 @@ class ProductListAPIView(GeneratePermissions, generics.ListCreateAPIView):
         serializer.save(seller=self.request.user)
 
 
-class ProductDetailView(GeneratePermissions, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
+class ProductAutocompleteView(GeneratePermissions, generics.GenericAPIView):
+    serializer_class = AutocompleteSerializer
+    queryset = Product.objects.all()
+
+    @extend_schema(
+        description="Suggest product titles and category names for a (possibly mistyped) prefix.",
+        parameters=[
+            OpenApiParameter(name='q', description='Text typed so far', required=True, type=str),
+            OpenApiParameter(name='limit', description='Suggestions per kind (max 20)', required=False, type=int),
+        ],
+        responses={200: AutocompleteSerializer}
+    )
+    def get(self, request, *args, **kwargs):
+        query_serializer = AutocompleteQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+        suggestions = AutocompleteService.suggest(params['q'], params['limit'])
+        return Response(self.get_serializer(suggestions).data)
+
+
+class ProductDetailView(GeneratePermissions, PrefetchPlannerMixin, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
     http_method_names = ['get', 'patch', 'put', 'delete']
+    queryset = Product.objects.all()
 
     def get_queryset(self):
         return Product.objects.all()
@@ -160,17 +207,18 @@ class ProductDetailView(GeneratePermissions, generics.CreateAPIView, generics.Re
         responses={200: ProductDetailSerializer}
     )
     def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs)
-
         product = self.get_object()
-        ip = self.get_client_ip(request)
+        serializer = self.get_serializer(product)
+        data = serializer.data
 
-        if not ProductViews.objects.filter(product=product, ip=ip).exists():
-            ProductViews.objects.create(product=product, ip=ip)
-            product.views = F('views') + 1
-            product.save(update_fields=["views"])
-
-        return response
+        # Views are buffered in Redis and flushed by the flush_product_views task,
+        # the response already counts the ones still waiting in the buffer. An ip that
+        # is already stored is not buffered again, so the count matches what is flushed.
+        ip = self.get_client_ip(request)
+        stored = ProductViews.objects.filter(product=product, ip=ip).exists()
+        pending_views = ProductViewService.record_view(product.id, ip, stored=stored)
+        data['views'] = product.views + pending_views
+        return Response(data)
 
     @extend_schema(
         description="Update product details by ID.",
@@ -207,3 +255,30 @@ class ProductDetailView(GeneratePermissions, generics.CreateAPIView, generics.Re
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ProductStatsView(GeneratePermissions, generics.RetrieveAPIView):
+    serializer_class = ProductStatsSerializer
+    queryset = Product.objects.all()
+
+    @extend_schema(
+        description="Retrieve unique-viewer statistics of a product over a date window (last 30 days by default).",
+        parameters=[
+            OpenApiParameter(name='start', description='First day of the window (YYYY-MM-DD)', required=False,
+                             type=str),
+            OpenApiParameter(name='end', description='Last day of the window (YYYY-MM-DD)', required=False, type=str),
+        ],
+        responses={200: ProductStatsSerializer}
+    )
+    def get(self, request, *args, **kwargs):
+        product = self.get_object()
+        if product.seller != request.user and not request.user.is_superuser:
+            raise PermissionDenied("This product doesn't belong to you.")
+
+        query_serializer = ProductStatsQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        window = query_serializer.validated_data
+
+        stats = ProductStatsService.get_unique_viewers(product.id, window['start'], window['end'])
+        serializer = self.get_serializer({'product': product.id, 'views': product.views, **window, **stats})
+        return Response(serializer.data)
@@ -53,3 +53,9 @@ class NotificationType(BaseEnum):
     PAYMENT = "payment"
     GENERAL = "general"
 
+
+
+class EmailStatus(BaseEnum):
+    QUEUED = "queued"
+    SENT = "sent"
+    FAILED = "failed"
@@ -0,0 +1,51 @@
+import re
+from functools import lru_cache
+
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+
+OTP_TEMPLATE = "emails/email_template.html"
+NOTIFICATION_TEMPLATE = "emails/notification_template.html"
+
+PLACEHOLDER = re.compile(r"{{\s*([A-Za-z_]\w*)\s*}}")
+# Tags, comments and variables with lookups or filters need the template engine.
+TEMPLATE_SYNTAX = re.compile(r"{%|{#|{{(?!\s*[A-Za-z_]\w*\s*}})")
+
+
+class CompiledTemplate:
+    """
+    An email template compiled once per process. Templates made of plain `{{ variable }}`
+    placeholders are split into literal parts and variable names and rendered by joining
+    them with the escaped values, as the template engine would render them. Any other
+    template is rendered by the template engine.
+    """
+
+    def __init__(self, template_name: str):
+        template = get_template(template_name)
+        source = template.template.source
+        if TEMPLATE_SYNTAX.search(source):
+            self.template, self.parts = template, None
+        else:
+            # Literal parts at even indexes, variable names at odd ones.
+            self.template, self.parts = None, PLACEHOLDER.split(source)
+
+    @property
+    def is_fast(self) -> bool:
+        return self.parts is not None
+
+    def render(self, context: dict) -> str:
+        if self.parts is None:
+            return self.template.render(context)
+        parts = self.parts.copy()
+        for index in range(1, len(parts), 2):
+            parts[index] = conditional_escape(context.get(parts[index], ""))
+        return "".join(parts)
+
+
+@lru_cache(maxsize=None)
+def get_compiled_template(template_name: str) -> CompiledTemplate:
+    return CompiledTemplate(template_name)
+
+
+def render_email(template_name: str, context: dict) -> str:
+    return get_compiled_template(template_name).render(context)
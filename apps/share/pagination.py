@@ -0,0 +1,203 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on (ordering field, pk): every page is an index range scan
+    that starts right after the previous one, and no COUNT(*) is run.
+
+    The ordering field comes from the `ordering` query parameter when it is one of the
+    view's `ordering_fields`, otherwise `default_ordering` is used. Cursors are opaque and
+    carry the position of the first or last row of the page they were built from.
+
+    Keyset pages are opt-in: only `?pagination=cursor` (the first page) or a `cursor`
+    parameter (the pages after it) use them, and their response is {next, previous,
+    results} without `count`. Every other request, and any with one of the view's
+    `offset_pagination_params` (e.g. relevance-ranked searches), gets
+    LimitOffsetPagination, the default.
+    """
+
+    cursor_query_param = 'cursor'
+    cursor_query_description = 'The pagination cursor value.'
+    limit_query_param = 'limit'
+    limit_query_description = 'Number of results to return per page.'
+    pagination_query_param = 'pagination'
+    page_size = api_settings.PAGE_SIZE
+    max_limit = 100
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.offset_paginator = None
+
+    def use_offset_pagination(self, request, view) -> bool:
+        params = request.query_params
+        return (
+            not (params.get(self.pagination_query_param) == 'cursor' or self.cursor_query_param in params)
+            or LimitOffsetPagination.offset_query_param in params
+            or any(param in params for param in getattr(view, 'offset_pagination_params', ()))
+        )
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        if self.use_offset_pagination(request, view):
+            self.offset_paginator = LimitOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(request, view)
+        field = self.ordering.lstrip('-')
+        nullable = queryset.model._meta.get_field(field).null
+        cursor = self.decode_cursor(request, queryset.model)
+        backwards = cursor is not None and cursor['previous']
+        descending = self.ordering.startswith('-') != backwards
+
+        if cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(field, nullable, cursor, descending))
+        prefix = '-' if descending else ''
+        if nullable:
+            # NULLs sort below every value, so one index serves both directions.
+            order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_first=True)
+        else:
+            order = f'{prefix}{field}'
+        results = list(queryset.order_by(order, f'{prefix}pk')[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if backwards:
+            results.reverse()
+
+        self.has_next = cursor is not None if backwards else has_more
+        self.has_previous = has_more if backwards else cursor is not None
+        self.field = field
+        self.page = results
+        return results
+
+    def get_seek_filter(self, field: str, nullable: bool, cursor: dict, descending: bool) -> Q:
+        """
+        The rows after the cursor, in the order the page is read. NULLs sort below every
+        value: they come after all values going down and before them going up.
+        """
+        operator = 'lt' if descending else 'gt'
+        if cursor['value'] is None:
+            seek = Q(**{f'{field}__isnull': True, f'pk__{operator}': cursor['pk']})
+            if not descending:
+                seek |= Q(**{f'{field}__isnull': False})
+            return seek
+
+        seek = (
+            Q(**{f'{field}__{operator}': cursor['value']})
+            | Q(**{field: cursor['value'], f'pk__{operator}': cursor['pk']})
+        )
+        if nullable and descending:
+            seek |= Q(**{f'{field}__isnull': True})
+        return seek
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': self.cursor_query_description,
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.limit_query_param,
+                'required': False,
+                'in': 'query',
+                'description': self.limit_query_description,
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.pagination_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to `cursor` to use keyset pagination instead of limit/offset.',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+        ]
+
+    def get_limit(self, request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(limit, self.max_limit) if limit > 0 else self.page_size
+
+    def get_ordering(self, request, view) -> str:
+        fields = getattr(view, 'ordering_fields', None) or (self.default_ordering.lstrip('-'),)
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '').split(',')[0].strip()
+        if ordering.lstrip('-') in fields:
+            return ordering
+        return self.default_ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.build_link(self.page[-1], previous=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.build_link(self.page[0], previous=True)
+
+    def build_link(self, instance, previous: bool) -> str:
+        field = instance._meta.get_field(self.field)
+        position = {
+            'o': self.ordering,
+            'v': None if field.value_from_object(instance) is None else field.value_to_string(instance),
+            'pk': str(instance.pk),
+            'p': previous,
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), LimitOffsetPagination.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if position['o'] != self.ordering:
+                raise ValueError
+            field = model._meta.get_field(self.ordering.lstrip('-'))
+            if position['v'] is None and not field.null:
+                raise ValueError
+            return {
+                'value': None if position['v'] is None else field.to_python(position['v']),
+                'pk': model._meta.pk.to_python(position['pk']),
+                'previous': bool(position['p']),
+            }
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
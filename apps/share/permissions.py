@@ -1,47 +1,71 @@
+from functools import lru_cache
 from typing import Type, TypeVar
 
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import AllowAny, BasePermission
 
 BasePermissionType = TypeVar("BasePermissionType", bound=BasePermission)
 
+METHOD_PERMISSION_PREFIXES = {
+    "GET": "view",
+    "POST": "add",
+    "PUT": "change",
+    "PATCH": "change",
+    "DELETE": "delete",
+}
 
+
+@lru_cache(maxsize=None)
 def check_perm(*permissions) -> Type[BasePermissionType]:
+    required = frozenset(permissions)
+
     class CheckPermission(BasePermission):
         def has_permission(self, request, view):
             return request.user.is_superuser or (
                     request.user.is_authenticated
-                    and set(permissions).issubset(request.user.get_all_permissions())
+                    and required <= request.user.get_all_permissions()
             )
 
     return CheckPermission
 
 
+class PermissionRegistry:
+    """
+    Request method -> permission class of every GeneratePermissions view, resolved once
+    per view class from the model of its `queryset`.
+    """
+
+    def __init__(self):
+        self._views = {}
+
+    def register(self, view_class) -> dict[str, Type[BasePermissionType]]:
+        queryset = getattr(view_class, "queryset", None)
+        if queryset is None:
+            raise ImproperlyConfigured(
+                f"{view_class.__name__} needs a `queryset` attribute to generate its permissions."
+            )
+        app_label, model_name = queryset.model._meta.app_label, queryset.model._meta.model_name
+        self._views[view_class] = {
+            method: check_perm(f"{app_label}.{prefix}_{model_name}")
+            for method, prefix in METHOD_PERMISSION_PREFIXES.items()
+        }
+        return self._views[view_class]
+
+    def get(self, view_class) -> dict[str, Type[BasePermissionType]]:
+        if view_class not in self._views:
+            return self.register(view_class)
+        return self._views[view_class]
+
+
+permission_registry = PermissionRegistry()
+
+
 class GeneratePermissions(GenericAPIView):
-    def generate_permissions(self, *args, **kwargs):
-        if getattr(self, "action", None) and self.action in kwargs.keys():
-            return kwargs[self.action]
-        # return method permission
-        if self.request.method and str(self.request.method).lower() in kwargs.keys():
-            return kwargs[str(self.request.method).lower()]
-        # Create permission by method name
-        queryset = self.get_queryset()
-        codename = queryset.model.__name__.lower()
-        app_name = getattr(queryset.model, "_meta").app_label
-        if self.request.method == "POST":
-            prefix = "add"
-        elif self.request.method == "DELETE":
-            prefix = "delete"
-        elif self.request.method in ["PUT", "PATCH"]:
-            prefix = "change"
-        elif self.request.method == "GET":
-            prefix = "view"
-        else:
-            prefix = None
-        if not prefix:
-            return None
-        perm = f"{app_name}.{prefix}_{codename}"
-        return perm
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        permission_registry.register(cls)
+        return super().as_view(*args, **initkwargs)
 
     def get_permissions(self, *args, **kwargs):
         if (
@@ -49,9 +73,7 @@ class GeneratePermissions(GenericAPIView):
                 and AllowAny not in self.permission_classes
         ):
             return [permission() for permission in self.permission_classes]
-        perm = self.generate_permissions(*args, **kwargs)
-        if not perm:
-            return self.permission_classes
-
-        permission_classes = [check_perm(perm)]
-        return [permission() for permission in permission_classes]
+        permission_class = permission_registry.get(type(self)).get(str(self.request.method).upper())
+        if permission_class is None:
+            return [permission() for permission in self.permission_classes]
+        return [permission_class()]
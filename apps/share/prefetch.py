@@ -0,0 +1,152 @@
+from typing import Optional, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import SAFE_METHODS
+
+
+class QueryPlan:
+    """
+    The relations a serializer is going to touch, split into the ``select_related``
+    joins and the ``prefetch_related`` lookups (with their own nested plans).
+    """
+
+    def __init__(self):
+        self.select_related: list[str] = []
+        self.prefetch_related: list[tuple[str, Type[models.Model], "QueryPlan"]] = []
+
+    def add_select(self, lookup: str) -> None:
+        if lookup not in self.select_related:
+            self.select_related.append(lookup)
+
+    def add_prefetch(self, lookup: str, model: Type[models.Model], plan: "QueryPlan") -> None:
+        if lookup not in [prefetch[0] for prefetch in self.prefetch_related]:
+            self.prefetch_related.append((lookup, model, plan))
+
+    def merge(self, other: "QueryPlan", prefix: str) -> None:
+        for lookup in other.select_related:
+            self.add_select(f"{prefix}__{lookup}")
+        for lookup, model, plan in other.prefetch_related:
+            self.add_prefetch(f"{prefix}__{lookup}", model, plan)
+
+    def get_prefetch_objects(self) -> list[Prefetch]:
+        # Prefetch objects are mutated by Django while they are evaluated,
+        # so they are built fresh for every queryset.
+        return [
+            Prefetch(lookup, queryset=plan.apply(model._default_manager.all()))
+            for lookup, model, plan in self.prefetch_related
+        ]
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.get_prefetch_objects())
+        return queryset
+
+
+class PrefetchPlanner:
+    """
+    Builds a QueryPlan from the fields declared on a serializer.
+
+    Nested serializers on forward relations become ``select_related`` joins,
+    nested ``many=True`` serializers and many related fields become ``Prefetch``
+    objects. Relations read inside ``SerializerMethodField`` methods can not be
+    discovered, so serializers declare them on their Meta:
+
+        class Meta:
+            select_related = ['category']
+            prefetch_related = ['images', ('children', 'self')]
+
+    A ``(lookup, serializer)`` pair prefetches the lookup and plans it with the given
+    serializer class, ``'self'`` meaning the serializer itself. Recursive plans stop
+    after ``max_depth`` levels.
+    """
+
+    max_depth = 5
+    _plans: dict[tuple[Type[serializers.BaseSerializer], int], QueryPlan] = {}
+
+    @classmethod
+    def get_plan(cls, serializer_class: Type[serializers.BaseSerializer], depth: int = 0) -> QueryPlan:
+        key = (serializer_class, depth)
+        if key not in cls._plans:
+            cls._plans[key] = cls.build_plan(serializer_class, depth)
+        return cls._plans[key]
+
+    @classmethod
+    def build_plan(cls, serializer_class: Type[serializers.BaseSerializer], depth: int = 0) -> QueryPlan:
+        plan = QueryPlan()
+        model = getattr(getattr(serializer_class, "Meta", None), "model", None)
+        if model is None or depth >= cls.max_depth:
+            return plan
+
+        for field in serializer_class().fields.values():
+            if field.write_only or field.source == "*":
+                continue
+            relation = cls.get_relation(model, field.source)
+            if relation is None:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                plan.add_prefetch(
+                    field.source, relation.related_model, cls.get_plan(type(field.child), depth + 1)
+                )
+            elif isinstance(field, serializers.BaseSerializer):
+                if relation.many_to_many or relation.one_to_many:
+                    plan.add_prefetch(
+                        field.source, relation.related_model, cls.get_plan(type(field), depth + 1)
+                    )
+                else:
+                    plan.add_select(field.source)
+                    plan.merge(cls.get_plan(type(field), depth + 1), field.source)
+            elif isinstance(field, serializers.ManyRelatedField):
+                plan.add_prefetch(field.source, relation.related_model, QueryPlan())
+
+        meta = serializer_class.Meta
+        for lookup in getattr(meta, "select_related", []):
+            plan.add_select(lookup)
+        for lookup in getattr(meta, "prefetch_related", []):
+            nested_serializer = None
+            if isinstance(lookup, tuple):
+                lookup, nested_serializer = lookup
+            relation = cls.get_relation(model, lookup)
+            if relation is None:
+                continue
+            if nested_serializer == "self":
+                nested_serializer = serializer_class
+            nested_plan = cls.get_plan(nested_serializer, depth + 1) if nested_serializer else QueryPlan()
+            plan.add_prefetch(lookup, relation.related_model, nested_plan)
+        return plan
+
+    @staticmethod
+    def get_relation(model: Type[models.Model], source: str) -> Optional[models.Field]:
+        if not source or "." in source:
+            return None
+        try:
+            field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        return field if field.is_relation else None
+
+    @classmethod
+    def optimize(cls, queryset: QuerySet, serializer_class: Type[serializers.BaseSerializer]) -> QuerySet:
+        return cls.get_plan(serializer_class).apply(queryset)
+
+
+def optimize_queryset(queryset: QuerySet, serializer_class: Type[serializers.BaseSerializer]) -> QuerySet:
+    return PrefetchPlanner.optimize(queryset, serializer_class)
+
+
+class PrefetchPlannerMixin(GenericAPIView):
+    """
+    Applies the serializer's query plan to every queryset the view reads with.
+    Writes are left alone so related caches never outlive an update.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS:
+            queryset = optimize_queryset(queryset, self.get_serializer_class())
+        return queryset
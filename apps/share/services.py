@@ -1,22 +1,198 @@
 import datetime
+import hashlib
+import hmac
+import json
+import secrets
+import string
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext as _
 from django_redis import get_redis_connection
 from redis import Redis
+from redis.client import Pipeline
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.settings import api_settings
 
 from share.enums import TokenType
 
 
+class TokenVerdictCache:
+    """
+    Short-lived in-process LRU of token verdicts per (user_id, jti). Entries of a user are
+    dropped as soon as TokenService changes that user's tokens in any process: changes are
+    announced on a Redis pub/sub channel that every process listens to.
+    """
+
+    channel = "tokens:changed"
+    ttl = 5
+    max_users = 10000
+
+    _users: OrderedDict = OrderedDict()
+    _generation = 0
+    _lock = threading.Lock()
+    _listener = None
+
+    @classmethod
+    def get(cls, user_id, jti: str) -> Optional[bool]:
+        with cls._lock:
+            verdicts = cls._users.get(str(user_id))
+            entry = verdicts.get(jti) if verdicts else None
+            if entry is None:
+                return None
+            verdict, expires_at = entry
+            if expires_at < time.monotonic():
+                del verdicts[jti]
+                return None
+            cls._users.move_to_end(str(user_id))
+            return verdict
+
+    @classmethod
+    def get_generation(cls) -> int:
+        return cls._generation
+
+    @classmethod
+    def set(cls, user_id, jti: str, verdict: bool, generation: int) -> None:
+        # A verdict read from Redis before an eviction may already be stale.
+        if not cls.start_listener():
+            return
+        with cls._lock:
+            if generation != cls._generation:
+                return
+            cls._users.setdefault(str(user_id), {})[jti] = (verdict, time.monotonic() + cls.ttl)
+            cls._users.move_to_end(str(user_id))
+            while len(cls._users) > cls.max_users:
+                cls._users.popitem(last=False)
+
+    @classmethod
+    def evict(cls, user_id) -> None:
+        with cls._lock:
+            cls._generation += 1
+            cls._users.pop(str(user_id), None)
+
+    @classmethod
+    def handle_message(cls, message) -> None:
+        cls.evict(message["data"].decode())
+
+    @classmethod
+    def start_listener(cls) -> bool:
+        """
+        Subscribes this process to token changes. Verdicts are only cached while subscribed.
+        """
+        if cls._listener is not None and cls._listener.is_alive():
+            return True
+        with cls._lock:
+            if cls._listener is None or not cls._listener.is_alive():
+                try:
+                    pubsub = TokenService.get_redis_client().pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(**{cls.channel: cls.handle_message})
+                    cls._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+                except Exception:
+                    cls._listener = None
+                    return False
+                # Changes made while no listener was running were missed.
+                cls._users.clear()
+                cls._generation += 1
+        return True
+
+
 class TokenService:
+    """
+    Per-device sessions. Every login gets a session id that is embedded in its tokens as
+    the `sid` claim and registered in one hash per user, mapping the session id to the
+    jti of its tokens and its expiry. The hash expires with its longest-lived session.
+
+    Tokens without a session id (issued before sessions existed) are only accepted if
+    they were issued before LEGACY_TOKEN_CUTOFF, when it is set, and are checked against
+    the old per-user allowlist of `add_token_to_redis` until they expire.
+    """
+
+    session_claim = "sid"
+    sessions_key = "user:{user_id}:sessions"
+    revoked_at_key = "user:{user_id}:revoked_at"
+    legacy_tokens_key = "user:{user_id}:{token_type}"
+    revoked_token = "fake_token"
+
     @classmethod
     def get_redis_client(cls) -> Redis:
         return get_redis_connection("default")
 
     @classmethod
-    def get_valid_tokens(cls, user_id: uuid.UUID, token_type: TokenType) -> set:
+    def get_token_hash(cls, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def add_session(
+            cls,
+            user_id: uuid.UUID,
+            session_id: str,
+            access_jti: str,
+            refresh_jti: str,
+            expires_at: datetime.datetime,
+            device: str = "",
+            ip_address: Optional[str] = None,
+            pipeline: Optional[Pipeline] = None,
+    ) -> None:
+        """
+        Registers a session in one round trip, or as part of `pipeline` when given.
+        `expires_at` is the expiry of its refresh token.
+        """
+        session = {
+            "access_jti": access_jti,
+            "refresh_jti": refresh_jti,
+            "device": device,
+            "ip_address": ip_address,
+            "created_at": int(time.time()),
+            "expires_at": int(expires_at.timestamp()),
+        }
+        ttl = max(session["expires_at"] - session["created_at"], 1)
+        sessions_key = cls.sessions_key.format(user_id=user_id)
+        commands = pipeline if pipeline is not None else cls.get_redis_client().pipeline(transaction=True)
+        commands.hset(sessions_key, session_id, json.dumps(session))
+        # The hash lives as long as its longest-lived session.
+        commands.expire(sessions_key, ttl, nx=True)
+        commands.expire(sessions_key, ttl, gt=True)
+        if pipeline is None:
+            commands.execute()
+
+    @classmethod
+    def get_sessions(cls, user_id: uuid.UUID) -> list[dict]:
+        """
+        Active sessions of the user, newest first. Expired ones are dropped on the way.
+        """
         redis_client = cls.get_redis_client()
-        token_key = f"user:{user_id}:{token_type}"
-        valid_tokens = redis_client.smembers(token_key)
-        return valid_tokens
+        sessions_key = cls.sessions_key.format(user_id=user_id)
+        now = int(time.time())
+        sessions, expired = [], []
+        for session_id, session in redis_client.hgetall(sessions_key).items():
+            session = json.loads(session)
+            if session["expires_at"] <= now:
+                expired.append(session_id)
+                continue
+            sessions.append({
+                "id": session_id.decode(),
+                "device": session["device"],
+                "ip_address": session["ip_address"],
+                "created_at": datetime.datetime.fromtimestamp(session["created_at"], datetime.timezone.utc),
+                "expires_at": datetime.datetime.fromtimestamp(session["expires_at"], datetime.timezone.utc),
+            })
+        if expired:
+            redis_client.hdel(sessions_key, *expired)
+        return sorted(sessions, key=lambda session: session["created_at"], reverse=True)
+
+    @classmethod
+    def revoke_session(cls, user_id: uuid.UUID, session_id: str) -> bool:
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.hdel(cls.sessions_key.format(user_id=user_id), session_id)
+        pipeline.publish(TokenVerdictCache.channel, str(user_id))
+        deleted, _ = pipeline.execute()
+        TokenVerdictCache.evict(user_id)
+        return bool(deleted)
 
     @classmethod
     def add_token_to_redis(
@@ -26,21 +202,129 @@ class TokenService:
             token_type: TokenType,
             expire_time: datetime.timedelta,
     ) -> None:
+        """
+        Replaces the allowlist of the user's tokens without a session with `token`.
+        """
+        token_key = cls.legacy_tokens_key.format(user_id=user_id, token_type=token_type)
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.delete(token_key)
+        pipeline.sadd(token_key, token)
+        pipeline.expire(token_key, expire_time)
+        pipeline.execute()
+
+    @classmethod
+    def revoke_legacy_tokens(
+            cls, user_id: uuid.UUID, access_lifetime: datetime.timedelta, refresh_lifetime: datetime.timedelta
+    ) -> None:
+        """
+        Revokes the user's tokens without a session. Sessions are left alone.
+        """
+        cls.add_token_to_redis(user_id, cls.revoked_token, TokenType.ACCESS, access_lifetime)
+        cls.add_token_to_redis(user_id, cls.revoked_token, TokenType.REFRESH, refresh_lifetime)
+        cls.get_redis_client().publish(TokenVerdictCache.channel, str(user_id))
+        TokenVerdictCache.evict(user_id)
+
+    @classmethod
+    def revoke_all_sessions(cls, user_id: uuid.UUID, lifetime: datetime.timedelta) -> None:
+        """
+        Revokes every session, and every token without a session issued until now.
+        `lifetime` is the longest lifetime of such a token.
+        """
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.delete(cls.sessions_key.format(user_id=user_id))
+        pipeline.set(cls.revoked_at_key.format(user_id=user_id), time.time(), ex=lifetime)
+        pipeline.publish(TokenVerdictCache.channel, str(user_id))
+        pipeline.execute()
+        TokenVerdictCache.evict(user_id)
+
+    @classmethod
+    def is_valid_token(cls, user_id: uuid.UUID, token_type: TokenType, token) -> bool:
+        """
+        A token with a session id is valid while its session is registered with the token's
+        jti. One without must be issued before LEGACY_TOKEN_CUTOFF (when set) and after all
+        sessions were last revoked, and be on the user's legacy allowlist if there is one.
+        Either check is a single Redis round trip, and verdicts are served from
+        TokenVerdictCache when possible.
+        """
+        jti = token.get(api_settings.JTI_CLAIM) or cls.get_token_hash(str(token))
+        verdict = TokenVerdictCache.get(user_id, f"{token_type.value}:{jti}")
+        if verdict is not None:
+            return verdict
+
+        generation = TokenVerdictCache.get_generation()
         redis_client = cls.get_redis_client()
+        session_id = token.get(cls.session_claim)
+        if session_id:
+            session = redis_client.hget(cls.sessions_key.format(user_id=user_id), session_id)
+            verdict = session is not None and json.loads(session)[f"{token_type.value}_jti"] == jti
+        elif settings.LEGACY_TOKEN_CUTOFF and token.get("iat", 0) >= settings.LEGACY_TOKEN_CUTOFF:
+            verdict = False
+        else:
+            token_key = cls.legacy_tokens_key.format(user_id=user_id, token_type=token_type)
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.get(cls.revoked_at_key.format(user_id=user_id))
+            pipeline.exists(token_key)
+            pipeline.sismember(token_key, str(token))
+            revoked_at, listed, allowed = pipeline.execute()
+            verdict = (revoked_at is None or token.get("iat", 0) > float(revoked_at)) and (not listed or allowed)
+        TokenVerdictCache.set(user_id, f"{token_type.value}:{jti}", verdict, generation)
+        return verdict
+
+
+class OtpService:
+    """
+    Short-lived one-time codes. A code is stored as an HMAC-SHA256 of the secret handed to
+    the client and the code, keyed with a key derived from SECRET_KEY, so checking it costs
+    one hash instead of a password hasher's key stretching.
+    """
 
-        token_key = f"user:{user_id}:{token_type}"
+    otp_key = "{key}:otp"
+    otp_secret_key = "{key}:otp_secret"
+    reset_token_key = "password_reset:{token_hash}"
+    key_salt = "share.services.OtpService"
+    code_length = 6
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
 
-        valid_tokens = cls.get_valid_tokens(user_id, token_type)
-        if valid_tokens:
-            cls.delete_tokens(user_id, token_type)
-        redis_client.sadd(token_key, token)
-        redis_client.expire(token_key, expire_time)
+    @classmethod
+    def get_hash(cls, value: str) -> str:
+        return salted_hmac(cls.key_salt, value, algorithm="sha256").hexdigest()
 
     @classmethod
-    def delete_tokens(cls, user_id: uuid.UUID, token_type: TokenType) -> None:
+    def generate(cls, key: str, expire_in: int = 120, check_if_exists: bool = True) -> tuple[str, str]:
+        """
+        Stores a new code for `key` (a phone number or email) and returns it with its secret.
+        With `check_if_exists` a code that is still valid is kept and ValidationError raised.
+        """
+        otp_code = "".join(secrets.choice(string.digits) for _ in range(cls.code_length))
+        otp_secret = secrets.token_urlsafe()
+        otp_hash = cls.get_hash(f"{otp_secret}:{otp_code}")
+        otp_key = cls.otp_key.format(key=key)
         redis_client = cls.get_redis_client()
-        token_key = f"user:{user_id}:{token_type}"
-        valid_tokens = redis_client.smembers(token_key)
-        if valid_tokens is not None:
-            redis_client.delete(token_key)
+        if check_if_exists and not redis_client.set(otp_key, otp_hash, nx=True, ex=expire_in):
+            ttl = redis_client.ttl(otp_key)
+            raise ValidationError(
+                _("You have a valid OTP code. Please try again in {ttl} seconds.").format(ttl=ttl), 400
+            )
+
+        pipeline = redis_client.pipeline()
+        if not check_if_exists:
+            pipeline.set(otp_key, otp_hash, ex=expire_in)
+        pipeline.set(cls.otp_secret_key.format(key=key), otp_secret, ex=expire_in)
+        pipeline.execute()
+        return otp_code, otp_secret
 
+    @classmethod
+    def check(cls, key: str, otp_code: str, otp_secret: str) -> None:
+        stored_hash: bytes = cls.get_redis_client().get(cls.otp_key.format(key=key))
+        if not stored_hash or not hmac.compare_digest(
+                stored_hash, cls.get_hash(f"{otp_secret}:{otp_code}").encode()
+        ):
+            raise ValidationError(_("Invalid OTP code."), 400)
+
+    @classmethod
+    def get_reset_token_key(cls, token: str) -> str:
+        # Only a hash of the reset token is kept in Redis.
+        return cls.reset_token_key.format(token_hash=cls.get_hash(token))
@@ -0,0 +1,90 @@
+import time
+import uuid
+from collections.abc import Mapping
+
+from django_redis import get_redis_connection
+from redis import Redis
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding-window rate limit kept in Redis, one sorted set of request timestamps per
+    identity: the client IP and every non-empty `ident_fields` value of the request body
+    (e.g. a phone number or email). The rate of `scope` applies per field value and the
+    rate of `<scope>_ip`, when set, per IP.
+
+    A request counts against all of its identities and is rejected while any of them is
+    over its limit; rejected requests are not counted. Checking and counting is a single
+    Lua script, and throttles run before the view touches the database or a hasher.
+    """
+
+    ident_fields = ()
+    key_prefix = "throttle"
+
+    # KEYS: timestamp sets; ARGV: now (ms), request id, then limit and window (ms) per key.
+    # Returns 0 when the request is allowed, otherwise the milliseconds until it would be.
+    script = """
+    local now = tonumber(ARGV[1])
+    local retry_after = 0
+    for index, key in ipairs(KEYS) do
+        local limit, window = tonumber(ARGV[1 + index * 2]), tonumber(ARGV[2 + index * 2])
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+        if redis.call('ZCARD', key) >= limit then
+            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+            retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+        end
+    end
+    if retry_after > 0 then
+        return retry_after
+    end
+    for index, key in ipairs(KEYS) do
+        redis.call('ZADD', key, now, ARGV[2])
+        redis.call('PEXPIRE', key, ARGV[2 + index * 2])
+    end
+    return 0
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.retry_after = 0
+        ip_rate = self.THROTTLE_RATES.get(f"{self.scope}_ip", self.rate)
+        self.ip_num_requests, self.ip_duration = self.parse_rate(ip_rate)
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    def get_limits(self, request, view) -> list[tuple[str, int, int]]:
+        """
+        (key, limit, window in ms) of every identity of the request.
+        """
+        limits = [(
+            f"{self.key_prefix}:{self.scope}:ip:{self.get_ident(request)}",
+            self.ip_num_requests,
+            self.ip_duration * 1000,
+        )]
+        data = request.data if isinstance(request.data, Mapping) else {}
+        for field in self.ident_fields:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                limits.append((
+                    f"{self.key_prefix}:{self.scope}:{field}:{value.strip().lower()}",
+                    self.num_requests,
+                    self.duration * 1000,
+                ))
+        return limits
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+        limits = self.get_limits(request, view)
+        args = [int(time.time() * 1000), uuid.uuid4().hex]
+        for _, limit, window in limits:
+            args.extend([limit, window])
+        script = self.get_redis_client().register_script(self.script)
+        self.retry_after = script(keys=[key for key, _, _ in limits], args=args)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after / 1000 if self.retry_after else None
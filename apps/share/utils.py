@@ -1,15 +1,9 @@
-import random
 import re
-import string
 import uuid
-from secrets import token_urlsafe
 from typing import Any, Union
 
 import requests
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
 from rest_framework.exceptions import ValidationError
-from django.contrib.auth.hashers import make_password, check_password
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.utils.functional import SimpleLazyObject
@@ -17,11 +11,11 @@ from django.utils.translation import gettext as _
 from django_redis import get_redis_connection
 from rest_framework import status
 from rest_framework.response import Response
-from django.conf import settings
 from core.settings import config
 
 from user.models import Group
 from user.models import User, Policy
+from share.services import OtpService
 
 redis_conn = get_redis_connection("default")
 
@@ -35,26 +29,25 @@ def generate_otp(
         expire_in: int = 120,
         check_if_exists: bool = True
 ) -> tuple[str, str]:
-    otp_code = "".join(random.choices(string.digits, k=6))
-    secret_token = token_urlsafe()
-    redis_conn.set(f"{phone_number_or_email}:otp_secret", secret_token, ex=expire_in)
-    otp_hash = make_password(f"{secret_token}:{otp_code}")
-    key = f"{phone_number_or_email}:otp"
-    if check_if_exists:
-        if redis_conn.exists(key):
-            ttl = redis_conn.ttl(key)
-            raise ValidationError(_("You have a valid OTP code. Please try again in {ttl} seconds.").format(ttl=ttl),
-                                  400)
-    else:
-        redis_conn.delete(key)
-    redis_conn.set(key, otp_hash, ex=expire_in)
-    return otp_code, secret_token
+    return OtpService.generate(phone_number_or_email, expire_in, check_if_exists)
 
 
 def check_otp(phone_number: str, otp_code: str, otp_secret: str) -> None:
-    stored_hash: bytes = redis_conn.get(f"{phone_number}:otp")
-    if not stored_hash or not check_password(f"{otp_secret}:{otp_code}", stored_hash.decode()):
-        raise ValidationError(_("Invalid OTP code."), 400)
+    OtpService.check(phone_number, otp_code, otp_secret)
+
+
+def send_email(email: str, otp_code: str, otp_key: str = None) -> int:
+    """
+    Queues an OTP email (see OtpEmailService) and returns 200, or 400 if it could not
+    be queued.
+    """
+    from user.services import OtpEmailService
+
+    try:
+        OtpEmailService.enqueue(email, otp_code, otp_key=otp_key)
+        return 200
+    except Exception:
+        return 400
 
 
 def response(
@@ -79,27 +72,6 @@ def response(
     )
 
 
-def send_email(email, otp_code):
-    subject = 'Welcome to Our Service!'
-    message = render_to_string('emails/email_template.html', {
-        'email': email,
-        'otp_code': otp_code
-    })
-
-    email = EmailMessage(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [email]
-    )
-    email.content_subtype = 'html'
-    try:
-        email.send(fail_silently=False)
-        return 200
-    except Exception as e:
-        return 400
-
-
 class CustomPasswordValidator:
     def __init__(self, min_length=5, require_digit=True, require_special_character=False):
         self.min_length = min_length
@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from cart.models import Cart, CartItem
+from cart.services import CartService
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestBulkUpdateItemsView:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker, fake_redis, api_client, tokens, user_factory, product_factory):
+        mocker.patch('cart.services.CartService.get_redis_client', lambda: fake_redis)
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.client = api_client(token=tokens(self.user)[0])
+        self.url = '/api/cart/bulk/'
+
+        self.product1 = product_factory(title="product1", quantity=10)
+        self.product2 = product_factory(title="product2", quantity=20)
+        self.product3 = product_factory(title="product3", quantity=5)
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=self.product1, quantity=2)
+
+    def post(self, *items):
+        return self.client.post(self.url, {
+            'items': [{'product_id': str(product.id), 'quantity': quantity} for product, quantity in items]
+        }, format='json')
+
+    def test_bulk_update(self):
+        response = self.post((self.product1, 0), (self.product2, 3), (self.product3, 5))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert {item['product']['title']: item['quantity'] for item in response.data} == {
+            'product2': 3, 'product3': 5,
+        }
+        assert CartService.get_items(self.user.id) == {str(self.product2.id): 3, str(self.product3.id): 5}
+
+    def test_stock_is_checked_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post((self.product2, 21), (self.product3, 6), (self.product1, 1))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data['items']['products']) == {str(self.product2.id), str(self.product3.id)}
+        assert len([query for query in queries.captured_queries if '"product_product"' in query['sql']]) == 1
+        # Nothing is applied when one operation fails.
+        assert CartService.get_items(self.user.id) == {str(self.product1.id): 2}
+
+    @pytest.mark.parametrize('items', [
+        [],
+        [{'product_id': 'invalid-id', 'quantity': 1}],
+        [{'product_id': '1f0e3dad-9990-4e6b-8c5d-0f1c2d3e4f50', 'quantity': 1}],
+        [{'product_id': '1f0e3dad-9990-4e6b-8c5d-0f1c2d3e4f50', 'quantity': -1}],
+    ])
+    def test_invalid_operations(self, items):
+        response = self.client.post(self.url, {'items': items}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_duplicate_products(self):
+        response = self.post((self.product2, 1), (self.product2, 2))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_guest(self, api_client):
+        response = api_client().post(self.url, {
+            'items': [{'product_id': str(self.product2.id), 'quantity': 3}]
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['quantity'] for item in response.data] == [3]
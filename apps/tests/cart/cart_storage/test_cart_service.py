@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from cart.models import Cart, CartItem
+from cart.serializers import CartSerializer
+from cart.services import CartService
+from cart.tasks import flush_carts
+from user.models import Group
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('cart.services.CartService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+@pytest.mark.django_db
+class TestCartService:
+    @pytest.fixture(autouse=True)
+    def setup(self, redis_client, api_client, tokens, user_factory, product_factory):
+        self.redis_client = redis_client
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.client = api_client(token=tokens(self.user)[0])
+
+        self.product1 = product_factory(title="product1", price=10, quantity=10)
+        self.product2 = product_factory(title="product2", price=20, quantity=20)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.product1, quantity=2)
+
+    def test_cart_is_loaded_once(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert CartService.get_items(self.user.id) == {str(self.product1.id): 2}
+        with django_assert_num_queries(0):
+            assert CartService.get_items(self.user.id) == {str(self.product1.id): 2}
+            CartService.set_quantity(self.user.id, self.product2.id, 4)
+            assert CartService.get_items(self.user.id) == {str(self.product1.id): 2, str(self.product2.id): 4}
+
+    def test_only_existing(self):
+        assert not CartService.set_quantity(self.user.id, self.product2.id, 4, only_existing=True)
+        assert CartService.set_quantity(self.user.id, self.product1.id, 5, only_existing=True)
+        assert CartService.get_items(self.user.id) == {str(self.product1.id): 5}
+
+    def test_emptied_cart_stays_empty(self):
+        CartService.empty(self.user.id)
+
+        assert CartService.get_items(self.user.id) == {}
+        assert not CartService.remove(self.user.id, self.product1.id)
+
+    def test_changes_are_written_behind(self, django_assert_max_num_queries):
+        CartService.set_quantity(self.user.id, self.product2.id, 4)
+        CartService.remove(self.user.id, self.product1.id)
+        assert CartItem.objects.filter(cart=self.cart, product=self.product1).exists()
+
+        with django_assert_max_num_queries(8):
+            assert flush_carts() == 1
+
+        assert dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity')) == {
+            self.product2.id: 4,
+        }
+        assert Cart.objects.get(pk=self.cart.pk).total_items == 4
+        assert flush_carts() == 0
+
+    def test_summary_is_counted_without_writing(self):
+        CartService.get_items(self.user.id)
+        CartService.set_quantity(self.user.id, self.product2.id, 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = CartService.get_summary(self.user.id)
+        assert len(queries) == 1
+        assert '"cart_' not in queries[0]['sql']
+        assert summary == {'total_items': 2, 'total_quantity': 6, 'total_price': Decimal('100.00')}
+
+        response = self.client.get('/api/cart/total/')
+        assert response.data == {'total_items': 2, 'total_quantity': 6, 'total_price': 100.0}
+
+    def test_cart_serializer_counts_units(self):
+        CartItem.objects.create(cart=self.cart, product=self.product2, quantity=3)
+
+        data = CartSerializer(Cart.objects.get(pk=self.cart.pk)).data
+        assert (data['total_items'], data['total']) == (5, Decimal('80.00'))
+
+    def test_new_cart_is_created_on_flush(self, user_factory):
+        user = user_factory()
+        CartService.set_quantity(user.id, self.product1.id, 3)
+
+        assert flush_carts() == 1
+        assert CartItem.objects.get(cart__user=user).quantity == 3
+
+    def test_rewritten_items_are_updated_in_place(self):
+        item = CartItem.objects.get(cart=self.cart, product=self.product1)
+        CartService.set_quantity(self.user.id, self.product1.id, 5)
+        CartService.set_quantity(self.user.id, self.product2.id, 1)
+        carts = {str(self.user.id): CartService.get_items(self.user.id)}
+
+        assert CartService.write_carts(carts) == 1
+        assert CartService.write_carts(carts) == 1
+
+        assert CartItem.objects.filter(cart=self.cart).count() == 2
+        assert CartItem.objects.get(pk=item.pk).quantity == 5
+
+    def test_failed_flush_keeps_carts_dirty(self, mocker):
+        CartService.set_quantity(self.user.id, self.product2.id, 4)
+        mocker.patch.object(CartService, 'write_carts', side_effect=RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            CartService.flush()
+        assert self.redis_client.sismember(CartService.dirty_key, str(self.user.id))
+
+    def test_endpoints_do_not_touch_cart_tables(self):
+        CartService.get_items(self.user.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/cart/add/', {'product_id': str(self.product2.id), 'quantity': 1})
+            assert response.status_code == status.HTTP_201_CREATED
+            assert [item['product']['title'] for item in response.data] == ['product2', 'product1']
+
+            response = self.client.get('/api/cart/')
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data) == 2
+
+        assert not [query for query in queries.captured_queries if '"cart_' in query['sql']]
+
+
+def test_parallel_writes_of_a_cart_do_not_duplicate_it(
+        restore_initial_data, transactional_db, redis_client, user_factory, product_factory
+):
+    user = user_factory()
+    products = product_factory.create_batch(3)
+    carts = {str(user.id): {str(product.id): 2 for product in products}}
+
+    def write(_):
+        try:
+            return CartService.write_carts(carts)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        assert list(executor.map(write, range(10))) == [1] * 10
+
+    assert Cart.objects.filter(user=user).count() == 1
+    assert CartItem.objects.filter(cart__user=user).count() == 3
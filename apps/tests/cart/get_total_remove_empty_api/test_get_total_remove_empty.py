@@ -1,6 +1,7 @@
 import pytest
 from rest_framework import status
 from cart.models import Cart, CartItem
+from cart.services import CartService
 from user.models import Group
 
 
@@ -16,9 +17,9 @@ class TestCartViews:
         self.access, _ = tokens(self.user)
         self.client = api_client(token=self.access)
 
-        self.url_get_total = '/cart/total/'
-        self.url_remove_item = '/cart/remove/{product_id}/'
-        self.url_empty_cart = '/cart/empty/'
+        self.url_get_total = '/api/cart/total/'
+        self.url_remove_item = '/api/cart/remove/{product_id}/'
+        self.url_empty_cart = '/api/cart/empty/'
 
         self.product1 = product_factory(title="product1", price=10.12, quantity=10)
         self.product2 = product_factory(title="product2", price=20.43, quantity=20)
@@ -44,6 +45,8 @@ class TestCartViews:
         url = self.url_remove_item.format(product_id=self.product1.id)
         response = self.client.delete(url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert str(self.product1.id) not in CartService.get_items(self.user.id)
+        CartService.flush()
         assert not CartItem.objects.filter(cart=self.cart, product=self.product1).exists()
 
     def test_remove_item_required_view_authenticated(self):
@@ -59,4 +62,6 @@ class TestCartViews:
     def test_empty_cart_view_authenticated(self):
         response = self.client.delete(self.url_empty_cart)
         assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert CartService.get_items(self.user.id) == {}
+        CartService.flush()
         assert not CartItem.objects.filter(cart=self.cart).exists()
@@ -0,0 +1,119 @@
+import pytest
+from rest_framework import status
+
+from cart.models import Cart, CartItem
+from cart.services import CartService, GuestCartService
+from cart.throttling import GuestCartThrottle
+
+
+@pytest.mark.django_db
+class TestGuestCart:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker, fake_redis, api_client, product_factory):
+        mocker.patch('cart.services.CartService.get_redis_client', lambda: fake_redis)
+        mocker.patch('share.throttling.SlidingWindowThrottle.get_redis_client', lambda: fake_redis)
+        self.redis_client = fake_redis
+        self.client = api_client()
+        self.product1 = product_factory(title="product1", price=10, quantity=10)
+        self.product2 = product_factory(title="product2", price=20, quantity=20)
+
+    def add(self, product, quantity):
+        return self.client.post('/api/cart/add/', {'product_id': str(product.id), 'quantity': quantity})
+
+    def test_guest_builds_a_cart(self):
+        response = self.add(self.product1, 2)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert GuestCartService.cookie_name in response.cookies
+        self.add(self.product2, 1)
+
+        response = self.client.get('/api/cart/')
+        assert {item['product']['title']: item['quantity'] for item in response.data} == {
+            'product1': 2, 'product2': 1,
+        }
+        response = self.client.get('/api/cart/total/')
+        assert response.data == {'total_items': 2, 'total_quantity': 3, 'total_price': 40.0}
+        assert not CartItem.objects.exists()
+
+    def test_new_guest_carts_are_limited_per_ip(self, api_client):
+        limit = GuestCartThrottle().num_requests
+        for _ in range(limit - 1):
+            assert api_client().post(
+                '/api/cart/add/', {'product_id': str(self.product1.id), 'quantity': 1}
+            ).status_code == status.HTTP_201_CREATED
+        assert self.add(self.product1, 1).status_code == status.HTTP_201_CREATED
+
+        response = api_client().post('/api/cart/bulk/', {'items': []}, format='json')
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        # A guest with a cart keeps changing it.
+        assert self.add(self.product2, 1).status_code == status.HTTP_201_CREATED
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add(self.product1, 2)
+        self.client.cookies[GuestCartService.cookie_name] = 'someone-elses-cart'
+
+        response = self.client.get('/api/cart/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+
+    def test_guest_without_cart(self):
+        assert self.client.get('/api/cart/').data == []
+        assert self.client.delete(f'/api/cart/remove/{self.product1.id}/').status_code == status.HTTP_404_NOT_FOUND
+        assert not self.redis_client.keys('guest_cart:*')
+
+    def test_guest_cart_is_merged_on_login(self, user_factory):
+        user = user_factory.create(password='random_password1')
+        CartItem.objects.create(cart=Cart.objects.create(user=user), product=self.product1, quantity=1)
+        self.add(self.product1, 2)
+        self.add(self.product2, 4)
+
+        response = self.client.post('/api/users/login/', {
+            'email_or_phone_number': user.email, 'password': 'random_password1',
+        })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.cookies[GuestCartService.cookie_name].value == ''
+        assert CartService.get_items(user.id) == {str(self.product1.id): 3, str(self.product2.id): 4}
+        assert not self.redis_client.keys('guest_cart:*')
+
+    def test_merge_is_limited_to_stock(self, user_factory, product_factory):
+        user = user_factory()
+        deleted = product_factory(quantity=5)
+        CartService.set_quantity(user.id, self.product1.id, 8)
+        GuestCartService.change('guest', {self.product1.id: 5, self.product2.id: 30, deleted.id: 1})
+        deleted.delete()
+
+        assert CartService.merge(user.id, 'guest') == 2
+        assert CartService.get_items(user.id) == {str(self.product1.id): 10, str(self.product2.id): 20}
+
+    def test_products_added_while_merging_are_merged(self, user_factory, mocker):
+        user = user_factory()
+        CartService.get_items(user.id)
+        GuestCartService.set_quantity('guest', self.product1.id, 2)
+        hkeys = self.redis_client.hkeys
+
+        def add_after_read(key):
+            product_ids = hkeys(key)
+            self.redis_client.hset(key, str(self.product2.id), 3)
+            return product_ids
+
+        mocker.patch.object(self.redis_client, 'hkeys', add_after_read)
+
+        assert CartService.merge(user.id, 'guest') == 2
+        assert CartService.get_items(user.id) == {str(self.product1.id): 2, str(self.product2.id): 3}
+        assert not self.redis_client.exists(GuestCartService.get_cart_key('guest'))
+
+    def test_merge_is_one_query_and_one_script(self, user_factory, mocker, django_assert_num_queries):
+        user = user_factory()
+        CartService.get_items(user.id)
+        # Loads the script, which a first call does on its own.
+        GuestCartService.set_quantity('other', self.product2.id, 1)
+        CartService.merge(user.id, 'other')
+        GuestCartService.set_quantity('guest', self.product1.id, 2)
+        execute_command = mocker.spy(self.redis_client, 'execute_command')
+
+        with django_assert_num_queries(1):
+            assert CartService.merge(user.id, 'guest') == 1
+        assert [call.args[0] for call in execute_command.call_args_list] == ['HKEYS', 'EVALSHA']
+        assert CartService.merge(user.id, 'guest') == 0
@@ -5,6 +5,7 @@ from django.core.management import call_command
 from faker import Faker
 from pytest_factoryboy import register
 from tests.factories.user_factory import UserFactory
+from tests.factories.product_factory import CategoryFactory, ProductFactory
 
 try:
     from rest_framework.test import APIClient
@@ -17,6 +18,8 @@ except ImportError:
     pass
 
 register(UserFactory)
+register(CategoryFactory)
+register(ProductFactory)
 
 fake = Faker()
 
@@ -70,6 +73,14 @@ def django_db_setup(django_db_setup, django_db_blocker):
         pass
 
 
+@pytest.fixture
+def restore_initial_data(django_db_blocker):
+    # A transactional test flushes the database, taking the groups and policies with it.
+    yield
+    with django_db_blocker.unblock():
+        call_command('initial_data')
+
+
 @pytest.fixture
 def fake_uuid():
     return uuid.uuid4()
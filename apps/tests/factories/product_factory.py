@@ -0,0 +1,33 @@
+import factory
+
+from faker import Faker
+
+from product.models import Category, Product
+from tests.factories.user_factory import UserFactory
+
+fake = Faker()
+
+
+class CategoryFactory(factory.django.DjangoModelFactory):
+    """This class will create fake data for category"""
+
+    class Meta:
+        model = Category
+
+    name = factory.LazyFunction(fake.word)
+    parent = None
+    is_active = True
+
+
+class ProductFactory(factory.django.DjangoModelFactory):
+    """This class will create fake data for product"""
+
+    class Meta:
+        model = Product
+
+    seller = factory.SubFactory(UserFactory)
+    category = factory.SubFactory(CategoryFactory)
+    title = factory.LazyFunction(lambda: fake.sentence(nb_words=3))
+    description = factory.LazyFunction(fake.text)
+    price = factory.LazyFunction(lambda: fake.pyfloat(left_digits=3, right_digits=2, positive=True))
+    quantity = factory.LazyFunction(lambda: fake.pyint(min_value=1, max_value=100))
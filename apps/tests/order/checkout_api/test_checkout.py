@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from rest_framework import serializers, status
+
+from cart.models import Cart, CartItem
+from order.models import Order, OrderItem
+from order.serializers import OrderCreateSerializer
+from product.models import Product
+from product.services import InventoryService
+from user.models import Group
+
+CHECKOUT_DATA = {
+    'payment_method': 'card',
+    'country_region': 'Uzbekistan',
+    'city': 'Tashkent',
+    'state_province_region': 'Tashkent',
+    'postal_zip_code': '100000',
+    'telephone_number': '+998901234567',
+    'address_line_1': 'Amir Temur 1',
+}
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('product.services.InventoryService.get_redis_client', lambda: fake_redis)
+    mocker.patch('cart.services.CartService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+def checkout(user):
+    serializer = OrderCreateSerializer(data=CHECKOUT_DATA, context={'request': SimpleNamespace(user=user)})
+    serializer.is_valid(raise_exception=True)
+    return serializer.save(user=user)
+
+
+@pytest.mark.django_db
+class TestCheckout:
+    @pytest.fixture(autouse=True)
+    def setup(self, redis_client, api_client, tokens, user_factory, product_factory):
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+
+        self.access, _ = tokens(self.user)
+        self.client = api_client(token=self.access)
+        self.url = '/api/orders/checkout/'
+
+        self.product1 = product_factory(title="product1", price=10.12, quantity=10)
+        self.product2 = product_factory(title="product2", price=20.43, quantity=20)
+
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.product1, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.product2, quantity=3)
+
+    def test_checkout_creates_order_and_holds_stock(self, redis_client):
+        response = self.client.post(self.url, CHECKOUT_DATA)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Decimal(response.data['amount']) == Decimal('81.53')
+        assert len(response.data['order_items']) == 2
+        # Stock is only held until the order is paid.
+        assert Product.objects.get(pk=self.product1.pk).quantity == 10
+        assert redis_client.hget(InventoryService.get_product_key(self.product1.id), 'held') == b'2'
+        assert redis_client.hget(InventoryService.get_product_key(self.product2.id), 'held') == b'3'
+
+    def test_checkout_queries(self, django_assert_max_num_queries):
+        # User lock, cart load (first use only), products, pending order check, stock
+        # load, order insert, one bulk insert of items, amount sum and amount update,
+        # plus the savepoint pair around them.
+        with django_assert_max_num_queries(11):
+            order = checkout(self.user)
+
+        assert order.amount == Decimal('81.53')
+        assert OrderItem.objects.filter(order=order).count() == 2
+
+    def test_checkout_insufficient_stock(self, redis_client):
+        Product.objects.filter(pk=self.product2.pk).update(quantity=2)
+
+        response = self.client.post(self.url, CHECKOUT_DATA)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Order.objects.filter(user=self.user).exists()
+        assert not redis_client.hget(InventoryService.get_product_key(self.product1.id), 'held')
+        assert not redis_client.hget(InventoryService.get_product_key(self.product2.id), 'held')
+
+
+def test_parallel_checkouts_do_not_oversell(
+        restore_initial_data, transactional_db, redis_client, user_factory, product_factory
+):
+    product = product_factory(quantity=10)
+    buyers = user_factory.create_batch(50)
+    for buyer in buyers:
+        CartItem.objects.create(cart=Cart.objects.create(user=buyer), product=product, quantity=1)
+
+    def attempt(buyer):
+        try:
+            checkout(buyer)
+            return True
+        except serializers.ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=50) as executor:
+        results = list(executor.map(attempt, buyers))
+
+    assert results.count(True) == 10
+    assert OrderItem.objects.filter(product=product).count() == 10
+
+    for order in Order.objects.filter(order_items__product=product):
+        assert InventoryService.commit(order.id)
+    InventoryService.flush()
+    assert Product.objects.get(pk=product.pk).quantity == 0
@@ -0,0 +1,93 @@
+import pytest
+from rest_framework import status
+
+from order.models import Order
+from order.services import OrderService
+from product.models import Product
+from product.services import InventoryService
+from share.enums import OrderStatus
+from user.models import Group
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('product.services.InventoryService.get_redis_client', lambda: fake_redis)
+    mocker.patch('cart.services.CartService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+@pytest.mark.django_db
+class TestPaymentConfirm:
+    @pytest.fixture(autouse=True)
+    def setup(self, redis_client, api_client, tokens, user_factory, product_factory):
+        self.redis_client = redis_client
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        access, _ = tokens(self.user)
+        self.client = api_client(token=access)
+
+        self.product = product_factory(quantity=4)
+        self.order = Order.objects.create(user=self.user, amount=10, transaction_id='pi_test')
+        InventoryService.reserve(self.order.id, {self.product.id: 2}, 60)
+        self.url = f'/api/payment/{self.order.id}/confirm/'
+
+    def test_confirm_commits_hold(self, mocker):
+        mocker.patch('stripe.PaymentIntent.confirm', return_value={'status': 'succeeded'})
+
+        response = self.client.patch(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.PAID.value
+        InventoryService.flush()
+        assert Product.objects.get(pk=self.product.pk).quantity == 2
+
+    def test_confirm_after_expiry_is_refunded(self, mocker):
+        def expire_during_charge(transaction_id):
+            self.redis_client.zadd(InventoryService.holds_key, {str(self.order.id): 0})
+            OrderService.expire_reservations()
+            return {'status': 'succeeded'}
+
+        mocker.patch('stripe.PaymentIntent.confirm', side_effect=expire_during_charge)
+        refund = mocker.patch('stripe.Refund.create')
+
+        response = self.client.patch(self.url)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        refund.assert_called_once_with(payment_intent='pi_test')
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.CANCELED.value
+        InventoryService.flush()
+        assert Product.objects.get(pk=self.product.pk).quantity == 4
+
+    def test_success_commits_hold(self, mocker):
+        mocker.patch('stripe.checkout.Session.retrieve', return_value={'payment_status': 'paid'})
+
+        response = self.client.patch(f'/api/payment/{self.order.id}/success/')
+
+        assert response.status_code == status.HTTP_200_OK
+        order = Order.objects.get(pk=self.order.pk)
+        assert (order.status, order.is_paid) == (OrderStatus.PAID.value, True)
+        InventoryService.flush()
+        assert Product.objects.get(pk=self.product.pk).quantity == 2
+
+    def test_success_after_expiry_is_refunded(self, mocker):
+        self.redis_client.zadd(InventoryService.holds_key, {str(self.order.id): 0})
+        OrderService.expire_reservations()
+        mocker.patch(
+            'stripe.checkout.Session.retrieve', return_value={'payment_status': 'paid', 'payment_intent': 'pi_session'}
+        )
+        refund = mocker.patch('stripe.Refund.create')
+
+        response = self.client.patch(f'/api/payment/{self.order.id}/success/')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        refund.assert_called_once_with(payment_intent='pi_session')
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.CANCELED.value
+        InventoryService.flush()
+        assert Product.objects.get(pk=self.product.pk).quantity == 4
+
+    def test_cancel_releases_hold(self):
+        response = self.client.patch(f'/api/payment/{self.order.id}/cancel/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.CANCELED.value
+        assert self.redis_client.hget(InventoryService.get_product_key(self.product.id), 'held') == b'0'
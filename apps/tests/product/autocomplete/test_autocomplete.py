@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from product.services import AutocompleteService
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestAutocomplete:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, category_factory, product_factory):
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.user.save()
+        self.client = api_client(tokens(self.user)[0])
+        self.url = '/api/products/autocomplete/'
+
+        self.category = category_factory(name="Headphones")
+        self.prefix_match = product_factory(title="Headphones pro", category=self.category)
+        self.word_match = product_factory(title="Wireless headphones", category=self.category)
+        product_factory(title="Running shoes", category=self.category)
+
+    def autocomplete(self, q, **params):
+        AutocompleteService.get_redis_client().delete(AutocompleteService.cache_key.format(
+            limit=params.get('limit', 10), query=AutocompleteService.normalize(q)
+        ))
+        return self.client.get(self.url, {'q': q, **params})
+
+    def test_prefix_matches_rank_first(self):
+        response = self.autocomplete('head')
+        assert response.status_code == status.HTTP_200_OK
+        assert [product['id'] for product in response.data['products']] == [
+            str(self.prefix_match.id), str(self.word_match.id)
+        ]
+        assert response.data['categories'] == [{'id': str(self.category.id), 'name': 'Headphones'}]
+
+    def test_typos_are_tolerated(self):
+        response = self.autocomplete('headphnes')
+        assert str(self.word_match.id) in [product['id'] for product in response.data['products']]
+
+    def test_limit(self):
+        response = self.autocomplete('head', limit=1)
+        assert [product['id'] for product in response.data['products']] == [str(self.prefix_match.id)]
+
+    def test_repeated_queries_are_cached(self):
+        self.autocomplete('Head')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'q': ' head '})
+        assert len(response.data['products']) == 2
+        assert not [query for query in queries if 'product_product' in query['sql']]
+
+    def test_query_is_validated(self):
+        assert self.client.get(self.url).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.get(self.url, {'q': 'h'}).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,49 @@
+import pytest
+from rest_framework import status
+
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestCategoryProductsIncludeDescendants:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, category_factory, product_factory):
+        self.user = user_factory()
+        buyer_group = Group.objects.get(name="buyer")
+        self.user.groups.add(buyer_group)
+        self.user.save()
+
+        self.access, _ = tokens(self.user)
+        self.client = api_client(self.access)
+
+        self.root = category_factory(name="Electronics")
+        self.phones = category_factory(name="Phones", parent=self.root)
+        self.smartphones = category_factory(name="Smartphones", parent=self.phones)
+        self.books = category_factory(name="Books")
+
+        product_factory(category=self.root)
+        product_factory.create_batch(2, category=self.phones)
+        product_factory.create_batch(3, category=self.smartphones)
+        product_factory.create_batch(4, category=self.books)
+
+        self.url = '/api/products/categories/{category_id}/products/'
+
+    @pytest.mark.parametrize("include_descendants, expected_count", [
+        (None, 1),
+        ("false", 1),
+        ("true", 6),
+        ("1", 6),
+    ])
+    def test_root_category_products(self, include_descendants, expected_count):
+        params = {'include_descendants': include_descendants} if include_descendants else {}
+        response = self.client.get(self.url.format(category_id=self.root.id), params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == expected_count
+
+    def test_subtree_products_only(self):
+        response = self.client.get(self.url.format(category_id=self.phones.id), {'include_descendants': 'true'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 5
+        assert {product['category']['id'] for product in response.data['results']} == {
+            str(self.phones.id), str(self.smartphones.id)
+        }
@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.permissions import BasePermission
+
+from product.models import Category
+from product.services import CategoryTreeService
+from product.views import CategoryViewSet
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestCategoryTree:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, category_factory):
+        CategoryTreeService.bump_version()
+        self.user = user_factory()
+        buyer_group = Group.objects.get(name="buyer")
+        self.user.groups.add(buyer_group)
+        self.user.save()
+
+        self.access, _ = tokens(self.user)
+        self.client = api_client(self.access)
+        self.api = '/api/products/categories/'
+
+        self.root = category_factory(name="Electronics")
+        parent = self.root
+        for level in range(4):
+            for index in range(3):
+                category_factory(name=f"level{level}-{index}", parent=parent)
+            parent = Category.objects.filter(parent=parent).first()
+        self.leaf = parent
+
+    def get(self, url, params=None):
+        self.client.get(url, params)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def category_queries(self, queries):
+        return [sql for sql in queries if '"product_category"' in sql]
+
+    def test_list_returns_nested_tree(self):
+        response, queries = self.get(self.api)
+        assert self.category_queries(queries) == []
+        root = response.data['results'][0]
+        assert root['id'] == str(self.root.id)
+        assert len(root['children']) == 3
+        depth, node = 0, root
+        while node['children']:
+            node = next(child for child in node['children'] if child['children']) \
+                if any(child['children'] for child in node['children']) else node['children'][0]
+            depth += 1
+        assert depth == 4
+
+    def test_search_costs_one_query(self):
+        response, queries = self.get(self.api, {'search': 'level0-1'})
+        assert len(self.category_queries(queries)) == 1
+        assert [category['name'] for category in response.data['results']] == ['Electronics']
+
+    def test_retrieve_costs_no_category_query(self):
+        response, queries = self.get(f'{self.api}{self.root.id}/')
+        assert self.category_queries(queries) == []
+        assert response.data['id'] == str(self.root.id)
+        assert len(response.data['children']) == 3
+
+    def test_retrieve_checks_object_permissions(self, mocker):
+        class DenyLeaf(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.pk != self.leaf_id
+
+        DenyLeaf.leaf_id = self.leaf.pk
+        mocker.patch.object(CategoryViewSet, 'permission_classes', [DenyLeaf])
+
+        assert self.client.get(f'{self.api}{self.root.id}/').status_code == status.HTTP_200_OK
+        assert self.client.get(f'{self.api}{self.leaf.id}/').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_save_and_delete_invalidate_snapshot(self, category_factory):
+        category_factory(name="Fresh", parent=self.root)
+        response = self.client.get(f'{self.api}{self.root.id}/')
+        assert "Fresh" in [child['name'] for child in response.data['children']]
+
+        Category.objects.get(name="Fresh").delete()
+        response = self.client.get(f'{self.api}{self.root.id}/')
+        assert "Fresh" not in [child['name'] for child in response.data['children']]
+
+    def test_children_are_newest_first(self):
+        response = self.client.get(f'{self.api}{self.root.id}/')
+        assert [child['name'] for child in response.data['children']] == ['level0-2', 'level0-1', 'level0-0']
@@ -0,0 +1,129 @@
+import time
+import uuid
+
+import pytest
+
+from order.models import Order
+from order.services import OrderService
+from product.models import Product
+from product.services import InventoryService
+from share.enums import OrderStatus
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('product.services.InventoryService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+def held(redis_client, product):
+    return int(redis_client.hget(InventoryService.get_product_key(product.id), 'held') or 0)
+
+
+@pytest.mark.django_db
+class TestInventoryService:
+    @pytest.fixture(autouse=True)
+    def setup(self, redis_client, product_factory):
+        self.redis_client = redis_client
+        self.product1 = product_factory(quantity=5)
+        self.product2 = product_factory(quantity=3)
+
+    def test_reserve_holds_all_or_nothing(self):
+        first, second = uuid.uuid4(), uuid.uuid4()
+
+        assert InventoryService.reserve(first, {self.product1.id: 4, self.product2.id: 1}, 60) is None
+        assert InventoryService.reserve(second, {self.product2.id: 1, self.product1.id: 2}, 60) == str(self.product1.id)
+
+        assert held(self.redis_client, self.product1) == 4
+        assert held(self.redis_client, self.product2) == 1
+        assert not self.redis_client.exists(InventoryService.hold_key.format(order_id=second))
+
+    def test_reserve_sets_hold_deadline(self):
+        order_id = uuid.uuid4()
+        before = time.time()
+
+        assert InventoryService.reserve(order_id, {self.product1.id: 1}, 60) is None
+
+        deadline = self.redis_client.zscore(InventoryService.holds_key, str(order_id))
+        assert before + 59 <= deadline <= time.time() + 60
+        assert self.redis_client.hgetall(InventoryService.hold_key.format(order_id=order_id)) == {
+            str(self.product1.id).encode(): b'1',
+        }
+
+    def test_release_gives_stock_back(self):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.product1.id: 5}, 60)
+
+        assert InventoryService.release(order_id)
+        assert not InventoryService.release(order_id)
+        assert held(self.redis_client, self.product1) == 0
+        assert InventoryService.reserve(uuid.uuid4(), {self.product1.id: 5}, 60) is None
+
+    def test_commit_is_flushed_in_one_update(self, django_assert_num_queries):
+        first, second = uuid.uuid4(), uuid.uuid4()
+        InventoryService.reserve(first, {self.product1.id: 2, self.product2.id: 3}, 60)
+        InventoryService.reserve(second, {self.product1.id: 1}, 60)
+
+        assert InventoryService.commit(first)
+        assert InventoryService.commit(second)
+        # Committed stock stays unavailable until it is flushed.
+        assert InventoryService.reserve(uuid.uuid4(), {self.product1.id: 3}, 60) == str(self.product1.id)
+
+        with django_assert_num_queries(1):
+            assert InventoryService.flush() == 2
+
+        assert Product.objects.get(pk=self.product1.pk).quantity == 2
+        assert Product.objects.get(pk=self.product2.pk).quantity == 0
+        assert InventoryService.reserve(uuid.uuid4(), {self.product1.id: 2}, 60) is None
+
+    def test_failed_flush_is_restored(self, mocker):
+        order_id = uuid.uuid4()
+        InventoryService.reserve(order_id, {self.product1.id: 2}, 60)
+        InventoryService.commit(order_id)
+        write_stock = mocker.patch.object(InventoryService, 'write_stock', side_effect=RuntimeError)
+
+        with pytest.raises(RuntimeError):
+            InventoryService.flush()
+        mocker.stop(write_stock)
+
+        assert InventoryService.flush() == 1
+        assert Product.objects.get(pk=self.product1.pk).quantity == 3
+
+    def test_edited_quantity_is_reloaded(self):
+        InventoryService.reserve(uuid.uuid4(), {self.product1.id: 5}, 60)
+
+        self.product1.quantity = 8
+        self.product1.save()
+
+        assert InventoryService.reserve(uuid.uuid4(), {self.product1.id: 3}, 60) is None
+        assert held(self.redis_client, self.product1) == 8
+
+
+@pytest.mark.django_db
+def test_expired_holds_cancel_pending_orders(redis_client, user_factory, product_factory):
+    product = product_factory(quantity=4)
+    pending = Order.objects.create(user=user_factory())
+    paid = Order.objects.create(user=user_factory(), status=OrderStatus.PAID.value)
+    for order in (pending, paid):
+        InventoryService.reserve(order.id, {product.id: 2}, 60)
+    redis_client.zadd(InventoryService.holds_key, {str(pending.id): 0, str(paid.id): 0})
+
+    assert OrderService.expire_reservations() == 1
+
+    pending.refresh_from_db()
+    assert pending.status == OrderStatus.CANCELED.value
+    assert held(redis_client, product) == 0
+    assert redis_client.zcard(InventoryService.holds_key) == 0
+    InventoryService.flush()
+    assert Product.objects.get(pk=product.pk).quantity == 2
+
+
+@pytest.mark.django_db
+def test_live_holds_are_kept(redis_client, user_factory, product_factory):
+    product = product_factory(quantity=4)
+    order = Order.objects.create(user=user_factory())
+    InventoryService.reserve(order.id, {product.id: 2}, 60)
+
+    assert OrderService.expire_reservations() == 0
+    assert redis_client.zscore(InventoryService.holds_key, str(order.id)) > time.time()
+    assert held(redis_client, product) == 2
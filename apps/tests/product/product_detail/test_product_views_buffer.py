@@ -0,0 +1,72 @@
+import pytest
+from rest_framework import status
+
+from product.models import Product, ProductViews
+from product.services import ProductViewService
+from product.tasks import flush_product_views
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestProductViewsBuffer:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, user_factory, tokens, product_factory):
+        ProductViewService.get_redis_client().delete(ProductViewService.dirty_key)
+        self.user = user_factory()
+        buyer_group = Group.objects.get(name="buyer")
+        self.user.groups.add(buyer_group)
+        self.user.save()
+
+        self.access, _ = tokens(self.user)
+        self.client = api_client(self.access)
+        self.product = product_factory(views=0)
+        self.url = f'/api/products/{self.product.id}/'
+
+    def view(self, ip):
+        response = self.client.get(self.url, REMOTE_ADDR=ip)
+        assert response.status_code == status.HTTP_200_OK
+        return response
+
+    def test_views_are_buffered_until_flush(self):
+        self.view('10.0.0.1')
+        self.view('10.0.0.1')
+        response = self.view('10.0.0.2')
+
+        assert response.data['views'] == 2
+        assert not ProductViews.objects.filter(product=self.product).exists()
+        self.product.refresh_from_db()
+        assert self.product.views == 0
+
+        assert flush_product_views() == 2
+        self.product.refresh_from_db()
+        assert self.product.views == 2
+        assert ProductViews.objects.filter(product=self.product).count() == 2
+        assert self.view('10.0.0.1').data['views'] == 2
+
+    def test_flush_skips_ips_already_stored(self):
+        ProductViews.objects.create(product=self.product, ip='10.0.0.1')
+        Product.objects.filter(id=self.product.id).update(views=1)
+        assert self.view('10.0.0.1').data['views'] == 1
+        assert self.view('10.0.0.3').data['views'] == 2
+
+        assert flush_product_views() == 1
+        assert Product.objects.get(id=self.product.id).views == 2
+        assert flush_product_views() == 0
+
+    def test_flush_drops_views_of_deleted_products(self, product_factory):
+        other = product_factory()
+        ProductViewService.record_view(other.id, '10.0.0.4')
+        other.delete()
+        self.view('10.0.0.5')
+
+        assert flush_product_views() == 1
+        assert ProductViews.objects.count() == 1
+
+    def test_viewers_expire_a_day_after_the_first_view(self):
+        redis_client = ProductViewService.get_redis_client()
+        viewers_key, _, _ = ProductViewService.get_keys(self.product.id)
+        self.view('10.0.0.6')
+        redis_client.expire(viewers_key, 60)
+
+        self.view('10.0.0.7')
+        assert 0 < redis_client.ttl(viewers_key) <= 60
@@ -0,0 +1,95 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+
+from product.models import ProductDailyStats, ProductViews
+from product.services import ProductStatsService
+from product.tasks import rollup_product_stats
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestProductStats:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, user_factory, tokens, product_factory):
+        ProductStatsService.get_redis_client().delete(ProductStatsService.days_key)
+        self.seller = user_factory()
+        self.seller.groups.add(Group.objects.get(name="seller"))
+        self.seller.save()
+        self.buyer = user_factory()
+        self.buyer.groups.add(Group.objects.get(name="buyer"))
+        self.buyer.save()
+
+        self.seller_client = api_client(tokens(self.seller)[0])
+        self.buyer_client = api_client(tokens(self.buyer)[0])
+        self.product = product_factory(seller=self.seller)
+        self.today = ProductStatsService.today()
+        self.url = f'/api/products/{self.product.id}/stats/'
+
+    def view(self, ip):
+        response = self.buyer_client.get(f'/api/products/{self.product.id}/', REMOTE_ADDR=ip)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_live_views_are_counted(self):
+        self.view('10.0.0.1')
+        self.view('10.0.0.1')
+        self.view('10.0.0.2')
+
+        response = self.seller_client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['unique_viewers'] == 2
+        assert len(response.data['daily']) == 30
+        assert response.data['daily'][-1] == {'date': self.today.isoformat(), 'unique_viewers': 2}
+
+    def test_rollup_keeps_counts_after_sketches_expire(self):
+        self.view('10.0.0.1')
+        self.view('10.0.0.2')
+
+        assert rollup_product_stats() == 1
+        stats = ProductDailyStats.objects.get(product=self.product, date=self.today)
+        assert stats.unique_viewers == 2
+
+        sketch_key, _, _ = ProductStatsService.get_keys(self.product.id, self.today)
+        ProductStatsService.get_redis_client().delete(sketch_key)
+        response = self.seller_client.get(self.url, {'start': self.today.isoformat()})
+        assert response.data['unique_viewers'] == 2
+
+    def test_window_merges_days(self):
+        yesterday = self.today - datetime.timedelta(days=1)
+        ProductStatsService.add_viewers({
+            (str(self.product.id), yesterday): {'10.0.0.1', '10.0.0.2'},
+            (str(self.product.id), self.today): {'10.0.0.2', '10.0.0.3'},
+        })
+
+        response = self.seller_client.get(self.url, {'start': yesterday.isoformat(), 'end': self.today.isoformat()})
+        assert response.data['unique_viewers'] == 3
+        assert [day['unique_viewers'] for day in response.data['daily']] == [2, 2]
+
+    def test_invalid_window(self):
+        response = self.seller_client.get(self.url, {'start': '2026-02-01', 'end': '2026-01-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.seller_client.get(self.url, {'start': '2020-01-01', 'end': '2026-01-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stats_of_other_sellers_product(self, user_factory, tokens, api_client):
+        other_seller = user_factory()
+        other_seller.groups.add(Group.objects.get(name="seller"))
+        response = api_client(tokens(other_seller)[0]).get(self.url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_migrate_and_prune_product_views(self):
+        old_view = ProductViews.objects.create(product=self.product, ip='10.0.0.1')
+        ProductViews.objects.filter(id=old_view.id).update(
+            created_at=old_view.created_at - datetime.timedelta(days=60)
+        )
+        ProductViews.objects.create(product=self.product, ip='10.0.0.2')
+
+        call_command('migrate_product_views', '--prune')
+        call_command('migrate_product_views')
+
+        assert list(ProductViews.objects.values_list('ip', flat=True)) == ['10.0.0.2']
+        assert ProductDailyStats.objects.filter(product=self.product).count() == 2
+        response = self.seller_client.get(self.url, {'start': (self.today - datetime.timedelta(days=90)).isoformat()})
+        assert response.data['unique_viewers'] == 2
@@ -0,0 +1,76 @@
+import pytest
+from django.db.models import F
+from rest_framework import status
+
+from product.models import Product
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, category_factory, product_factory):
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.user.save()
+        self.client = api_client(tokens(self.user)[0])
+        self.url = '/api/products/'
+
+        category = category_factory()
+        for views in [3, 1, 3, 0, 2]:
+            product_factory(category=category, views=views)
+
+    def walk(self, params):
+        ids = []
+        response = self.client.get(self.url, {'pagination': 'cursor', **params})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            ids.extend(product['id'] for product in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_pages_follow_created_at(self):
+        ids, last_page = self.walk({'limit': 2})
+        expected = [str(pk) for pk in Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        assert ids == expected
+
+        previous = self.client.get(last_page.data['previous'])
+        assert [product['id'] for product in previous.data['results']] == expected[2:4]
+
+    def test_pages_follow_views_with_ties(self):
+        ids, _ = self.walk({'limit': 2, 'ordering': '-views'})
+        expected = [str(pk) for pk in Product.objects.order_by('-views', '-id').values_list('id', flat=True)]
+        assert ids == expected
+
+    @pytest.mark.parametrize('ordering, order', [
+        ('-created_at', (F('created_at').desc(nulls_last=True), '-id')),
+        ('created_at', (F('created_at').asc(nulls_first=True), 'id')),
+    ])
+    def test_pages_cross_null_created_at(self, ordering, order):
+        Product.objects.filter(pk__in=list(Product.objects.values_list('id', flat=True)[:3])).update(created_at=None)
+        expected = [str(pk) for pk in Product.objects.order_by(*order).values_list('id', flat=True)]
+
+        ids, page = self.walk({'limit': 2, 'ordering': ordering})
+        assert ids == expected
+
+        back = []
+        while page.data['previous']:
+            page = self.client.get(page.data['previous'])
+            assert page.status_code == status.HTTP_200_OK
+            back = [product['id'] for product in page.data['results']] + back
+        assert back == expected[:4]
+
+    def test_offset_pagination_is_the_default(self):
+        response = self.client.get(self.url, {'limit': 2})
+        assert response.data['count'] == 5
+        response = self.client.get(self.url, {'offset': 4, 'limit': 2})
+        assert len(response.data['results']) == 1
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        first_page = self.client.get(self.url, {'pagination': 'cursor', 'limit': 2})
+        next_link = first_page.data['next'] + '&ordering=views'
+        assert self.client.get(next_link).status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,41 @@
+import pytest
+from rest_framework import status
+
+from product.models import Product
+from user.models import Group
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, product_factory):
+        self.user = user_factory()
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.user.save()
+        self.client = api_client(tokens(self.user)[0])
+        self.url = '/api/products/'
+
+        self.in_title = product_factory(title="Wireless headphones", description="Great sound")
+        self.in_description = product_factory(title="Speaker", description="Pairs with wireless headphones")
+        self.other = product_factory(title="Running shoes", description="Light and comfortable")
+
+    def search(self, term):
+        response = self.client.get(self.url, {'search': term})
+        assert response.status_code == status.HTTP_200_OK
+        return [product['id'] for product in response.data['results']]
+
+    def test_search_vector_is_maintained(self):
+        self.other.title = "Keyboard"
+        self.other.save()
+        assert Product.objects.filter(search_vector="keyboard").exists()
+        assert self.search('running') == []
+
+    def test_title_matches_rank_first(self):
+        assert self.search('headphones') == [str(self.in_title.id), str(self.in_description.id)]
+
+    def test_stemming_and_prefixes(self):
+        assert self.search('run') == [str(self.other.id)]
+        assert self.search('wirel head') == [str(self.in_title.id), str(self.in_description.id)]
+
+    def test_punctuation_only_search_returns_everything(self):
+        assert len(self.search('&|!')) == 3
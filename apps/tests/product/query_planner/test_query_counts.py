@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from cart.models import Cart, CartItem
+from order.models import Order, OrderItem
+from product.models import Color, Image, Size
+from user.models import Group
+from wishlist.models import Wishlist
+
+
+@pytest.mark.django_db
+class TestQueryCounts:
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, tokens, user_factory, category_factory, product_factory):
+        self.user = user_factory()
+        buyer_group = Group.objects.get(name="buyer")
+        self.user.groups.add(buyer_group)
+        self.user.save()
+
+        self.access, _ = tokens(self.user)
+        self.client = api_client(self.access)
+
+        self.root = category_factory(name="Electronics")
+        self.child = category_factory(name="Phones", parent=self.root)
+        category_factory(name="Smartphones", parent=self.child)
+        self.category_factory = category_factory
+        self.product_factory = product_factory
+
+    def create_products(self, count):
+        products = []
+        for _ in range(count):
+            category = self.category_factory(parent=self.child)
+            product = self.product_factory(category=category)
+            Image.objects.create(product=product, image="products/image.png")
+            products.append(product)
+        return products
+
+    def count_queries(self, url, params=None):
+        self.client.get(url, params)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return len(context.captured_queries)
+
+    def test_product_list_query_count_is_fixed(self):
+        self.create_products(10)
+        small_page = self.count_queries('/api/products/', {'limit': 2})
+        large_page = self.count_queries('/api/products/', {'limit': 10})
+        assert small_page == large_page
+
+    def test_product_detail_query_count_is_fixed(self):
+        simple_product, rich_product = self.create_products(2)
+        for index in range(5):
+            Image.objects.create(product=rich_product, image=f"products/image_{index}.png")
+            rich_product.colors.add(Color.objects.create(name=f"color{index}", hex_value="#ffffff"))
+            rich_product.sizes.add(Size.objects.create(name=f"size{index}"))
+        simple = self.count_queries(f'/api/products/{simple_product.id}/')
+        rich = self.count_queries(f'/api/products/{rich_product.id}/')
+        assert simple == rich
+
+    def test_category_products_query_count_is_fixed(self):
+        for product in self.create_products(10):
+            product.category = self.child
+            product.save()
+        url = f'/api/products/categories/{self.child.id}/products/'
+        assert self.count_queries(url, {'limit': 2}) == self.count_queries(url, {'limit': 10})
+
+    def test_cart_items_query_count_is_fixed(self):
+        cart = Cart.objects.create(user=self.user)
+        products = self.create_products(10)
+        CartItem.objects.create(cart=cart, product=products[0])
+        few_items = self.count_queries('/api/cart/')
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product) for product in products[1:])
+        many_items = self.count_queries('/api/cart/')
+        assert few_items == many_items
+
+    def test_wishlist_query_count_is_fixed(self):
+        for product in self.create_products(10):
+            Wishlist.objects.create(created_by=self.user, product=product)
+        assert self.count_queries('/api/wishlist/', {'limit': 2}) == self.count_queries('/api/wishlist/', {'limit': 10})
+
+    def test_order_list_query_count_is_fixed(self):
+        products = self.create_products(10)
+        for _ in range(10):
+            order = Order.objects.create(user=self.user)
+            for product in products[:3]:
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        assert self.count_queries('/api/orders/', {'limit': 2}) == self.count_queries('/api/orders/', {'limit': 10})
@@ -0,0 +1,46 @@
+import pytest
+from django.template import engines
+from django.template.loader import render_to_string
+
+from share import mail
+from share.mail import NOTIFICATION_TEMPLATE, OTP_TEMPLATE, CompiledTemplate, get_compiled_template, render_email
+
+
+@pytest.mark.parametrize(
+    'template_name, context',
+    [
+        (OTP_TEMPLATE, {'email': 'user@example.com', 'otp_code': '123456'}),
+        (NOTIFICATION_TEMPLATE, {'email': 'user@example.com', 'message': 'Your order has been <shipped> & paid'}),
+        (NOTIFICATION_TEMPLATE, {'email': 'user@example.com'}),
+    ],
+)
+def test_fast_path_renders_like_the_template_engine(template_name, context):
+    assert get_compiled_template(template_name).is_fast
+    assert render_email(template_name, context) == render_to_string(template_name, context)
+
+
+def test_templates_are_compiled_once(mocker):
+    get_compiled_template.cache_clear()
+    get_template = mocker.spy(mail, 'get_template')
+
+    for index in range(3):
+        render_email(OTP_TEMPLATE, {'email': 'user@example.com', 'otp_code': f'{index:06}'})
+
+    assert get_template.call_count == 1
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        '{% if code %}OTP code: {{ code }}{% endif %}',
+        'OTP code: {{ code|upper }}',
+        '{# comment #}OTP code: {{ code }}',
+    ],
+)
+def test_templates_with_template_syntax_use_the_template_engine(mocker, source):
+    template = engines['django'].from_string(source)
+    mocker.patch.object(mail, 'get_template', return_value=template)
+
+    compiled = CompiledTemplate('emails/custom.html')
+    assert not compiled.is_fast
+    assert compiled.render({'code': 'abc123'}) == template.render({'code': 'abc123'})
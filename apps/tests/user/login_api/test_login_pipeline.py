@@ -0,0 +1,73 @@
+import pytest
+from redis.client import Pipeline
+
+from share.services import TokenService, TokenVerdictCache
+from user.models import User
+from user.services import LastLoginService, UserService
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('share.services.TokenService.get_redis_client', lambda: fake_redis)
+    mocker.patch('user.services.LastLoginService.get_redis_client', lambda: fake_redis)
+    TokenVerdictCache._users.clear()
+    return fake_redis
+
+
+@pytest.mark.django_db
+def test_authenticate_is_one_query(user_factory, django_assert_num_queries):
+    user = user_factory.create(password='random_password1')
+
+    with django_assert_num_queries(1):
+        authenticated = UserService.authenticate(user.email, 'random_password1')
+    assert authenticated.id == user.id
+    assert authenticated.get_deferred_fields() >= {'email', 'last_login'}
+
+
+@pytest.mark.django_db
+def test_token_issuance_is_one_round_trip(redis_client, user_factory, mocker, django_assert_num_queries):
+    user = user_factory.create()
+    execute_command = mocker.spy(redis_client, 'execute_command')
+    execute = mocker.spy(Pipeline, 'execute')
+
+    with django_assert_num_queries(0):
+        UserService.create_tokens(user)
+
+    assert execute.call_count == 1
+    assert execute_command.call_count == 0
+    assert redis_client.hlen(TokenService.sessions_key.format(user_id=user.id)) == 1
+    assert redis_client.hexists(LastLoginService.pending_key, str(user.id))
+
+
+@pytest.mark.django_db
+def test_last_logins_are_flushed_in_bulk(redis_client, user_factory, django_assert_num_queries):
+    users = user_factory.create_batch(3)
+    for user in users:
+        UserService.create_tokens(user)
+    assert not User.objects.filter(last_login__isnull=False).exists()
+
+    with django_assert_num_queries(1):
+        assert LastLoginService.flush() == 3
+    assert User.objects.filter(id__in=[user.id for user in users], last_login__isnull=False).count() == 3
+    assert not redis_client.exists(LastLoginService.pending_key)
+    assert LastLoginService.flush() == 0
+
+
+@pytest.mark.django_db
+def test_failed_flush_keeps_newer_logins(redis_client, user_factory, mocker):
+    first_user, second_user = user_factory.create_batch(2)
+    redis_client.hset(LastLoginService.pending_key, mapping={str(first_user.id): 1, str(second_user.id): 1})
+
+    def write_last_logins(pending, batch_size):
+        # The second user logs in again while the buffer is being written.
+        redis_client.hset(LastLoginService.pending_key, str(second_user.id), 2)
+        raise Exception('database is down')
+
+    mocker.patch.object(LastLoginService, 'write_last_logins', side_effect=write_last_logins)
+    with pytest.raises(Exception):
+        LastLoginService.flush()
+
+    pending = redis_client.hgetall(LastLoginService.pending_key)
+    assert {user_id.decode(): float(timestamp) for user_id, timestamp in pending.items()} == {
+        str(first_user.id): 1.0, str(second_user.id): 2.0,
+    }
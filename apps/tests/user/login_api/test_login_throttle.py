@@ -0,0 +1,75 @@
+import pytest
+
+from user.services import UserService
+from user.throttling import LoginThrottle, OtpVerifyThrottle
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('share.throttling.SlidingWindowThrottle.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+def login(api_client, email_or_phone_number, **extra):
+    return api_client().post(
+        '/api/users/login/',
+        data={'email_or_phone_number': email_or_phone_number, 'password': 'wrong-password1'},
+        **extra,
+    )
+
+
+@pytest.mark.django_db
+def test_login_attempts_are_limited_per_account(redis_client, user_factory, api_client, mocker):
+    user, other_user = user_factory.create(), user_factory.create()
+    authenticate = mocker.spy(UserService, 'authenticate')
+    limit = LoginThrottle().num_requests
+
+    for _ in range(limit):
+        assert login(api_client, user.email).status_code == 400
+    resp = login(api_client, user.email.upper())
+    assert resp.status_code == 429
+    assert int(resp['Retry-After']) > 0
+    # Rejected before the password was checked.
+    assert authenticate.call_count == limit
+
+    assert login(api_client, other_user.email).status_code == 400
+
+
+@pytest.mark.django_db
+def test_login_attempts_are_limited_per_ip(redis_client, user_factory, api_client, mocker):
+    mocker.patch.object(LoginThrottle, 'THROTTLE_RATES', {'login': '100/min', 'login_ip': '3/min'})
+    users = user_factory.create_batch(4)
+
+    for user in users[:3]:
+        assert login(api_client, user.email).status_code == 400
+    assert login(api_client, users[3].email).status_code == 429
+    assert login(api_client, users[3].email, REMOTE_ADDR='10.0.0.2').status_code == 400
+
+
+@pytest.mark.django_db
+def test_window_slides(redis_client, user_factory, api_client, mocker):
+    now = mocker.patch('share.throttling.time.time', return_value=1_000_000.0)
+    user = user_factory.create()
+    for _ in range(LoginThrottle().num_requests):
+        login(api_client, user.email)
+
+    now.return_value += 59
+    assert login(api_client, user.email).status_code == 429
+    now.return_value += 2
+    assert login(api_client, user.email).status_code == 400
+
+
+@pytest.mark.django_db
+def test_otp_verification_attempts_are_limited_per_phone_number(redis_client, fake_number, api_client, mocker):
+    check_otp = mocker.patch('user.views.check_otp')
+    phone_number = fake_number()
+    limit = OtpVerifyThrottle().num_requests
+
+    for _ in range(limit + 1):
+        resp = api_client().patch(
+            '/api/users/register/verify/secret/',
+            data={'phone_number': phone_number, 'otp_code': '123456'},
+            format='json',
+        )
+    assert resp.status_code == 429
+    assert check_otp.call_count == limit
@@ -0,0 +1,57 @@
+import pytest
+from django.contrib.auth.hashers import identify_hasher, make_password
+
+from user.models import User
+from user.services import UserService
+
+PASSWORD = 'random_password1'
+
+
+@pytest.fixture
+def argon2_policy(settings):
+    settings.PASSWORD_HASHERS = [
+        'user.hashers.Argon2idPasswordHasher',
+        'user.hashers.BCryptSHA256PasswordHasher',
+        'user.hashers.PBKDF2PasswordHasher',
+    ]
+    settings.PASSWORD_HASHER_ARGON2_TIME_COST = 1
+    settings.PASSWORD_HASHER_ARGON2_MEMORY_COST = 8 * 1024
+    settings.PASSWORD_HASHER_ARGON2_PARALLELISM = 1
+    settings.PASSWORD_HASHER_PBKDF2_ITERATIONS = 1000
+    return settings
+
+
+def stored_hash(user):
+    return User.objects.get(pk=user.pk).password
+
+
+@pytest.mark.django_db
+def test_legacy_hash_is_upgraded_on_login(argon2_policy, user_factory):
+    user = user_factory.create()
+    User.objects.filter(pk=user.pk).update(password=make_password(PASSWORD, hasher='pbkdf2_sha256'))
+
+    UserService.authenticate(user.email, PASSWORD)
+
+    password = stored_hash(user)
+    assert password.startswith('argon2$argon2id$v=19$m=8192,t=1,p=1$')
+    assert identify_hasher(password).verify(PASSWORD, password)
+
+
+@pytest.mark.django_db
+def test_hash_is_upgraded_when_costs_change(argon2_policy, user_factory):
+    user = user_factory.create(password=PASSWORD)
+    assert '$m=8192,t=1,p=1$' in stored_hash(user)
+
+    argon2_policy.PASSWORD_HASHER_ARGON2_TIME_COST = 2
+    UserService.authenticate(user.email, PASSWORD)
+    assert '$m=8192,t=2,p=1$' in stored_hash(user)
+
+
+@pytest.mark.django_db
+def test_failed_login_does_not_rehash(argon2_policy, user_factory):
+    user = user_factory.create()
+    legacy_hash = make_password(PASSWORD, hasher='pbkdf2_sha256')
+    User.objects.filter(pk=user.pk).update(password=legacy_hash)
+
+    assert UserService.authenticate(user.email, 'wrong_password1', quiet=True) is None
+    assert stored_hash(user) == legacy_hash
@@ -0,0 +1,55 @@
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from share.services import OtpService
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('share.services.OtpService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+def test_generated_code_can_be_checked(redis_client):
+    otp_code, otp_secret = OtpService.generate('user@example.com')
+
+    assert len(otp_code) == 6 and otp_code.isdigit()
+    assert redis_client.get('user@example.com:otp_secret') == otp_secret.encode()
+    assert 0 < redis_client.ttl('user@example.com:otp') <= 120
+    # Only the HMAC is stored.
+    assert otp_code.encode() not in redis_client.get('user@example.com:otp')
+    OtpService.check('user@example.com', otp_code, otp_secret)
+
+
+@pytest.mark.parametrize('wrong', ['code', 'secret', 'key'])
+def test_wrong_code_secret_or_key_is_rejected(redis_client, wrong):
+    otp_code, otp_secret = OtpService.generate('user@example.com')
+    key = 'other@example.com' if wrong == 'key' else 'user@example.com'
+    if wrong == 'code':
+        otp_code = str((int(otp_code) + 1) % 1_000_000).zfill(6)
+    if wrong == 'secret':
+        otp_secret = otp_secret[::-1]
+
+    with pytest.raises(ValidationError):
+        OtpService.check(key, otp_code, otp_secret)
+
+
+def test_valid_code_is_kept(redis_client):
+    otp_code, otp_secret = OtpService.generate('user@example.com')
+
+    with pytest.raises(ValidationError):
+        OtpService.generate('user@example.com')
+    assert redis_client.get('user@example.com:otp_secret') == otp_secret.encode()
+    OtpService.check('user@example.com', otp_code, otp_secret)
+
+
+def test_code_is_replaced_without_existence_check(redis_client):
+    OtpService.generate('+998901234567')
+    otp_code, otp_secret = OtpService.generate('+998901234567', check_if_exists=False)
+    OtpService.check('+998901234567', otp_code, otp_secret)
+
+
+def test_reset_token_keys_do_not_contain_the_token():
+    key = OtpService.get_reset_token_key('reset-token')
+    assert 'reset-token' not in key
+    assert key == OtpService.get_reset_token_key('reset-token') != OtpService.get_reset_token_key('other-token')
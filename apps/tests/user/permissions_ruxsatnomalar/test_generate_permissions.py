@@ -0,0 +1,29 @@
+import pytest
+from rest_framework import status
+
+from cart.models import Cart
+from cart.views import GetItemsView
+from product.views import ProductDetailView
+from share.permissions import check_perm, permission_registry
+
+
+def test_permission_classes_are_reused():
+    assert check_perm('cart.view_cartitem') is check_perm('cart.view_cartitem')
+    assert check_perm('cart.view_cartitem') is not check_perm('cart.add_cartitem')
+
+
+def test_registry_maps_methods_to_model_permissions():
+    permissions = permission_registry.get(ProductDetailView)
+    assert permissions['GET'] is check_perm('product.view_product')
+    assert permissions['PATCH'] is permissions['PUT'] is check_perm('product.change_product')
+    assert permissions['DELETE'] is check_perm('product.delete_product')
+    assert 'OPTIONS' not in permissions
+
+
+@pytest.mark.django_db
+def test_permission_check_has_no_side_effects(api_client, tokens, user_factory):
+    user = user_factory()
+    response = api_client(tokens(user)[0]).get('/api/cart/')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert permission_registry.get(GetItemsView)['GET'] is check_perm('cart.view_cartitem')
+    assert not Cart.objects.filter(user=user).exists()
@@ -0,0 +1,78 @@
+import pytest
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from user.backends import CustomModelBackend
+from user.models import Group, Policy, User
+from user.services import PermissionCacheService
+
+
+@pytest.mark.django_db
+class TestPermissionCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, user_factory):
+        self.user = user_factory()
+        self.group = Group.objects.create(name="cache-test-group")
+        self.policy = Policy.objects.create(name="buyer_policy", is_active=False)
+        self.user.groups.add(self.group)
+
+    def permissions(self):
+        return User.objects.get(pk=self.user.pk).get_all_permissions()
+
+    def uncached_permissions(self):
+        # ModelBackend's uncached implementation on top of the policy-aware lookups.
+        return ModelBackend.get_all_permissions(CustomModelBackend(), User.objects.get(pk=self.user.pk))
+
+    def test_matches_model_backend(self):
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.user.user_permissions.add(Permission.objects.get(codename="view_all_users"))
+        assert self.permissions() == self.uncached_permissions()
+        assert "user.view_all_users" in self.permissions()
+
+    def test_cached_permissions_run_one_query(self):
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as first:
+            user.get_all_permissions()
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as second:
+            user.get_all_permissions()
+        assert len(first) == 1
+        assert len(second) == 0
+
+    def test_group_policy_changes_invalidate(self):
+        permission = Permission.objects.get(codename="view_user_me")
+        assert "user.view_user_me" not in self.permissions()
+
+        self.policy.is_active = True
+        self.policy.save()
+        self.policy.permissions.add(permission)
+        self.group.policies.add(self.policy)
+        assert "user.view_user_me" in self.permissions()
+
+        self.policy.permissions.remove(permission)
+        assert "user.view_user_me" not in self.permissions()
+
+    def test_membership_changes_invalidate(self):
+        buyer = Group.objects.get(name="buyer")
+        buyer.user_set.add(self.user)
+        assert self.permissions() == self.uncached_permissions() != set()
+
+        self.user.groups.remove(buyer)
+        assert self.permissions() == set()
+
+    def test_superuser_gets_every_permission(self):
+        self.permissions()
+        self.user.is_superuser = True
+        self.user.save()
+        assert len(self.permissions()) == Permission.objects.count()
+
+    def test_version_stamp_rejects_stale_entries(self):
+        self.user.groups.add(Group.objects.get(name="buyer"))
+        self.permissions()
+        PermissionCacheService.bump_version()
+        with CaptureQueriesContext(connection) as queries:
+            User.objects.get(pk=self.user.pk).get_all_permissions()
+        assert len(queries) == 2
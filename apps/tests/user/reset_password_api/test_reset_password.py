@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth.hashers import check_password
+from share.services import OtpService
 from user.models import User, Group
 
 from rest_framework.exceptions import ValidationError
@@ -204,7 +205,7 @@ def test_forgot_password_verify(forgot_password_verify_data, api_client, mocker)
     mocker.patch('user.views.redis_conn', redis_conn)
     mocker.patch('user.views.check_otp', return_value=return_data['check_otp'],
                  side_effect=return_data['exists_otp'])
-    mocker.patch('user.views.make_password', return_value='mocked_token_hash')
+    mocker.patch('user.views.token_urlsafe', return_value='mocked_token')
 
     client = api_client()
     otp_secret = return_data['otp_secret']
@@ -218,10 +219,13 @@ def test_forgot_password_verify(forgot_password_verify_data, api_client, mocker)
     if resp.status_code == 200:
         resp_json = resp.json()
         assert sorted(resp_json.keys()) == sorted(['token'])
+        assert resp_json['token'] == 'mocked_token'
 
         redis_conn.delete.assert_any_call(f"{return_data['req_json']['email']}:otp")
 
-        redis_conn.set.assert_any_call('mocked_token_hash', return_data['req_json']['email'], ex=2 * 60 * 60)
+        redis_conn.set.assert_any_call(
+            OtpService.get_reset_token_key('mocked_token'), return_data['req_json']['email'], ex=2 * 60 * 60
+        )
 
 
 @pytest.fixture()
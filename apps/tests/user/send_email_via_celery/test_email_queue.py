@@ -0,0 +1,97 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+
+from share.enums import EmailStatus
+from share.utils import send_email
+from user.services import OtpEmailService
+from user.tasks import send_notification_email, send_queued_emails
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis, settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    mocker.patch('user.services.OtpEmailService.get_redis_client', lambda: fake_redis)
+    return fake_redis
+
+
+def test_enqueue_schedules_one_drain(redis_client, mocker):
+    delay = mocker.patch('user.tasks.send_queued_emails.delay')
+    OtpEmailService.enqueue('first@example.com', '111111')
+    OtpEmailService.enqueue('second@example.com', '222222')
+
+    assert delay.call_count == 1
+    assert redis_client.llen(OtpEmailService.queue_key) == 2
+    assert OtpEmailService.get_status('first@example.com') == EmailStatus.QUEUED
+    assert len(mail.outbox) == 0
+
+
+def test_send_email_queues_the_email(redis_client, mocker):
+    mocker.patch('user.tasks.send_queued_emails.delay')
+
+    assert send_email('user@example.com', '123456') == 200
+    assert OtpEmailService.get_status('user@example.com') == EmailStatus.QUEUED
+
+    mocker.patch.object(OtpEmailService, 'enqueue', side_effect=ConnectionError)
+    assert send_email('user@example.com', '123456') == 400
+
+
+def test_queued_emails_are_sent_over_one_connection(redis_client, mocker):
+    mocker.patch('user.tasks.send_queued_emails.delay')
+    emails = [f'user{index}@example.com' for index in range(5)]
+    for index, email in enumerate(emails):
+        OtpEmailService.enqueue(email, f'{index:06}')
+    open_connection = mocker.spy(EmailBackend, 'open')
+
+    assert send_queued_emails.apply().get() == 5
+    assert open_connection.call_count == 1
+    assert [message.to for message in mail.outbox] == [[email] for email in emails]
+    assert '000003' in mail.outbox[3].body
+    assert all(OtpEmailService.get_status(email) == EmailStatus.SENT for email in emails)
+    assert not redis_client.exists(OtpEmailService.queue_key, OtpEmailService.scheduled_key)
+
+
+def test_failed_emails_are_retried_then_reported(redis_client, mocker):
+    mocker.patch('user.tasks.send_queued_emails.delay')
+    send_messages = mocker.patch.object(EmailBackend, 'send_messages', side_effect=Exception('SMTP is down'))
+    redis_client.set('+998901234567:otp', 'hash')
+    redis_client.set('+998901234567:otp_secret', 'secret')
+    OtpEmailService.enqueue('user@example.com', '123456', otp_key='+998901234567')
+
+    send_queued_emails.apply()
+
+    assert send_messages.call_count == send_queued_emails.max_retries + 1
+    assert OtpEmailService.get_status('user@example.com') == EmailStatus.FAILED
+    assert not redis_client.exists('+998901234567:otp', '+998901234567:otp_secret')
+
+
+def test_only_failed_emails_are_retried(redis_client, mocker):
+    mocker.patch('user.tasks.send_queued_emails.delay')
+    send_messages = EmailBackend.send_messages
+    attempts = []
+
+    def flaky_send_messages(backend, messages):
+        attempts.append(messages[0].to[0])
+        if messages[0].to == ['flaky@example.com'] and attempts.count('flaky@example.com') == 1:
+            raise Exception('Temporary failure')
+        return send_messages(backend, messages)
+
+    mocker.patch.object(EmailBackend, 'send_messages', flaky_send_messages)
+    OtpEmailService.enqueue('flaky@example.com', '111111')
+    OtpEmailService.enqueue('stable@example.com', '222222')
+
+    send_queued_emails.apply()
+
+    assert attempts == ['flaky@example.com', 'stable@example.com', 'flaky@example.com']
+    assert len(mail.outbox) == 2
+    assert OtpEmailService.get_status('flaky@example.com') == EmailStatus.SENT
+
+
+def test_failed_notification_email_is_retried(settings, mocker):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    send_messages = mocker.patch.object(EmailBackend, 'send_messages', side_effect=Exception('SMTP is down'))
+
+    result = send_notification_email.apply(args=('user@example.com', 'Your order has shipped'))
+
+    assert result.failed()
+    assert send_messages.call_count == send_notification_email.max_retries + 1
@@ -0,0 +1,121 @@
+import datetime
+
+import pytest
+from rest_framework_simplejwt.tokens import AccessToken
+
+from share.services import TokenService, TokenVerdictCache
+from user.models import Group
+from user.services import UserService
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('share.services.TokenService.get_redis_client', lambda: fake_redis)
+    TokenVerdictCache._users.clear()
+    return fake_redis
+
+
+def login(user):
+    access = UserService.create_tokens(user)['access']
+    return access, AccessToken(access)['sid']
+
+
+@pytest.mark.django_db
+def test_every_login_is_a_session(redis_client, user_factory, api_client):
+    user = user_factory.create()
+    first_access, first_session = login(user)
+    _, second_session = login(user)
+
+    resp = api_client(first_access).get('/api/users/sessions/')
+    assert resp.status_code == 200
+    assert {session['id']: session['current'] for session in resp.data} == {
+        first_session: True, second_session: False,
+    }
+    assert 0 < redis_client.ttl(f'user:{user.id}:sessions')
+
+
+@pytest.mark.django_db
+def test_revoke_one_device(redis_client, user_factory, api_client):
+    user = user_factory.create()
+    first_access, _ = login(user)
+    second_access, second_session = login(user)
+
+    assert api_client(first_access).delete(f'/api/users/sessions/{second_session}/').status_code == 204
+    assert api_client(second_access).get('/api/users/me/').status_code == 401
+    assert api_client(first_access).get('/api/users/sessions/').status_code == 200
+    assert api_client(first_access).delete(f'/api/users/sessions/{second_session}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_revoke_all_devices(redis_client, user_factory, api_client, tokens):
+    user = user_factory.create()
+    first_access, _ = login(user)
+    second_access, _ = login(user)
+    legacy_access, _ = tokens(user)
+    assert api_client(legacy_access).get('/api/users/sessions/').status_code == 200
+
+    assert api_client(first_access).delete('/api/users/sessions/').status_code == 204
+    for access in (first_access, second_access, legacy_access):
+        assert api_client(access).get('/api/users/sessions/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout_revokes_only_the_current_session(redis_client, user_factory, api_client):
+    user = user_factory.create()
+    first_access, _ = login(user)
+    second_access, _ = login(user)
+
+    assert api_client(first_access).post('/api/users/logout/').status_code == 200
+    assert api_client(first_access).get('/api/users/sessions/').status_code == 401
+    assert len(api_client(second_access).get('/api/users/sessions/').data) == 1
+
+
+def test_expired_sessions_are_dropped(redis_client, fake_uuid):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    TokenService.add_session(fake_uuid, 'expired', 'jti-1', 'refresh-1', now - datetime.timedelta(seconds=1))
+    TokenService.add_session(fake_uuid, 'active', 'jti-2', 'refresh-2', now + datetime.timedelta(minutes=5))
+
+    assert [session['id'] for session in TokenService.get_sessions(fake_uuid)] == ['active']
+    assert redis_client.hkeys(f'user:{fake_uuid}:sessions') == [b'active']
+
+
+@pytest.mark.django_db
+def test_change_password_revokes_other_devices(redis_client, user_factory, api_client, tokens):
+    user = user_factory.create(password='FGHJJ#$^%123')
+    user.groups.add(Group.objects.get(name="buyer"))
+    first_access, _ = login(user)
+    legacy_access, _ = tokens(user)
+
+    resp = api_client(first_access).put('/api/users/change/password/', data={
+        'old_password': 'FGHJJ#$^%123',
+        'new_password': '&*^JHFHGF123',
+        'confirm_password': '&*^JHFHGF123',
+    }, format='json')
+    assert resp.status_code == 200
+
+    for access in (first_access, legacy_access):
+        assert api_client(access).get('/api/users/sessions/').status_code == 401
+    assert len(api_client(resp.data['access']).get('/api/users/sessions/').data) == 1
+
+
+@pytest.mark.django_db
+def test_legacy_logout_keeps_sessions(redis_client, user_factory, api_client, tokens):
+    user = user_factory.create()
+    session_access, _ = login(user)
+    legacy_access, _ = tokens(user)
+
+    assert api_client(legacy_access).post('/api/users/logout/').status_code == 200
+    assert api_client(legacy_access).get('/api/users/sessions/').status_code == 401
+    assert api_client(session_access).get('/api/users/sessions/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_legacy_tokens_issued_after_cutoff_are_rejected(redis_client, user_factory, api_client, tokens, settings):
+    user = user_factory.create()
+    legacy_access, _ = tokens(user)
+    settings.LEGACY_TOKEN_CUTOFF = AccessToken(legacy_access)['iat'] + 1
+    assert api_client(legacy_access).get('/api/users/sessions/').status_code == 200
+
+    TokenVerdictCache._users.clear()
+    settings.LEGACY_TOKEN_CUTOFF = AccessToken(legacy_access)['iat']
+    assert api_client(legacy_access).get('/api/users/sessions/').status_code == 401
@@ -0,0 +1,64 @@
+import datetime
+import uuid
+
+import pytest
+
+from share.enums import TokenType
+from share.services import TokenService, TokenVerdictCache
+
+EXPIRES_AT = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+
+
+@pytest.fixture
+def redis_client(mocker, fake_redis):
+    mocker.patch('share.services.TokenService.get_redis_client', lambda: fake_redis)
+    TokenVerdictCache._users.clear()
+    return fake_redis
+
+
+def add_session(user_id, session_id, jti):
+    TokenService.add_session(user_id, session_id, jti, f'refresh-{jti}', EXPIRES_AT)
+
+
+def token(session_id, jti):
+    return {'sid': session_id, 'jti': jti}
+
+
+def test_verdicts_are_served_from_memory(redis_client, mocker):
+    user_id = uuid.uuid4()
+    add_session(user_id, 'session-1', 'jti-1')
+    hget = mocker.spy(redis_client, 'hget')
+
+    assert TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+    assert TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+    assert not TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-2'))
+    assert hget.call_count == 2
+
+
+def test_session_changes_evict_verdicts(redis_client):
+    user_id = uuid.uuid4()
+    add_session(user_id, 'session-1', 'jti-1')
+    assert TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+
+    TokenService.revoke_session(user_id, 'session-1')
+    assert not TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+
+
+def test_changes_announced_by_other_processes_evict_verdicts(redis_client):
+    user_id = uuid.uuid4()
+    add_session(user_id, 'session-1', 'jti-1')
+    assert TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+    # Another process revokes the session without touching this process' cache.
+    redis_client.hdel(f'user:{user_id}:sessions', 'session-1')
+    assert TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+
+    TokenVerdictCache.handle_message({'data': str(user_id).encode()})
+    assert not TokenService.is_valid_token(user_id, TokenType.ACCESS, token('session-1', 'jti-1'))
+
+
+def test_stale_verdicts_are_not_cached(redis_client):
+    user_id = uuid.uuid4()
+    generation = TokenVerdictCache.get_generation()
+    TokenVerdictCache.evict(user_id)
+    TokenVerdictCache.set(user_id, 'access:jti-1', True, generation)
+    assert TokenVerdictCache.get(user_id, 'access:jti-1') is None
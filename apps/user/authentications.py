@@ -36,11 +36,7 @@ class CustomJWTAuthentication(JWTAuthentication):
         return user, access_token
 
     def is_valid_access_token(self, path: str, user: User, access_token: Token) -> bool:
-        valid_access_tokens = TokenService.get_valid_tokens(user.id, TokenType.ACCESS)
-        if (
-                valid_access_tokens
-                and str(access_token).encode() not in valid_access_tokens
-        ):
+        if not TokenService.is_valid_token(user.id, TokenType.ACCESS, access_token):
             raise AuthenticationFailed(_("Could not validate credentials"))
 
         return True
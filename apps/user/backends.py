@@ -2,23 +2,16 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import Permission
 
+from user.services import PermissionCacheService
+
 
 class CustomModelBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         if not username:
             return None
-        try:
-            if "@" in username:
-                username_field = "email"
-            else:
-                username_field = "phone_number"
-            users = get_user_model().objects.filter(**{username_field: username})
-
-            if users.exists():
-                user = users.first()
-            else:
-                return None
-        except get_user_model().DoesNotExist:
+        username_field = "email" if "@" in username else "phone_number"
+        user = get_user_model().objects.filter(**{username_field: username}).first()
+        if user is None:
             return None
 
         if user.check_password(password) and self.user_can_authenticate(user):
@@ -34,6 +27,13 @@ class CustomModelBackend(ModelBackend):
         except get_user_model().DoesNotExist:
             return None
 
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            user_obj._perm_cache = PermissionCacheService.get_permissions(user_obj)
+        return user_obj._perm_cache
+
     def _get_user_permissions(self, user_obj):
         all_user_permissions = user_obj.user_permissions.all()
         for policy in user_obj.policies.filter(is_active=True):
@@ -0,0 +1,42 @@
+"""
+Password hasher policy. PASSWORD_HASHER in settings picks the algorithm new hashes are
+made with, and the cost settings below tune it:
+
+    PASSWORD_HASHER_ARGON2_TIME_COST, PASSWORD_HASHER_ARGON2_MEMORY_COST (KiB),
+    PASSWORD_HASHER_ARGON2_PARALLELISM, PASSWORD_HASHER_BCRYPT_ROUNDS,
+    PASSWORD_HASHER_PBKDF2_ITERATIONS
+
+The other hashers stay in PASSWORD_HASHERS to verify existing hashes. A hash made with
+another algorithm or other costs is replaced on the user's next successful login, as
+User.check_password rehashes outdated hashes.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2idPasswordHasher(hashers.Argon2PasswordHasher):
+    # Argon2PasswordHasher already hashes with the argon2id variant.
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHER_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHER_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHER_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return settings.PASSWORD_HASHER_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHER_PBKDF2_ITERATIONS
@@ -0,0 +1,47 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from share.mail import NOTIFICATION_TEMPLATE, OTP_TEMPLATE, get_compiled_template, render_email
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-message cost of rendering email templates with render_to_string and share.mail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        templates = {
+            OTP_TEMPLATE: lambda index: {'email': f'user{index}@example.com', 'otp_code': f'{index % 1_000_000:06}'},
+            NOTIFICATION_TEMPLATE: lambda index: {
+                'email': f'user{index}@example.com', 'message': f'Your order #{index} has been <shipped>',
+            },
+        }
+        for template_name, build_context in templates.items():
+            contexts = [build_context(index) for index in range(options['messages'])]
+            assert render_to_string(template_name, contexts[0]) == render_email(template_name, contexts[0]), \
+                "Both paths must render the same email"
+
+            path = 'fast substitution' if get_compiled_template(template_name).is_fast else 'template engine'
+            self.stdout.write(f"{template_name} ({path}), {len(contexts)} messages")
+            self.report('render_to_string', self.measure(render_to_string, template_name, contexts))
+            self.report('share.mail', self.measure(render_email, template_name, contexts))
+
+    @staticmethod
+    def measure(render, template_name, contexts):
+        timings = []
+        for context in contexts:
+            started = time.perf_counter()
+            render(template_name, context)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        return timings
+
+    def report(self, name, timings):
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        self.stdout.write(
+            f"  {name:<18} p50 {statistics.median(timings):8.1f} us   "
+            f"p95 {p95:8.1f} us   total {sum(timings) / 1000:9.1f} ms"
+        )
@@ -0,0 +1,58 @@
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+HASHERS = {
+    'argon2': 'user.hashers.Argon2idPasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure logins/sec per core (password verifications) for each password hasher setting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+        parser.add_argument(
+            '--argon2', nargs='*', default=['1,19456,1', '2,19456,1', '3,12288,1', '2,65536,1'],
+            help='time_cost,memory_cost (KiB),parallelism per setting',
+        )
+        parser.add_argument('--bcrypt', nargs='*', type=int, default=[10, 12], help='Rounds per setting')
+        parser.add_argument('--pbkdf2', nargs='*', type=int, default=[260000, 600000], help='Iterations per setting')
+
+    def handle(self, *args, **options):
+        settings = []
+        for costs in options['argon2']:
+            time_cost, memory_cost, parallelism = (int(cost) for cost in costs.split(','))
+            settings.append((f'argon2 t={time_cost} m={memory_cost} p={parallelism}', 'argon2', {
+                'PASSWORD_HASHER_ARGON2_TIME_COST': time_cost,
+                'PASSWORD_HASHER_ARGON2_MEMORY_COST': memory_cost,
+                'PASSWORD_HASHER_ARGON2_PARALLELISM': parallelism,
+            }))
+        for rounds in options['bcrypt']:
+            settings.append((f'bcrypt rounds={rounds}', 'bcrypt', {'PASSWORD_HASHER_BCRYPT_ROUNDS': rounds}))
+        for iterations in options['pbkdf2']:
+            settings.append((
+                f'pbkdf2 iterations={iterations}', 'pbkdf2', {'PASSWORD_HASHER_PBKDF2_ITERATIONS': iterations}
+            ))
+
+        for name, algorithm, costs in settings:
+            with override_settings(PASSWORD_HASHERS=[HASHERS[algorithm]], **costs):
+                self.report(name, *self.measure(options['logins']))
+
+    @staticmethod
+    def measure(logins):
+        encoded = make_password('Benchmark-password1')
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        for _ in range(logins):
+            assert check_password('Benchmark-password1', encoded)
+        return logins, time.perf_counter() - wall_started, time.process_time() - cpu_started
+
+    def report(self, name, logins, wall, cpu):
+        self.stdout.write(
+            f"  {name:<34} {wall / logins * 1000:8.2f} ms/login   "
+            f"{logins / cpu:8.1f} logins/s per core"
+        )
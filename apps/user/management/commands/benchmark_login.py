@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from share.services import TokenService
+from user.models import User
+from user.services import LastLoginService, UserService
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Measure the login path (lookup, password check and token issuance) without the cost of hashing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # A fast hasher leaves the database and Redis work of a login.
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']), \
+                transaction.atomic():
+            user = User.objects.create_user(
+                email='benchmark-login@example.com', password='Benchmark-password1',
+                first_name='Bench', last_name='Mark',
+            )
+            try:
+                timings, queries = self.measure(user, options['repeat'])
+            finally:
+                redis_client = TokenService.get_redis_client()
+                redis_client.delete(TokenService.sessions_key.format(user_id=user.id))
+                redis_client.hdel(LastLoginService.pending_key, str(user.id))
+            transaction.set_rollback(True)
+
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        self.stdout.write(
+            f"  login p50 {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms   "
+            f"max {max(timings):7.3f} ms   {queries:4.1f} queries/login"
+        )
+
+    @staticmethod
+    def measure(user, repeat):
+        timings = []
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                authenticated = UserService.authenticate(user.email, 'Benchmark-password1')
+                UserService.create_tokens(authenticated)
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings, counter.count / repeat
@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from share.services import OtpService
+
+
+class Command(BaseCommand):
+    help = 'Compare OTP hashing throughput of make_password/check_password against HMAC-SHA256'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codes', type=int, default=10_000)
+        parser.add_argument('--password-codes', type=int, default=50, help='PBKDF2 is slow, fewer codes are enough')
+        parser.add_argument('--redis', action='store_true', help='Also measure generate/check against Redis')
+
+    def handle(self, *args, **options):
+        self.report('make_password', options['password_codes'], self.password_hasher)
+        self.report('HMAC-SHA256', options['codes'], self.hmac)
+        if options['redis']:
+            self.report('OtpService', options['codes'], self.otp_service)
+
+    @staticmethod
+    def password_hasher(index):
+        otp_hash = make_password(f"secret:{index:06}")
+        assert check_password(f"secret:{index:06}", otp_hash)
+
+    @staticmethod
+    def hmac(index):
+        otp_hash = OtpService.get_hash(f"secret:{index:06}")
+        assert otp_hash == OtpService.get_hash(f"secret:{index:06}")
+
+    @staticmethod
+    def otp_service(index):
+        key = f"benchmark-otp-{index}"
+        otp_code, otp_secret = OtpService.generate(key, expire_in=60)
+        OtpService.check(key, otp_code, otp_secret)
+        OtpService.get_redis_client().delete(f"{key}:otp", f"{key}:otp_secret")
+
+    def report(self, name, codes, generate_and_check):
+        started = time.perf_counter()
+        for index in range(codes):
+            generate_and_check(index)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"  {name:<14} {elapsed / codes * 1000:9.3f} ms per code   {codes / elapsed:10.0f} codes/s"
+        )
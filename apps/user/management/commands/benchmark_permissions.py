@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from share.enums import UserRole
+from user.backends import CustomModelBackend
+from user.models import Group, Policy, User
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request permission resolution with and without the Redis permission cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        groups = Group.objects.filter(name__in=UserRole.values())
+        if not groups.exists():
+            raise CommandError('Role groups are missing, run initial_data first')
+
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            # A user in every role group who also holds every active policy directly.
+            user = User.objects.create(
+                email='benchmark-permissions@example.com', first_name='Bench', last_name='Mark'
+            )
+            user.groups.set(groups)
+            user.policies.set(Policy.objects.filter(is_active=True))
+            backend = CustomModelBackend()
+            user.get_all_permissions()
+
+            uncached = self.measure(
+                lambda fresh: ModelBackend.get_all_permissions(backend, fresh), user, options['repeat']
+            )
+            cached = self.measure(backend.get_all_permissions, user, options['repeat'])
+            assert uncached[2] == cached[2], "Both paths must resolve the same permissions"
+            self.stdout.write(f"{len(cached[2])} permissions through {groups.count()} groups")
+            self.report('Uncached', *uncached)
+            self.report('Redis cache', *cached)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(resolve, user, repeat):
+        timings = []
+        counter = QueryCounter()
+        for _ in range(repeat):
+            fresh = User.objects.get(pk=user.pk)
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                permissions = resolve(fresh)
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings, counter.count / repeat, permissions
+
+    def report(self, name, timings, queries, permissions):
+        self.stdout.write(
+            f"  {name:<12} median {statistics.median(timings):8.3f} ms   "
+            f"max {max(timings):8.3f} ms   {queries:5.1f} queries/request"
+        )
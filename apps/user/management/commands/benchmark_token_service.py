@@ -0,0 +1,117 @@
+import datetime
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from redis import Connection, ConnectionPool, Redis
+
+from share.enums import TokenType
+from share.services import TokenService
+
+LIFETIME = datetime.timedelta(minutes=5)
+
+
+class LatencyConnection(Connection):
+    """
+    Sleeps before every write to the socket, i.e. once per round trip, to model a Redis
+    server that is not on the same host. Counts the round trips made.
+    """
+
+    latency = 0.0
+    round_trips = 0
+
+    def send_packed_command(self, command, check_health=True):
+        LatencyConnection.round_trips += 1
+        time.sleep(self.latency)
+        return super().send_packed_command(command, check_health)
+
+
+class Command(BaseCommand):
+    help = 'Compare storing a token pair with one command per step against registering a session in one round trip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.5, help='Injected latency per round trip in ms')
+        parser.add_argument('--redis-url', default=settings.REDIS_URL)
+
+    def handle(self, *args, **options):
+        import fakeredis
+
+        self.stdout.write('fakeredis (no network)')
+        self.compare(fakeredis.FakeRedis(), options['repeat'])
+
+        LatencyConnection.latency = options['latency'] / 1000
+        pool = ConnectionPool.from_url(options['redis_url'], connection_class=LatencyConnection)
+        self.stdout.write(f"Redis at {options['redis_url']} with {options['latency']} ms per round trip")
+        self.compare(Redis(connection_pool=pool), options['repeat'])
+
+    def compare(self, redis_client, repeat):
+        class BenchmarkTokenService(TokenService):
+            @classmethod
+            def get_redis_client(cls):
+                return redis_client
+
+        user_ids = [uuid.uuid4() for _ in range(repeat)]
+        for user_id in user_ids:
+            for token_type in TokenType:
+                redis_client.sadd(f"user:{user_id}:{token_type}", "fake_token")
+        self.add_session(BenchmarkTokenService, uuid.uuid4())
+
+        try:
+            self.report('Per step', *self.measure(
+                lambda user_id: self.store_per_step(redis_client, user_id), user_ids
+            ))
+            self.report('Session', *self.measure(
+                lambda user_id: self.add_session(BenchmarkTokenService, user_id), user_ids
+            ))
+        finally:
+            redis_client.delete(*[
+                key
+                for user_id in user_ids
+                for key in (
+                    BenchmarkTokenService.sessions_key.format(user_id=user_id),
+                    *(f"user:{user_id}:{token_type}" for token_type in TokenType),
+                )
+            ])
+
+    @staticmethod
+    def add_session(token_service, user_id):
+        token_service.add_session(
+            user_id,
+            uuid.uuid4().hex,
+            access_jti=uuid.uuid4().hex,
+            refresh_jti=uuid.uuid4().hex,
+            expires_at=datetime.datetime.now(datetime.timezone.utc) + LIFETIME,
+        )
+
+    @staticmethod
+    def store_per_step(redis_client, user_id):
+        # The sequence UserService.create_tokens used to send before sessions: a read of
+        # every stored set, then a separate DELETE, SADD and EXPIRE per token type.
+        for token_type in TokenType:
+            token_key = f"user:{user_id}:{token_type}"
+            if redis_client.smembers(token_key):
+                redis_client.delete(token_key)
+                redis_client.sadd(token_key, TokenService.get_token_hash(uuid.uuid4().hex))
+                redis_client.expire(token_key, LIFETIME)
+
+    @staticmethod
+    def measure(issue, user_ids):
+        timings = []
+        round_trips = LatencyConnection.round_trips
+        for user_id in user_ids:
+            started = time.perf_counter()
+            issue(user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        # Only connections to a real server count their round trips.
+        round_trips = (LatencyConnection.round_trips - round_trips) / len(user_ids)
+        return timings, round_trips or None
+
+    def report(self, name, timings, round_trips):
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        line = f"  {name:<12} p50 {statistics.median(timings):8.3f} ms   p95 {p95:8.3f} ms"
+        if round_trips is not None:
+            line += f"   {round_trips:4.1f} round trips/issue"
+        self.stdout.write(line)
@@ -0,0 +1,82 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from user.models import User
+from user.throttling import LoginThrottle
+from user.views import LoginViewSet
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Simulate credential stuffing against the login endpoint with and without its throttle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--batch', type=int, default=200)
+        parser.add_argument('--accounts', type=int, default=20)
+        parser.add_argument('--ips', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # Everything is created inside a transaction that is rolled back at the end.
+        with transaction.atomic():
+            accounts = [
+                User.objects.create_user(
+                    email=f'stuffing-{index}@example.com', password='Correct-password1',
+                    first_name='Bench', last_name='Mark',
+                ).email
+                for index in range(options['accounts'])
+            ]
+            ips = [f'203.0.113.{index}' for index in range(1, options['ips'] + 1)]
+            try:
+                for throttled in (False, True):
+                    self.stdout.write('With throttle' if throttled else 'Without throttle')
+                    self.attack(accounts, ips, throttled, options)
+            finally:
+                LoginThrottle.get_redis_client().delete(
+                    *[f'{LoginThrottle.key_prefix}:{LoginThrottle.scope}:ip:{ip}' for ip in ips],
+                    *[
+                        f'{LoginThrottle.key_prefix}:{LoginThrottle.scope}:email_or_phone_number:{email}'
+                        for email in accounts
+                    ],
+                )
+            transaction.set_rollback(True)
+
+    def attack(self, accounts, ips, throttled, options):
+        rng = random.Random(options['seed'])
+        view = LoginViewSet.as_view(
+            {'post': 'create'}, throttle_classes=LoginViewSet.throttle_classes if throttled else []
+        )
+        factory = APIRequestFactory()
+        for start in range(0, options['requests'], options['batch']):
+            statuses = {}
+            counter = QueryCounter()
+            cpu_started = time.process_time()
+            with connection.execute_wrapper(counter):
+                for _ in range(min(options['batch'], options['requests'] - start)):
+                    request = factory.post(
+                        '/api/users/login/',
+                        {'email_or_phone_number': rng.choice(accounts), 'password': f'guess-{rng.random()}'},
+                        format='json',
+                        REMOTE_ADDR=rng.choice(ips),
+                    )
+                    status_code = view(request).status_code
+                    statuses[status_code] = statuses.get(status_code, 0) + 1
+            cpu = (time.process_time() - cpu_started) * 1000
+            batch = sum(statuses.values())
+            self.stdout.write(
+                f"  requests {start + 1:>6}-{start + batch:<6} CPU {cpu / batch:8.3f} ms/request   "
+                f"{counter.count / batch:5.2f} queries/request   statuses {dict(sorted(statuses.items()))}"
+            )
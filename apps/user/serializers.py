@@ -100,6 +100,15 @@ class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField(write_only=True)
 
 
+class SessionSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    device = serializers.CharField()
+    ip_address = serializers.IPAddressField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    expires_at = serializers.DateTimeField()
+    current = serializers.BooleanField()
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
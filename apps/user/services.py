@@ -1,12 +1,24 @@
-from typing import Union
+import datetime
+import json
+import time
+import uuid
+from typing import Optional, Union
 from rest_framework.exceptions import ValidationError
 from django.conf import settings
-from django.contrib.auth import authenticate
-from django.utils import timezone
+from django.contrib.auth.models import Permission
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django_redis import get_redis_connection
+from redis import Redis
+from redis.client import Pipeline
 from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 
-from share.enums import TokenType
+from share.enums import EmailStatus
+from share.mail import OTP_TEMPLATE, render_email
 from share.services import TokenService
 from user.models import User
 
@@ -14,43 +26,283 @@ from user.models import User
 class UserService:
     @classmethod
     def authenticate(cls, email_or_phone_number: str, password: str, quiet=False) -> Union[ValidationError, User, None]:
-        if "@" in email_or_phone_number:
-            user = User.objects.filter(email=email_or_phone_number).first()
-        else:
-            user = User.objects.filter(phone_number=email_or_phone_number).first()
+        """
+        Looks the user up with one indexed query for the columns needed to log in. The
+        last_login update is buffered by LastLoginService when tokens are issued.
+
+        A password hash that does not match the hasher policy (see user.hashers) is
+        replaced by check_password once the password is verified.
+        """
+        username_field = "email" if "@" in email_or_phone_number else "phone_number"
+        user = User.objects.filter(**{username_field: email_or_phone_number}).only("id", "password").first()
         if user is None or not user.check_password(password):
             if quiet:
                 return None
             raise ValidationError(_("Login or password is incorrect"), code=400)
-        user.last_login = timezone.now()
-        user.save(update_fields=["last_login"])
         return user
 
     @classmethod
-    def create_tokens(cls, user: User, access: str = None, refresh: str = None) -> dict[str, str]:
-        if not access or not refresh:
-            refresh = RefreshToken.for_user(user)
-            access = str(getattr(refresh, "access_token"))
-            refresh = str(refresh)
-        valid_access_tokens = TokenService.get_valid_tokens(
-            user_id=user.id, token_type=TokenType.ACCESS
+    def create_tokens(cls, user: User, request=None) -> dict[str, str]:
+        """
+        Issues a token pair for a new session, registered with the device it was requested
+        from. The session and the user's last_login are written in one Redis round trip.
+        """
+        refresh = RefreshToken.for_user(user)
+        session_id = uuid.uuid4().hex
+        refresh[TokenService.session_claim] = session_id
+        access = refresh.access_token
+        pipeline = TokenService.get_redis_client().pipeline(transaction=True)
+        TokenService.add_session(
+            user.id,
+            session_id,
+            access_jti=access[api_settings.JTI_CLAIM],
+            refresh_jti=refresh[api_settings.JTI_CLAIM],
+            expires_at=datetime_from_epoch(refresh["exp"]),
+            device=request.META.get("HTTP_USER_AGENT", "")[:256] if request else "",
+            ip_address=request.META.get("REMOTE_ADDR") if request else None,
+            pipeline=pipeline,
         )
-        if valid_access_tokens:
-            TokenService.add_token_to_redis(
-                user.id,
-                access,
-                TokenType.ACCESS,
-                settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME"),
-            )
+        LastLoginService.record(user.id, pipeline=pipeline)
+        pipeline.execute()
+        return {"access": str(access), "refresh": str(refresh)}
+
+
+class LastLoginService:
+    """
+    Buffers last_login in a Redis hash (user id -> login timestamp) that flush() writes to
+    the database in bulk, so logging in never writes to the user row.
+    """
+
+    pending_key = "users:last_login"
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
 
-        valid_refresh_tokens = TokenService.get_valid_tokens(
-            user_id=user.id, token_type=TokenType.REFRESH
+    @classmethod
+    def record(cls, user_id: uuid.UUID, pipeline: Optional[Pipeline] = None) -> None:
+        (pipeline if pipeline is not None else cls.get_redis_client()).hset(
+            cls.pending_key, str(user_id), time.time()
         )
-        if valid_refresh_tokens:
-            TokenService.add_token_to_redis(
-                user.id,
-                refresh,
-                TokenType.REFRESH,
-                settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"),
+
+    @classmethod
+    def pop_pending(cls) -> dict[str, float]:
+        # MULTI makes reading and clearing the buffer atomic against record().
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        pipeline.hgetall(cls.pending_key)
+        pipeline.delete(cls.pending_key)
+        pending, _ = pipeline.execute()
+        return {user_id.decode(): float(timestamp) for user_id, timestamp in pending.items()}
+
+    @classmethod
+    def restore_pending(cls, pending: dict[str, float]) -> None:
+        # Logins recorded since the buffer was popped are newer, they are kept.
+        pipeline = cls.get_redis_client().pipeline(transaction=True)
+        for user_id, timestamp in pending.items():
+            pipeline.hsetnx(cls.pending_key, user_id, timestamp)
+        pipeline.execute()
+
+    @classmethod
+    def flush(cls, batch_size: int = 1000) -> int:
+        """
+        Writes the buffered logins to User.last_login. Returns the number of users updated.
+        """
+        pending = cls.pop_pending()
+        if not pending:
+            return 0
+        try:
+            return cls.write_last_logins(pending, batch_size)
+        except Exception:
+            cls.restore_pending(pending)
+            raise
+
+    @classmethod
+    def write_last_logins(cls, pending: dict[str, float], batch_size: int) -> int:
+        items = [
+            (user_id, datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc))
+            for user_id, timestamp in pending.items()
+        ]
+        updated = 0
+        with transaction.atomic():
+            for start in range(0, len(items), batch_size):
+                batch = dict(items[start:start + batch_size])
+                updated += User.objects.filter(id__in=batch.keys()).update(
+                    last_login=Case(
+                        *[When(id=user_id, then=Value(last_login)) for user_id, last_login in batch.items()],
+                        output_field=DateTimeField(),
+                    )
+                )
+        return updated
+
+
+class OtpEmailService:
+    """
+    Outbound OTP emails. Views queue messages in Redis and return at once; the
+    send_queued_emails task sends them in batches over one SMTP connection, retrying
+    with backoff. The delivery status of every address is kept under `status_key`.
+    """
+
+    queue_key = "emails:queue"
+    scheduled_key = "emails:scheduled"
+    status_key = "email:{email}:status"
+    status_ttl = 10 * 60
+    schedule_ttl = 60
+    batch_size = 100
+    retry_backoff = 2
+    subject = "Welcome to Our Service!"
+    template_name = OTP_TEMPLATE
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def enqueue(cls, email: str, otp_code: str, otp_key: str = None) -> None:
+        """
+        Queues an OTP email. `otp_key` is the key the OTP is stored under (email or phone
+        number); the OTP is dropped if the email can't be delivered, so a new one can be
+        requested right away.
+        """
+        from user.tasks import send_queued_emails
+
+        message = {"email": email, "otp_code": otp_code, "otp_key": otp_key or email}
+        pipeline = cls.get_redis_client().pipeline()
+        pipeline.rpush(cls.queue_key, json.dumps(message))
+        pipeline.set(cls.status_key.format(email=email), EmailStatus.QUEUED.value, ex=cls.status_ttl)
+        # One drain task at a time, it picks up everything queued until it runs.
+        pipeline.set(cls.scheduled_key, 1, nx=True, ex=cls.schedule_ttl)
+        _, _, schedule = pipeline.execute()
+        if schedule:
+            send_queued_emails.delay()
+
+    @classmethod
+    def pop_batch(cls) -> list[dict]:
+        from user.tasks import send_queued_emails
+
+        pipeline = cls.get_redis_client().pipeline()
+        pipeline.delete(cls.scheduled_key)
+        pipeline.lpop(cls.queue_key, cls.batch_size)
+        pipeline.llen(cls.queue_key)
+        _, messages, remaining = pipeline.execute()
+        if remaining and cls.get_redis_client().set(cls.scheduled_key, 1, nx=True, ex=cls.schedule_ttl):
+            send_queued_emails.delay()
+        return [json.loads(message) for message in messages or []]
+
+    @classmethod
+    def get_status(cls, email: str) -> Optional[EmailStatus]:
+        status = cls.get_redis_client().get(cls.status_key.format(email=email))
+        return EmailStatus(status.decode()) if status else None
+
+    @classmethod
+    def build_message(cls, message: dict, connection=None) -> EmailMessage:
+        body = render_email(cls.template_name, {
+            "email": message["email"],
+            "otp_code": message["otp_code"],
+        })
+        email_message = EmailMessage(
+            cls.subject, body, settings.EMAIL_HOST_USER, [message["email"]], connection=connection
+        )
+        email_message.content_subtype = "html"
+        return email_message
+
+    @classmethod
+    def send_batch(cls, messages: list[dict]) -> list[dict]:
+        """
+        Sends the messages over one connection and returns the ones that failed.
+        """
+        sent, failed = [], []
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for message in messages:
+                    try:
+                        connection.send_messages([cls.build_message(message, connection)])
+                        sent.append(message)
+                    except Exception:
+                        failed.append(message)
+        except Exception:
+            # The connection could not be opened (or closed), nothing left unsent was sent.
+            failed = [message for message in messages if message not in sent]
+        cls.set_status(sent, EmailStatus.SENT)
+        return failed
+
+    @classmethod
+    def mark_failed(cls, messages: list[dict]) -> None:
+        cls.set_status(messages, EmailStatus.FAILED)
+        keys = [f"{message['otp_key']}:{suffix}" for message in messages for suffix in ("otp", "otp_secret")]
+        if keys:
+            cls.get_redis_client().delete(*keys)
+
+    @classmethod
+    def set_status(cls, messages: list[dict], status: EmailStatus) -> None:
+        if not messages:
+            return
+        pipeline = cls.get_redis_client().pipeline()
+        for message in messages:
+            pipeline.set(cls.status_key.format(email=message["email"]), status.value, ex=cls.status_ttl)
+        pipeline.execute()
+
+
+class PermissionCacheService:
+    """
+    Keeps every user's full permission set in Redis. Entries are stamped with a global
+    version that group, policy and permission changes bump; membership changes of a single
+    user only drop that user's entry.
+    """
+
+    version_key = "permissions:version"
+    permissions_key = "user:{user_id}:permissions"
+    permissions_ttl = 24 * 60 * 60
+
+    @classmethod
+    def get_redis_client(cls) -> Redis:
+        return get_redis_connection("default")
+
+    @classmethod
+    def get_permissions(cls, user: User) -> set[str]:
+        redis_client = cls.get_redis_client()
+        key = cls.permissions_key.format(user_id=user.pk)
+        version, raw = redis_client.mget(cls.version_key, key)
+        if version is None:
+            redis_client.set(cls.version_key, uuid.uuid4().hex, nx=True)
+            version = redis_client.get(cls.version_key)
+        version = version.decode()
+        if raw is not None:
+            cached = json.loads(raw)
+            if cached["version"] == version:
+                return set(cached["permissions"])
+
+        permissions = cls.load_permissions(user)
+        redis_client.set(
+            key, json.dumps({"version": version, "permissions": sorted(permissions)}), ex=cls.permissions_ttl
+        )
+        return permissions
+
+    @classmethod
+    def load_permissions(cls, user: User) -> set[str]:
+        """
+        Direct, group, user policy and group policy permissions of the user in one query.
+        """
+        permissions = Permission.objects.order_by().values_list("content_type__app_label", "codename")
+        if not user.is_superuser:
+            permissions = permissions.filter(user=user.pk).union(
+                permissions.filter(policy__user=user.pk, policy__is_active=True),
+                permissions.filter(custom_group__user=user.pk),
+                permissions.filter(
+                    policy__group__user=user.pk, policy__group__is_active=True, policy__is_active=True
+                ),
             )
-        return {"access": access, "refresh": refresh}
+        return {f"{app_label}.{codename}" for app_label, codename in permissions}
+
+    @classmethod
+    def invalidate(cls, *user_ids) -> None:
+        keys = [cls.permissions_key.format(user_id=user_id) for user_id in user_ids]
+        if not keys:
+            return
+        cls.get_redis_client().delete(*keys)
+        # A request reading the old rows before commit could have cached them again.
+        transaction.on_commit(lambda: cls.get_redis_client().delete(*keys))
+
+    @classmethod
+    def bump_version(cls) -> None:
+        cls.get_redis_client().set(cls.version_key, uuid.uuid4().hex)
+        transaction.on_commit(lambda: cls.get_redis_client().set(cls.version_key, uuid.uuid4().hex))
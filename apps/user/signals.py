@@ -0,0 +1,41 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import Group, Policy, User
+from user.services import PermissionCacheService
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.policies.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        PermissionCacheService.invalidate(instance.pk)
+    elif pk_set:
+        PermissionCacheService.invalidate(*pk_set)
+    else:
+        PermissionCacheService.bump_version()
+
+
+@receiver(m2m_changed, sender=Group.policies.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(m2m_changed, sender=Policy.permissions.through)
+def invalidate_all_permissions(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        PermissionCacheService.bump_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Policy)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Policy)
+def invalidate_permissions_of_members(sender, **kwargs):
+    PermissionCacheService.bump_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_superuser_permissions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "is_superuser" in update_fields:
+        PermissionCacheService.invalidate(instance.pk)
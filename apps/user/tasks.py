@@ -1,13 +1,15 @@
 from celery import shared_task
 from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
 from django.conf import settings
 import time
 
+from share.mail import NOTIFICATION_TEMPLATE, OTP_TEMPLATE, render_email
+from user.services import LastLoginService, OtpEmailService
+
 
 @shared_task
 def send_email(email: str, otp_code: str):
-    message = render_to_string('emails/email_template.html', {
+    message = render_email(OTP_TEMPLATE, {
         'email': email,
         'otp_code': otp_code
     })
@@ -25,3 +27,47 @@ def send_email(email: str, otp_code: str):
     except Exception as e:
         print(f"Failed to send email: {e}")
         return 400
+
+
+@shared_task(bind=True, max_retries=4)
+def send_notification_email(self, email: str, message: str):
+    """
+    Sends a notification email. A failed send is retried with exponential backoff.
+    """
+    email_message = EmailMessage(
+        'You have a new notification',
+        render_email(NOTIFICATION_TEMPLATE, {'email': email, 'message': message}),
+        settings.EMAIL_HOST_USER,
+        [email]
+    )
+    email_message.content_subtype = 'html'
+    try:
+        email_message.send(fail_silently=False)
+    except Exception as e:
+        raise self.retry(exc=e, countdown=OtpEmailService.retry_backoff * 2 ** self.request.retries)
+    return 200
+
+
+@shared_task(bind=True, max_retries=4)
+def send_queued_emails(self, messages: list = None):
+    """
+    Sends a batch of queued OTP emails over one connection. Failed messages are retried
+    with exponential backoff and marked as failed once the retries run out.
+    """
+    if messages is None:
+        messages = OtpEmailService.pop_batch()
+    failed = OtpEmailService.send_batch(messages)
+    if failed:
+        if self.request.retries >= self.max_retries:
+            OtpEmailService.mark_failed(failed)
+        else:
+            raise self.retry(args=(failed,), countdown=OtpEmailService.retry_backoff * 2 ** self.request.retries)
+    return len(messages) - len(failed)
+
+
+@shared_task
+def flush_last_logins():
+    """
+    Writes the last_login timestamps buffered in Redis to User.last_login.
+    """
+    return LastLoginService.flush()
@@ -0,0 +1,11 @@
+from share.throttling import SlidingWindowThrottle
+
+
+class LoginThrottle(SlidingWindowThrottle):
+    scope = "login"
+    ident_fields = ("email_or_phone_number",)
+
+
+class OtpVerifyThrottle(SlidingWindowThrottle):
+    scope = "otp_verify"
+    ident_fields = ("phone_number", "email")
@@ -16,5 +16,7 @@ urlpatterns = [
     path("password/reset/", views.ResetPasswordView.as_view()),
     path("logout/", views.LogoutView.as_view()),
     path("me/", views.UsersMeView.as_view()),
+    path("sessions/", views.SessionListView.as_view()),
+    path("sessions/<str:session_id>/", views.SessionDetailView.as_view()),
     path('', include(router.urls)),
 ]
@@ -1,18 +1,20 @@
 from django.utils.translation import gettext_lazy as _
 from rest_framework import generics, permissions, status, viewsets
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django_redis import get_redis_connection
 from share.permissions import GeneratePermissions, check_perm
 from share.utils import send_email, generate_otp, check_otp
-from share.services import TokenService
-from share.enums import TokenType
-from django.contrib.auth.hashers import make_password
+from share.services import OtpService, TokenService
+from django.contrib.auth.hashers import make_password  # noqa: F401 kept importable for tests patching it
 from secrets import token_urlsafe
 
+from cart.services import GuestCartService
 from core import settings
 from .serializers import *
 from .models import User
 from .services import UserService
+from .throttling import LoginThrottle, OtpVerifyThrottle
 
 redis_conn = get_redis_connection("default")
 
@@ -56,8 +58,7 @@ class SignUpView(generics.CreateAPIView):
             expire_in=2 * 60,
             check_if_exists=False
         )
-        send_email(email, otp_code)
-        # send_email.delay(email, otp_code)
+        send_email(email, otp_code, otp_key=phone_number)
         return Response({
             "phone_number": phone_number,
             "otp_secret": otp_secret
@@ -69,6 +70,7 @@ class VerifyView(generics.UpdateAPIView):
     serializer_class = VerifyCodeSerializer
     http_method_names = ['patch']
     authentication_classes = []
+    throttle_classes = [OtpVerifyThrottle]
 
     def patch(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -85,14 +87,17 @@ class VerifyView(generics.UpdateAPIView):
         user.save()
         redis_conn.delete(f"{phone_number}:otp")
         redis_conn.delete(f"{phone_number}:otp_secret")
-        tokens = UserService.create_tokens(user)
-        return Response(tokens, status=status.HTTP_200_OK)
+        tokens = UserService.create_tokens(user, request)
+        response = Response(tokens, status=status.HTTP_200_OK)
+        GuestCartService.merge_into_user(user.id, request, response)
+        return response
 
 
 class LoginViewSet(viewsets.ModelViewSet):
     serializer_class = LoginSerializer
     http_method_names = ['post']
     authentication_classes = []
+    throttle_classes = [LoginThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -101,11 +106,14 @@ class LoginViewSet(viewsets.ModelViewSet):
         if isinstance(user, ValidationError):
             raise user
 
-        tokens = UserService.create_tokens(user)
-        return Response(tokens)
+        tokens = UserService.create_tokens(user, request)
+        response = Response(tokens)
+        GuestCartService.merge_into_user(user.id, request, response)
+        return response
 
 class UsersMeView(GeneratePermissions, generics.RetrieveAPIView, generics.UpdateAPIView):
     http_method_names = ['get', 'patch']
+    queryset = User.objects.all()
 
     def get_queryset(self):
         return User.objects.all()
@@ -146,9 +154,10 @@ class ChangePasswordView(generics.UpdateAPIView):
         serializer = self.get_serializer(user, data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        tokens = UserService.create_tokens(user)
+        # Whoever knew the old password is logged out everywhere, this device gets a new pair.
+        TokenService.revoke_all_sessions(user.id, settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"))
+        tokens = UserService.create_tokens(user, request)
         return Response(tokens)
-    
 
 
 class ForgotPasswordView(generics.CreateAPIView):
@@ -185,6 +194,7 @@ class ForgotPasswordView(generics.CreateAPIView):
 class ForgotPasswordVerifyView(generics.CreateAPIView):
     authentication_classes = []
     serializer_class = ForgotPasswordVerifySerializer
+    throttle_classes = [OtpVerifyThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -197,9 +207,9 @@ class ForgotPasswordVerifyView(generics.CreateAPIView):
         otp_secret = kwargs.get('otp_secret')
         check_otp(email, otp_code, otp_secret)
         redis_conn.delete(f"{email}:otp")
-        token_hash = make_password(token_urlsafe())
-        redis_conn.set(token_hash, email, ex=2 * 60 * 60)
-        return Response({"token": token_hash})
+        token = token_urlsafe()
+        redis_conn.set(OtpService.get_reset_token_key(token), email, ex=2 * 60 * 60)
+        return Response({"token": token})
 
 
 class ResetPasswordView(generics.UpdateAPIView):
@@ -211,8 +221,8 @@ class ResetPasswordView(generics.UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        token_hash = serializer.validated_data['token']
-        email: bytes = redis_conn.get(token_hash)
+        token_key = OtpService.get_reset_token_key(serializer.validated_data['token'])
+        email: bytes = redis_conn.get(token_key)
         if not email:
             raise ValidationError(_("Invalid token"))
         email = email.decode()
@@ -222,24 +232,50 @@ class ResetPasswordView(generics.UpdateAPIView):
 
         password = serializer.validated_data['password']
         user = User.objects.reset_password_email(email, password)
-        tokens = UserService.create_tokens(user)
-        redis_conn.delete(token_hash)
+        TokenService.revoke_all_sessions(user.id, settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"))
+        tokens = UserService.create_tokens(user, request)
+        redis_conn.delete(token_key)
         return Response(tokens)
 
 class LogoutView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        TokenService.add_token_to_redis(
-            request.user.id,
-            'fake_token',
-            TokenType.ACCESS,
-            settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME"),
-        )
-        TokenService.add_token_to_redis(
-            request.user.id,
-            'fake_token',
-            TokenType.REFRESH,
-            settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"),
-        )
-        return Response({"detail": _("Successfully logged out")})
\ No newline at end of file
+        session_id = request.auth.get(TokenService.session_claim)
+        if session_id:
+            TokenService.revoke_session(request.user.id, session_id)
+        else:
+            TokenService.revoke_legacy_tokens(
+                request.user.id,
+                settings.SIMPLE_JWT.get("ACCESS_TOKEN_LIFETIME"),
+                settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"),
+            )
+        return Response({"detail": _("Successfully logged out")})
+
+
+class SessionListView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SessionSerializer
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        current_session_id = request.auth.get(TokenService.session_claim)
+        sessions = [
+            {**session, "current": session["id"] == current_session_id}
+            for session in TokenService.get_sessions(request.user.id)
+        ]
+        return Response(self.get_serializer(sessions, many=True).data)
+
+    def delete(self, request, *args, **kwargs):
+        TokenService.revoke_all_sessions(request.user.id, settings.SIMPLE_JWT.get("REFRESH_TOKEN_LIFETIME"))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SessionDetailView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SessionSerializer
+
+    def delete(self, request, *args, **kwargs):
+        if not TokenService.revoke_session(request.user.id, kwargs["session_id"]):
+            raise NotFound(_("Session not found"))
+        return Response(status=status.HTTP_204_NO_CONTENT)
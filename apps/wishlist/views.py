@@ -1,14 +1,16 @@
 from share.permissions import GeneratePermissions
+from share.prefetch import PrefetchPlannerMixin
 from rest_framework import status, generics
 from .models import Wishlist
 from .serializers import WishlistSerializer
 
 
-class WishlistListCreateView(GeneratePermissions, generics.ListCreateAPIView):
+class WishlistListCreateView(GeneratePermissions, PrefetchPlannerMixin, generics.ListCreateAPIView):
     """
     View to list user's wishlist and add items to wishlist.
     """
     serializer_class = WishlistSerializer
+    queryset = Wishlist.objects.all()
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
@@ -21,6 +23,7 @@ class WishlistRetrieveDeleteView(GeneratePermissions, generics.RetrieveDestroyAP
     View to remove an item from the wishlist.
     """
     serializer_class = WishlistSerializer
+    queryset = Wishlist.objects.all()
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
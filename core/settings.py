@@ -3,6 +3,7 @@ import sys
 from datetime import timedelta
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'rest_framework',
     'rest_framework_simplejwt',
     'user',
@@ -141,6 +143,28 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# New password hashes are made with PASSWORD_HASHER, see user.hashers.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')
+PASSWORD_HASHER_ARGON2_TIME_COST = config('PASSWORD_HASHER_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_HASHER_ARGON2_MEMORY_COST = config('PASSWORD_HASHER_ARGON2_MEMORY_COST', default=19 * 1024, cast=int)
+PASSWORD_HASHER_ARGON2_PARALLELISM = config('PASSWORD_HASHER_ARGON2_PARALLELISM', default=1, cast=int)
+PASSWORD_HASHER_BCRYPT_ROUNDS = config('PASSWORD_HASHER_BCRYPT_ROUNDS', default=12, cast=int)
+PASSWORD_HASHER_PBKDF2_ITERATIONS = config('PASSWORD_HASHER_PBKDF2_ITERATIONS', default=600000, cast=int)
+
+_PASSWORD_HASHERS = {
+    'argon2': 'user.hashers.Argon2idPasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+}
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(f"PASSWORD_HASHER must be one of {sorted(_PASSWORD_HASHERS)}")
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.pop(PASSWORD_HASHER),
+    *_PASSWORD_HASHERS.values(),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -211,6 +235,40 @@ CELERY_TASK_TIME_LIMIT = 30 * 60
 
 broker_connection_retry_on_startup = True
 
+CELERY_BEAT_SCHEDULE = {
+    'flush-product-views': {
+        'task': 'product.tasks.flush_product_views',
+        'schedule': 30.0,
+    },
+    'rollup-product-stats': {
+        'task': 'product.tasks.rollup_product_stats',
+        'schedule': 5 * 60.0,
+    },
+    'send-queued-emails': {
+        'task': 'user.tasks.send_queued_emails',
+        'schedule': 60.0,
+    },
+    'flush-last-logins': {
+        'task': 'user.tasks.flush_last_logins',
+        'schedule': 30.0,
+    },
+    'flush-inventory': {
+        'task': 'product.tasks.flush_inventory',
+        'schedule': 30.0,
+    },
+    'expire-reservations': {
+        'task': 'order.tasks.expire_reservations',
+        'schedule': 60.0,
+    },
+    'flush-carts': {
+        'task': 'cart.tasks.flush_carts',
+        'schedule': 30.0,
+    },
+}
+
+# How long checkout holds the stock of a pending order, in seconds.
+INVENTORY_HOLD_TTL = config('INVENTORY_HOLD_TTL', default=15 * 60, cast=int)
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -237,6 +295,13 @@ REST_FRAMEWORK = {
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '10/min',
+        'login_ip': '100/min',
+        'otp_verify': '5/min',
+        'otp_verify_ip': '50/min',
+        'guest_cart': '20/hour',
+    },
 }
 
 SIMPLE_JWT = {
@@ -266,6 +331,10 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Tokens without a session id issued at or after this time (epoch seconds) are rejected.
+# Set it to the time sessions were deployed; 0 accepts them until they expire.
+LEGACY_TOKEN_CUTOFF = config('LEGACY_TOKEN_CUTOFF', default=0, cast=int)
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Alibaba',
     'DESCRIPTION': 'Alibaba Clone project',